@@ -0,0 +1,121 @@
+import queue
+import shutil
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+
+# Encodages supportés par le client -> format d'entrée ffmpeg (None = PCM brut)
+ENCODINGS = {
+    "LINEAR16": None,
+    "OGG_OPUS": "ogg",
+    "MP3": "mp3",
+}
+
+
+class StreamDecoder(ABC):
+    """
+    Décodeur incrémental: reçoit des morceaux compressés au fil du réseau et
+    rend le PCM 16-bit mono disponible dès que possible.
+
+    close() doit toujours être appelé (try/finally), même après flush(): il
+    libère les ressources d'un décodage interrompu par une erreur.
+    """
+
+    @abstractmethod
+    def feed(self, chunk: bytes) -> bytes:
+        """Ajoute un morceau compressé, retourne le PCM déjà décodé (peut être vide)."""
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """Fin du flux: retourne le PCM restant et libère les ressources."""
+
+    def close(self):
+        """Abandonne le décodage (erreur, annulation). Sans effet après flush()."""
+
+
+class PCMDecoder(StreamDecoder):
+    """LINEAR16: rien à décoder."""
+
+    def feed(self, chunk: bytes) -> bytes:
+        return chunk
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class FFmpegStreamDecoder(StreamDecoder):
+    """
+    Décodage OGG_OPUS / MP3 via un process ffmpeg en pipe.
+
+    stdin reçoit les octets compressés, un thread lit stdout (PCM s16le) et
+    le dépose dans une queue; feed() ne bloque donc jamais sur le décodeur.
+    """
+
+    def __init__(self, input_format: str, sample_rate: int = 48000):
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            raise RuntimeError(
+                "ffmpeg est requis pour décoder l'audio compressé. "
+                "Installez-le (brew install ffmpeg / apt install ffmpeg / winget install ffmpeg) "
+                "ou utilisez --tts-encoding LINEAR16."
+            )
+        self._proc = subprocess.Popen(
+            [ffmpeg, "-hide_banner", "-loglevel", "error",
+             "-f", input_format, "-i", "pipe:0",
+             "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._pcm = queue.Queue()
+        self._odd_byte = b""  # Les lectures de pipe ne respectent pas les frontières d'échantillon
+        self._reader = threading.Thread(target=self._read_loop, daemon=True, name="DecoderThread")
+        self._reader.start()
+
+    def _read_loop(self):
+        stdout = self._proc.stdout
+        while True:
+            data = stdout.read1(65536)
+            if not data:
+                break
+            self._pcm.put(data)
+
+    def _drain(self) -> bytes:
+        parts = [self._odd_byte]
+        while True:
+            try:
+                parts.append(self._pcm.get_nowait())
+            except queue.Empty:
+                break
+        pcm = b"".join(parts)
+        cut = len(pcm) - (len(pcm) % 2)
+        self._odd_byte = pcm[cut:]
+        return pcm[:cut]
+
+    def feed(self, chunk: bytes) -> bytes:
+        if chunk:
+            self._proc.stdin.write(chunk)
+            self._proc.stdin.flush()
+        return self._drain()
+
+    def flush(self) -> bytes:
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._reader.join()
+        self._proc.wait()
+        return self._drain()
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+
+
+def create_decoder(encoding: str, sample_rate: int = 48000) -> StreamDecoder:
+    """Factory: décodeur adapté à l'audioEncoding demandé à Inworld."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Encodage inconnu: {encoding}. Utilisez {', '.join(ENCODINGS)}.")
+    input_format = ENCODINGS[encoding]
+    if input_format is None:
+        return PCMDecoder()
+    return FFmpegStreamDecoder(input_format, sample_rate)
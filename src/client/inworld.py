@@ -1,7 +1,30 @@
+import hashlib
+import json
 import os
+import threading
+import time
 import requests
 import base64
-import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .codecs import ENCODINGS, create_decoder
+from .stream_parser import AudioContentParser
+from .resilience import (
+    CircuitBreaker, CircuitOpenError, Deadlines, InworldAPIError,
+    InworldTimeoutError, LatencyTracker, RetryPolicy, TokenBucket,
+)
+
+# Sample rates acceptés par audioConfig.sampleRateHertz
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+
+def request_key(text: str, voice_id: str, model_id: str, sample_rate: int) -> str:
+    """
+    Identifiant stable d'une requête de synthèse: même clé = même audio. Sert de
+    nom de fichier (batch-tts) et de clé de réutilisation des clips (pack de phrases).
+    """
+    raw = json.dumps([text, voice_id, model_id, sample_rate], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
 
 class InworldAuth:
     def __init__(self, key=None, secret=None):
@@ -11,21 +34,68 @@ class InworldAuth:
             raise ValueError("INWORLD_KEY and INWORLD_SECRET are required")
 
     def get_auth_header(self):
-        # Pour le MVP, on utilise Basic Auth simple
-        # Dans un environnement de prod, on génèrerait un JWT
+        # Basic Auth simple; token de session renouvelé: voir token_auth.InworldTokenAuth
         credentials = f"{self.key}:{self.secret}"
         encoded = base64.b64encode(credentials.encode()).decode()
         return {"Authorization": f"Basic {encoded}"}
 
 class InworldTTSClient:
-    def __init__(self, auth: InworldAuth, model_id=None):
+    """
+    Client HTTP de l'API TTS Inworld, avec maîtrise de la latence de queue:
+
+    - deadlines par phase (connexion, premier octet, total)
+    - hedging optionnel: une requête dupliquée part si la première n'a pas
+      reçu son premier octet au bout du p95 observé; la première réponse gagne
+    - retries bornés avec jitter sur les erreurs transitoires (timeout, 429, 5xx)
+    - circuit breaker: échec immédiat tant que l'API est dégradée
+
+    L'audio peut transiter compressé (OGG_OPUS, MP3): il est alors décodé
+    localement en PCM 16-bit au fil de l'eau, l'appelant reçoit toujours du PCM.
+
+    Les requêtes passent par une requests.Session (connexions keep-alive
+    réutilisées, partageable entre threads) et, si fourni, par un TokenBucket
+    qui borne le débit de toutes les tentatives, retries et hedges compris.
+    """
+
+    def __init__(self, auth: InworldAuth, model_id=None, base_url=None,
+                 deadlines: Deadlines = None, retry: RetryPolicy = None,
+                 breaker: CircuitBreaker = None, hedge: bool = False,
+                 audio_encoding: str = None, sample_rate: int = 48000,
+                 session: requests.Session = None, rate_limiter: TokenBucket = None):
         self.auth = auth
         self.model_id = model_id or os.getenv("INWORLD_MODEL_ID", "inworld-tts-1.5-mini")
-        self.base_url = "https://api.inworld.ai/tts/v1"
+        self.base_url = base_url or os.getenv("INWORLD_BASE_URL", "https://api.inworld.ai/tts/v1")
+        self.deadlines = deadlines or Deadlines()
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.audio_encoding = audio_encoding or os.getenv("INWORLD_AUDIO_ENCODING") or "LINEAR16"
+        if self.audio_encoding not in ENCODINGS:
+            raise ValueError(f"Encodage inconnu: {self.audio_encoding}. Utilisez {', '.join(ENCODINGS)}.")
+        self.sample_rate = sample_rate
+        self.first_byte_latency = LatencyTracker()
+        self.session = session or requests.Session()
+        self.rate_limiter = rate_limiter
+        self._executor = None  # Pool créé à la première requête hedgée
 
-    def synthesize(self, text, voice_id, stream=False):
+        # Compteurs (lus par les métriques)
+        self.request_count = 0
+        self.bytes_received = 0
+        self.http_errors = {}  # code HTTP -> nombre d'erreurs
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def synthesize(self, text, voice_id, stream=False, speaking_rate=1.0):
         """
         Appelle l'endpoint TTS. Si stream=True, utilise l'endpoint stream et retourne un générateur.
+
+        speaking_rate > 1.0 accélère la voix côté serveur (rattrapage de retard).
+
+        Raises:
+            CircuitOpenError: l'API est marquée dégradée, aucune requête envoyée
+            InworldTimeoutError: une deadline a été dépassée sur toutes les tentatives
+            InworldAPIError: erreur HTTP non récupérable ou tentatives épuisées
         """
         url = f"{self.base_url}/voice:stream" if stream else f"{self.base_url}/voice"
 
@@ -37,35 +107,201 @@ class InworldTTSClient:
             "voiceId": voice_id,
             "modelId": self.model_id,
             "audioConfig": {
-                "audioEncoding": "LINEAR16",
-                "sampleRateHertz": 48000,
-                "speakingRate": 1.0
+                "audioEncoding": self.audio_encoding,
+                "sampleRateHertz": self.sample_rate,
+                "speakingRate": speaking_rate
             },
             "config": {
                 "applyTextNormalization": False
             }
         }
 
-        response = requests.post(url, headers=headers, json=payload, stream=stream)
-        
+        if stream:
+            # Retries uniquement jusqu'aux headers: une fois l'audio joué, on ne rejoue pas
+            response, started = self._with_retries(lambda: self._open(url, headers, payload))
+            chunks = self._stream_generator(response, started)
+            if self.audio_encoding == "LINEAR16":
+                return chunks
+            return self._decode_stream(chunks)
+
+        fetch = self._fetch_hedged if self.hedge else self._fetch_once
+        return self._with_retries(lambda: fetch(url, headers, payload))
+
+    def _with_retries(self, attempt_fn):
+        """Exécute attempt_fn avec retries, jitter et circuit breaker."""
+        for attempt in range(self.retry.max_attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError("Inworld indisponible (circuit ouvert), requête non envoyée")
+            try:
+                result = attempt_fn()
+            except InworldAPIError as e:
+                if not e.retryable:
+                    # Le serveur a répondu: l'API n'est pas dégradée, c'est la requête qui est invalide
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 >= self.retry.max_attempts:
+                    raise
+                delay = self.retry.delay(attempt)
+                print(f"[INWORLD] {e} - nouvel essai dans {delay:.2f}s ({attempt + 2}/{self.retry.max_attempts})")
+                self.retries += 1
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _open(self, url, headers, payload):
+        """Envoie la requête et attend les headers. Retourne (response, started)."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        started = time.monotonic()
+        self.request_count += 1
+        try:
+            response = self.session.post(
+                url, headers=headers, json=payload, stream=True,
+                timeout=(self.deadlines.connect_s, self.deadlines.first_byte_s)
+            )
+        except requests.ConnectTimeout:
+            self._count_error("timeout")
+            raise InworldTimeoutError("connect", self.deadlines.connect_s)
+        except requests.ReadTimeout:
+            self._count_error("timeout")
+            raise InworldTimeoutError("first_byte", self.deadlines.first_byte_s)
+        except requests.RequestException as e:
+            self._count_error("network")
+            raise InworldAPIError(f"Inworld network error: {e}")
+
         if response.status_code != 200:
-            raise Exception(f"Inworld API Error {response.status_code}: {response.text}")
+            self._count_error(str(response.status_code))
+            raise InworldAPIError(
+                f"Inworld API Error {response.status_code}: {response.text}", response.status_code
+            )
+        return response, started
 
-        if stream:
-            return self._stream_generator(response)
-        else:
-            # Pour l'endpoint standard, le format dépend, mais ici on vise le stream ou le standard
-            # L'endpoint standard retourne un JSON avec audioContent
-            res_json = response.json()
-            return base64.b64decode(res_json.get("audioContent", ""))
-
-    def _stream_generator(self, response):
-        """Lit le flux JSON ligne par ligne (ou chunk par chunk)"""
-        for line in response.iter_lines():
-            if line:
-                try:
-                    data = json.loads(line)
-                    if "audioContent" in data:
-                        yield base64.b64decode(data["audioContent"])
-                except json.JSONDecodeError:
-                    pass
+    def _read_body(self, response, started, first_byte_event=None, cancel=None):
+        """Lit le corps en vérifiant la deadline totale entre chaque chunk."""
+        chunks = []
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                now = time.monotonic()
+                if not chunks:
+                    self.first_byte_latency.observe(now - started)
+                    if first_byte_event:
+                        first_byte_event.set()
+                if now - started > self.deadlines.total_s:
+                    self._count_error("timeout")
+                    raise InworldTimeoutError("total", self.deadlines.total_s)
+                if cancel is not None and cancel.is_set():
+                    raise InworldAPIError("Requête annulée (hedge perdant)")
+                self.bytes_received += len(chunk)
+                chunks.append(chunk)
+        except requests.RequestException:
+            # iter_content remonte les read timeouts en ConnectionError
+            self._count_error("timeout")
+            raise InworldTimeoutError("body", self.deadlines.first_byte_s)
+        finally:
+            response.close()
+        return b"".join(chunks)
+
+    def _fetch_once(self, url, headers, payload, first_byte_event=None, cancel=None):
+        """Une tentative non-streaming complète. Retourne le PCM décodé."""
+        response, started = self._open(url, headers, payload)
+        body = self._read_body(response, started, first_byte_event, cancel)
+        # L'endpoint standard retourne un JSON avec audioContent
+        parser = AudioContentParser()
+        audio = b"".join(bytes(view) for view in parser.feed(body))
+        if self.audio_encoding == "LINEAR16":
+            return audio
+        decoder = create_decoder(self.audio_encoding, self.sample_rate)
+        try:
+            return decoder.feed(audio) + decoder.flush()
+        finally:
+            decoder.close()  # Sinon un échec laisse le process ffmpeg et son thread de lecture
+
+    def _fetch_hedged(self, url, headers, payload):
+        """
+        Tentative avec hedging: si la requête principale n'a pas reçu son premier
+        octet au bout du p95 observé, une requête identique part en parallèle.
+        La première réponse valide est retournée, l'autre est abandonnée.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="InworldHedge")
+
+        started = time.monotonic()
+        cancel = threading.Event()
+        first_byte = threading.Event()
+        primary = self._executor.submit(self._fetch_once, url, headers, payload, first_byte, cancel)
+        futures = [primary]
+
+        # Attendre le premier octet (ou la fin) jusqu'au p95
+        hedge_after = self.first_byte_latency.percentile(0.95)
+        while not first_byte.wait(0.01) and not primary.done():
+            if time.monotonic() - started >= hedge_after:
+                self.hedged += 1
+                futures.append(self._executor.submit(self._fetch_once, url, headers, payload, None, cancel))
+                break
+
+        last_error = None
+        while futures:
+            remaining = self.deadlines.total_s - (time.monotonic() - started)
+            done, _ = wait(futures, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                cancel.set()
+                raise InworldTimeoutError("total", self.deadlines.total_s)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    cancel.set()
+                    if future is not primary:
+                        self.hedge_wins += 1
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+
+    def _count_error(self, kind: str):
+        self.http_errors[kind] = self.http_errors.get(kind, 0) + 1
+
+    def _decode_stream(self, chunks):
+        """Décode les chunks compressés au fur et à mesure et produit du PCM."""
+        decoder = create_decoder(self.audio_encoding, self.sample_rate)
+        try:
+            for chunk in chunks:
+                pcm = decoder.feed(chunk)
+                if pcm:
+                    yield pcm
+            pcm = decoder.flush()
+            if pcm:
+                yield pcm
+        finally:
+            decoder.close()
+
+    def _stream_generator(self, response, started):
+        """
+        Lit le flux chunk par chunk et produit l'audio de chaque record.
+
+        Les chunks sont des memoryview sur un buffer réutilisé, valides jusqu'à
+        l'itération suivante: l'appelant copie (bytes(chunk)) s'il les conserve.
+        """
+        parser = AudioContentParser()
+        first = True
+        try:
+            for data in response.iter_content(chunk_size=8192):
+                now = time.monotonic()
+                if first:
+                    self.first_byte_latency.observe(now - started)
+                    first = False
+                if now - started > self.deadlines.total_s:
+                    self._count_error("timeout")
+                    self.breaker.record_failure()
+                    raise InworldTimeoutError("total", self.deadlines.total_s)
+                self.bytes_received += len(data)
+                yield from parser.feed(data)
+            parser.finish()
+            if parser.skipped:
+                print(f"[INWORLD] {parser.skipped} record(s) audio illisible(s) ignoré(s)")
+        except requests.RequestException:
+            self._count_error("timeout")
+            self.breaker.record_failure()
+            raise InworldTimeoutError("body", self.deadlines.first_byte_s)
+        finally:
+            response.close()
@@ -0,0 +1,339 @@
+"""
+Faux serveur Inworld TTS local, avec injection de fautes.
+
+Sert les mêmes routes que l'API (POST /tts/v1/voice et /tts/v1/voice:stream)
+et renvoie un signal PCM synthétique dont la durée dépend du texte. Les fautes
+(erreurs 5xx, requêtes qui pendent, latence avant headers ou avant le premier
+octet, corps lent) permettent de vérifier timeouts, retries, hedging et circuit
+breaker sans appeler la vraie API.
+
+Avec `fixtures`, le serveur renvoie des fichiers pré-encodés (un par
+audioEncoding) au lieu du signal synthétique, et `bandwidth_bytes_per_s`
+simule un lien montant contraint.
+
+MockTokenServer imite l'endpoint de tokens de session: JWT HS256 signés avec
+une clé locale, durée de vie courte configurable. Passé à MockInworldServer,
+il rend le header Bearer obligatoire (401 si absent, mal signé ou expiré).
+
+Utilisation:
+    python src/main.py mock-inworld --port 8099 --error-rate 0.2
+    INWORLD_BASE_URL=http://127.0.0.1:8099/tts/v1 python src/main.py test-tts
+"""
+import base64
+import hashlib
+import hmac
+import json
+import math
+import random
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class FaultConfig:
+    """Fautes injectées par le serveur (probabilités dans [0, 1], délais en secondes)."""
+    error_rate: float = 0.0          # Répond 503 au lieu de l'audio
+    error_status: int = 503
+    hang_rate: float = 0.0           # Ne répond jamais (jusqu'à hang_s)
+    hang_s: float = 60.0
+    header_delay_s: float = 0.0      # Délai avant l'envoi des headers
+    first_byte_delay_s: float = 0.0  # Délai entre headers et premier octet du corps
+    slow_body_rate: float = 0.0      # Corps envoyé en petits morceaux espacés
+    slow_body_chunk_delay_s: float = 0.2
+    fail_first: int = 0              # Les N premières requêtes échouent (error_status)
+    seed: int = None
+
+
+def synth_pcm(text: str, sample_rate: int = 48000) -> bytes:
+    """PCM 16-bit mono: une note par mot, ~70ms par caractère."""
+    duration_s = max(0.3, 0.07 * len(text))
+    n = int(duration_s * sample_rate)
+    freq = 180.0 + 40.0 * (len(text.split()) % 5)
+    samples = (int(8000 * math.sin(2 * math.pi * freq * i / sample_rate)) for i in range(n))
+    return struct.pack(f"<{n}h", *samples)
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class MockTokenServer:
+    """Endpoint de tokens local (POST /auth/v1/token, Basic key:secret) émettant des JWT HS256."""
+
+    def __init__(self, port: int = 0, host: str = "127.0.0.1", ttl_s: float = 300.0, delay_s: float = 0.0,
+                 fail_next: int = 0, signing_key: bytes = b"mock-signing-key"):
+        """
+        Args:
+            ttl_s: Durée de vie des tokens émis
+            delay_s: Délai avant chaque réponse (endpoint lent)
+            fail_next: Les N prochaines requêtes répondent 503 (modifiable à chaud)
+        """
+        self.host = host
+        self.port = port
+        self.ttl_s = ttl_s
+        self.delay_s = delay_s
+        self.fail_next = fail_next
+        self.signing_key = signing_key
+        self.tokens_issued = 0
+        self.requests_received = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def token_url(self) -> str:
+        return f"http://{self.host}:{self.port}/auth/v1/token"
+
+    def issue(self) -> dict:
+        """Réponse de l'endpoint: token signé et son expiration."""
+        with self._lock:
+            self.tokens_issued += 1
+            n = self.tokens_issued
+        exp = time.time() + self.ttl_s
+        header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+        claims = _b64url(json.dumps({"sub": "mock", "exp": exp, "n": n}).encode())
+        signature = hmac.new(self.signing_key, f"{header}.{claims}".encode(), hashlib.sha256).digest()
+        expiration = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(exp)) + f".{int(exp % 1 * 1e6):06d}Z"
+        return {"token": f"{header}.{claims}.{_b64url(signature)}", "type": "Bearer", "expirationTime": expiration}
+
+    def verify(self, authorization: str) -> bool:
+        """Vrai si le header Authorization porte un token émis ici et non expiré."""
+        if not authorization or not authorization.startswith("Bearer "):
+            return False
+        try:
+            header, claims, signature = authorization[7:].split(".")
+            expected = hmac.new(self.signing_key, f"{header}.{claims}".encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(_b64url(expected), signature):
+                return False
+            payload = json.loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))
+            return payload["exp"] > time.time()
+        except (ValueError, KeyError):
+            return False
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                with server._lock:
+                    server.requests_received += 1
+                    fail = server.fail_next > 0
+                    if fail:
+                        server.fail_next -= 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if server.delay_s:
+                    time.sleep(server.delay_s)
+                if not self.path.endswith("/token"):
+                    self._send_json(404, {"error": "not found"})
+                elif fail:
+                    self._send_json(503, {"error": "injected fault"})
+                elif not (self.headers.get("Authorization") or "").startswith("Basic "):
+                    self._send_json(401, {"error": "Basic credentials required"})
+                else:
+                    self._send_json(200, server.issue())
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="MockTokenThread")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class MockInworldServer:
+    """Serveur HTTP local imitant l'API TTS Inworld (thread daemon)."""
+
+    def __init__(self, port: int = 0, host: str = "127.0.0.1", faults: FaultConfig = None,
+                 stream_chunk_ms: int = 200, fixtures: dict = None, bandwidth_bytes_per_s: float = 0,
+                 token_server: MockTokenServer = None):
+        """
+        Args:
+            port: Port d'écoute (0 = port libre choisi par l'OS, voir self.port)
+            faults: Fautes à injecter
+            stream_chunk_ms: Durée audio par ligne du endpoint streaming (LINEAR16)
+            fixtures: {audioEncoding: octets pré-encodés} servis tels quels
+            bandwidth_bytes_per_s: Débit max d'envoi du corps (0 = illimité)
+            token_server: Si fourni, un token Bearer valide de ce serveur est exigé (401 sinon)
+        """
+        self.host = host
+        self.port = port
+        self.faults = faults or FaultConfig()
+        self.stream_chunk_ms = stream_chunk_ms
+        self.fixtures = fixtures or {}
+        self.bandwidth_bytes_per_s = bandwidth_bytes_per_s
+        self.token_server = token_server
+        self.unauthorized = 0
+        self.requests_received = 0
+        self.faults_injected = 0
+        self.connections_opened = 0
+        self._random = random.Random(self.faults.seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/tts/v1"
+
+    def _draw(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def _next_request(self) -> int:
+        with self._lock:
+            self.requests_received += 1
+            return self.requests_received
+
+    def render_audio(self, payload: dict) -> bytes:
+        """Audio renvoyé pour un payload: fixture de l'encodage demandé, sinon signal synthétique."""
+        encoding = payload.get("audioConfig", {}).get("audioEncoding", "LINEAR16")
+        if encoding in self.fixtures:
+            return self.fixtures[encoding]
+        rate = payload.get("audioConfig", {}).get("sampleRateHertz", 48000)
+        return synth_pcm(payload.get("text", ""), rate)
+
+    def _stream_records(self, payload: dict):
+        """Lignes JSON du endpoint streaming (une par chunk audio)."""
+        audio = self.render_audio(payload)
+        audio_config = payload.get("audioConfig", {})
+        if audio_config.get("audioEncoding", "LINEAR16") == "LINEAR16":
+            chunk_bytes = max(2, int(audio_config.get("sampleRateHertz", 48000) * self.stream_chunk_ms / 1000) * 2)
+        else:
+            chunk_bytes = 4096  # Flux compressé: découpage arbitraire, comme sur le réseau
+        for i in range(0, len(audio), chunk_bytes):
+            record = {"audioContent": base64.b64encode(audio[i:i + chunk_bytes]).decode()}
+            yield json.dumps(record).encode() + b"\n"
+
+    def _throttled_write(self, wfile, data: bytes):
+        """Écrit data en respectant bandwidth_bytes_per_s."""
+        if not self.bandwidth_bytes_per_s:
+            wfile.write(data)
+            wfile.flush()
+            return
+        piece = 4096
+        for i in range(0, len(data), piece):
+            wfile.write(data[i:i + piece])
+            wfile.flush()
+            time.sleep(len(data[i:i + piece]) / self.bandwidth_bytes_per_s)
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1: les réponses non-streaming gardent la connexion ouverte (keep-alive)
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections_opened += 1
+
+            def do_POST(self):
+                n = server._next_request()
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self.send_error(400, "Invalid JSON")
+                    return
+
+                if server.token_server and not server.token_server.verify(self.headers.get("Authorization")):
+                    with server._lock:
+                        server.unauthorized += 1
+                    self._send_json(401, {"error": "invalid or expired token"})
+                    return
+
+                faults = server.faults
+                if n <= faults.fail_first or server._draw(faults.error_rate):
+                    server.faults_injected += 1
+                    self._send_json(faults.error_status, {"error": "injected fault"})
+                    return
+                if server._draw(faults.hang_rate):
+                    server.faults_injected += 1
+                    time.sleep(faults.hang_s)
+                    self.close_connection = True
+                    return
+                if faults.header_delay_s:
+                    time.sleep(faults.header_delay_s)
+
+                if self.path.endswith("/voice:stream"):
+                    body_parts = server._stream_records(payload)
+                    # Corps délimité par la fermeture de connexion: permet d'envoyer au fil de l'eau
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Connection", "close")
+                    self.close_connection = True
+                elif self.path.endswith("/voice"):
+                    audio = server.render_audio(payload)
+                    body_parts = [json.dumps({"audioContent": base64.b64encode(audio).decode()}).encode()]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body_parts[0])))
+                else:
+                    self.send_error(404)
+                    return
+                self.end_headers()
+                self.wfile.flush()
+
+                if faults.first_byte_delay_s:
+                    time.sleep(faults.first_byte_delay_s)
+                slow = server._draw(faults.slow_body_rate)
+                try:
+                    for part in body_parts:
+                        if slow:
+                            for i in range(0, len(part), 4096):
+                                self.wfile.write(part[i:i + 4096])
+                                self.wfile.flush()
+                                time.sleep(faults.slow_body_chunk_delay_s)
+                        else:
+                            server._throttled_write(self.wfile, part)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client parti (timeout, hedge perdant)
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="MockInworldThread"
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
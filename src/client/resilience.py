@@ -0,0 +1,164 @@
+import collections
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+
+class InworldAPIError(Exception):
+    """Erreur renvoyée par l'API Inworld (ou par le client en son nom)."""
+
+    def __init__(self, message: str, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        # 429 (rate limit) et 5xx sont transitoires, les autres 4xx non
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+class InworldTimeoutError(InworldAPIError):
+    """Une des deadlines (connexion, premier octet, total) a été dépassée."""
+
+    def __init__(self, phase: str, limit_s: float):
+        super().__init__(f"Inworld timeout ({phase} > {limit_s:.1f}s)")
+        self.phase = phase
+
+
+class CircuitOpenError(InworldAPIError):
+    """Le circuit breaker est ouvert: l'API est considérée dégradée, on échoue vite."""
+
+    @property
+    def retryable(self) -> bool:
+        return False
+
+
+@dataclass
+class Deadlines:
+    """Délais par phase d'une requête TTS (secondes)."""
+    connect_s: float = 3.0       # Établissement TCP/TLS
+    first_byte_s: float = 5.0    # Envoi de la requête -> premier octet (et silence max entre deux chunks)
+    total_s: float = 15.0        # Requête complète, corps inclus
+
+
+@dataclass
+class RetryPolicy:
+    """Retries bornés avec backoff exponentiel et full jitter."""
+    max_attempts: int = 3
+    base_delay_s: float = 0.2
+    max_delay_s: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        """Délai avant la tentative attempt+1 (attempt commence à 0)."""
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker classique closed -> open -> half-open.
+
+    - closed: les requêtes passent; failure_threshold échecs consécutifs ouvrent le circuit
+    - open: les requêtes échouent immédiatement pendant reset_timeout_s
+    - half-open: une seule requête d'essai; succès -> closed, échec -> open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True si une requête peut partir maintenant."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"[INWORLD] Circuit ouvert ({self.consecutive_failures} échecs), "
+                          f"échec immédiat pendant {self.reset_timeout_s:.0f}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Fenêtre glissante des temps au premier octet, pour déclencher le hedging au p95."""
+
+    def __init__(self, window: int = 100, min_samples: int = 10, default_s: float = 1.5):
+        self.samples = collections.deque(maxlen=window)
+        self.min_samples = min_samples
+        self.default_s = default_s
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float = 0.95) -> float:
+        """Percentile q des observations, ou default_s tant que l'échantillon est trop petit."""
+        if len(self.samples) < self.min_samples:
+            return self.default_s
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class TokenBucket:
+    """
+    Limiteur de débit (token bucket) partagé entre threads.
+
+    rate_per_s jetons sont ajoutés par seconde, jusqu'à burst. acquire() bloque
+    jusqu'à ce qu'un jeton soit disponible: le débit moyen ne dépasse jamais
+    rate_per_s, avec des rafales d'au plus burst requêtes.
+    """
+
+    def __init__(self, rate_per_s: float, burst: int = 1):
+        if rate_per_s <= 0:
+            raise ValueError("rate_per_s doit être > 0")
+        self.rate_per_s = rate_per_s
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.waited_s = 0.0  # Temps cumulé passé à attendre un jeton
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Consomme un jeton, en attendant si nécessaire."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate_per_s)
+                self._updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait_s = (1.0 - self.tokens) / self.rate_per_s
+                self.waited_s += wait_s
+            time.sleep(wait_s)
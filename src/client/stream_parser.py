@@ -0,0 +1,156 @@
+import binascii
+
+import numpy as np
+
+_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_AUDIO_KEY = b'"audioContent"'
+_INVALID = 0x8000  # Bit marquant une paire hors alphabet (les valeurs décodées tiennent sur 12 bits)
+
+
+def _build_pair_table() -> np.ndarray:
+    """Table: 2 caractères base64 (uint16 little-endian) -> 12 bits décodés, ou _INVALID."""
+    sextets = np.full(256, _INVALID, dtype=np.uint32)
+    for i, c in enumerate(_B64_ALPHABET):
+        sextets[c] = i
+    idx = np.arange(65536, dtype=np.uint32)
+    table = (sextets[idx & 0xFF] << 6) | sextets[idx >> 8]
+    return np.where(table >= 4096, _INVALID, table).astype(np.uint16)
+
+
+_PAIR_TABLE = _build_pair_table()
+
+
+class Base64Decoder:
+    """
+    Décodeur base64 vectorisé écrivant dans des buffers préalloués.
+
+    Chaque paire de caractères est décodée en 12 bits par une seule lecture de
+    table, puis 2 paires donnent 3 octets. Les buffers grossissent jusqu'à la
+    taille du plus gros record puis sont réutilisés: aucune allocation en régime
+    établi.
+    """
+
+    def __init__(self, initial_size: int = 65536):
+        self._capacity = 0
+        self._reserve(initial_size)
+
+    def _reserve(self, encoded_len: int):
+        if encoded_len <= self._capacity:
+            return
+        self._capacity = encoded_len
+        quartets = encoded_len // 4 + 1
+        self._index = np.empty(quartets * 2, dtype=np.intp)
+        self._pairs = np.empty(quartets * 2, dtype=np.uint16)
+        self._tmp = np.empty(quartets, dtype=np.uint16)
+        self._tmp2 = np.empty(quartets, dtype=np.uint16)
+        self.output = bytearray(quartets * 3)
+        self._out = np.frombuffer(self.output, dtype=np.uint8)
+
+    def decode(self, encoded) -> int:
+        """
+        Décode encoded (buffer ASCII base64) dans self.output.
+
+        Returns:
+            Nombre d'octets décodés au début de self.output
+
+        Raises:
+            binascii.Error: caractère hors de l'alphabet base64
+        """
+        n = len(encoded)
+        self._reserve(n)
+        # Le dernier quartet (padding éventuel) passe par binascii, le reste en vectorisé
+        full = (n // 4 - 1) * 4 if n % 4 == 0 and n >= 4 else (n // 4) * 4
+        quartets = full // 4
+        if quartets:
+            pairs = self._pairs[:quartets * 2]
+            # np.take convertit ses indices en intp et, en mode "raise", bufferise out:
+            # conversion explicite dans un buffer préalloué + mode "clip" pour n'allouer rien
+            index = self._index[:quartets * 2]
+            np.copyto(index, np.frombuffer(encoded, dtype="<u2", count=quartets * 2))
+            np.take(_PAIR_TABLE, index, out=pairs, mode="clip")
+            if pairs.max() >= _INVALID:
+                raise binascii.Error("Caractère hors de l'alphabet base64")
+            p = pairs.reshape(-1, 2)
+            out = self._out[:quartets * 3].reshape(-1, 3)
+            tmp, tmp2 = self._tmp[:quartets], self._tmp2[:quartets]
+            np.right_shift(p[:, 0], 4, out=tmp)
+            out[:, 0] = tmp
+            np.bitwise_and(p[:, 0], 0xF, out=tmp)
+            np.left_shift(tmp, 4, out=tmp)
+            np.right_shift(p[:, 1], 8, out=tmp2)
+            np.bitwise_or(tmp, tmp2, out=tmp)
+            out[:, 1] = tmp
+            out[:, 2] = p[:, 1]  # Troncature uint16 -> uint8: garde les 8 bits de poids faible
+
+        size = quartets * 3
+        if full < n:
+            tail = binascii.a2b_base64(encoded[full:])
+            self.output[size:size + len(tail)] = tail
+            size += len(tail)
+        return size
+
+
+class AudioContentParser:
+    """
+    Parser incrémental du flux de réponse TTS (JSON ligne par ligne).
+
+    Ne construit aucun objet JSON: il cherche le champ "audioContent" (à
+    n'importe quel niveau d'imbrication) directement dans les octets reçus,
+    décode la valeur base64 dans un buffer réutilisé et produit des
+    memoryview. Un record coupé entre deux chunks réseau est conservé jusqu'au
+    chunk suivant.
+
+    Attention: chaque memoryview produite n'est valide que jusqu'à l'itération
+    suivante (le buffer est réutilisé). Copier avec bytes(view) pour la garder.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._decoder = Base64Decoder()
+        self.records = 0
+        self.skipped = 0
+
+    def feed(self, chunk):
+        """Ajoute un chunk réseau et produit l'audio des records complets."""
+        buf = self._buffer
+        buf += chunk
+        pos = 0
+        while True:
+            key = buf.find(_AUDIO_KEY, pos)
+            if key < 0:
+                # Garder une éventuelle clé coupée en fin de chunk
+                pos = max(pos, len(buf) - len(_AUDIO_KEY) + 1)
+                break
+            start = buf.find(b'"', key + len(_AUDIO_KEY))
+            if start < 0:
+                pos = key
+                break
+            end = buf.find(b'"', start + 1)
+            if end < 0:
+                pos = key
+                break
+            pos = end + 1
+
+            with memoryview(buf) as view:
+                value = view[start + 1:end]
+                if buf.find(b"\\", start + 1, end) >= 0:
+                    # Échappements JSON (ex: "\/"): cas rare, chemin lent
+                    value = bytes(value).replace(b"\\", b"")
+                try:
+                    size = self._decoder.decode(value)
+                except (binascii.Error, ValueError):
+                    self.skipped += 1
+                    continue
+                finally:
+                    value = None
+            self.records += 1
+            yield memoryview(self._decoder.output)[:size]
+
+        if pos:
+            del buf[:pos]
+
+    def finish(self):
+        """Fin du flux: un record audio tronqué restant est compté comme ignoré."""
+        if self._buffer.find(_AUDIO_KEY) >= 0:
+            self.skipped += 1
+        self._buffer.clear()
@@ -0,0 +1,189 @@
+"""
+Authentification Inworld par token de session (JWT) rafraîchi en tâche de fond.
+
+Le secret ne sert qu'à l'endpoint de tokens: le token signé obtenu est mis en
+cache et un thread dédié le renouvelle refresh_margin_s avant son expiration.
+get_auth_header(), appelé à chaque requête TTS, ne fait que lire un header
+déjà prêt; il n'attend que si aucun token valide n'existe (premier appel
+avant start(), ou endpoint injoignable jusqu'à l'expiration). Ces attentes
+sont comptées.
+
+Réponse attendue de l'endpoint (POST, Basic key:secret):
+    {"token": "...", "type": "Bearer", "expirationTime": "2025-01-01T12:00:00Z"}
+expirationTime peut être remplacé par expires_in (secondes); à défaut, la
+claim exp du JWT est lue (sans vérification de signature: c'est le serveur
+qui la vérifie).
+"""
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from .inworld import InworldAuth
+from .resilience import InworldAPIError
+
+
+class TokenError(InworldAPIError):
+    """Aucun token valide n'a pu être obtenu."""
+
+
+def _jwt_exp(token: str):
+    """Claim exp (epoch) d'un JWT, None si illisible."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, ValueError, TypeError):
+        return None
+
+
+def _parse_expiry(body: dict, token: str) -> float:
+    """Expiration (epoch) d'une réponse de l'endpoint de tokens."""
+    if body.get("expires_in") is not None:
+        return time.time() + float(body["expires_in"])
+    if body.get("expirationTime"):
+        return datetime.fromisoformat(body["expirationTime"].replace("Z", "+00:00")).timestamp()
+    exp = _jwt_exp(token)
+    if exp is None:
+        raise TokenError("Réponse de l'endpoint de tokens sans expiration (expirationTime, expires_in ou exp)")
+    return exp
+
+
+class InworldTokenAuth:
+    """
+    Même interface que InworldAuth (get_auth_header), avec un header Bearer
+    obtenu d'un endpoint de tokens et renouvelé avant expiration.
+    """
+
+    def __init__(self, token_url: str, key=None, secret=None, refresh_margin_s: float = 60.0,
+                 timeout_s: float = 5.0, max_backoff_s: float = 30.0, session: requests.Session = None):
+        self.token_url = token_url
+        self._basic = InworldAuth(key, secret)  # Credentials de l'endpoint de tokens uniquement
+        self.refresh_margin_s = refresh_margin_s
+        self.timeout_s = timeout_s
+        self.max_backoff_s = max_backoff_s
+        self.session = session or requests.Session()
+        # Header prêt et son expiration (time.monotonic), remplacés ensemble par le thread de refresh
+        self._current = None
+        self._ready = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()  # start() peut être appelé par plusieurs requêtes à la fois
+        self.last_error = None
+        # Compteurs
+        self.refreshes = 0
+        self.failures = 0
+        self.waits = 0       # Requêtes qui ont dû attendre un token
+        self.wait_s = 0.0
+
+    def start(self):
+        """Obtient le premier token puis lance le rafraîchissement en tâche de fond."""
+        with self._start_lock:
+            if self._thread is not None:
+                return self
+            try:
+                self._refresh()
+            except (requests.RequestException, TokenError, ValueError) as e:
+                self._record_failure(e)  # Le thread réessaie; get_auth_header attendra
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="TokenRefresh")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._start_lock:
+            self._stop_event.set()
+            with self._ready:
+                self._ready.notify_all()
+            if self._thread is not None:
+                self._thread.join(timeout=2.0)
+                self._thread = None
+
+    def _fetch(self):
+        """Un appel à l'endpoint de tokens. Retourne (header, expiration monotonic)."""
+        response = self.session.post(self.token_url, headers=self._basic.get_auth_header(), json={},
+                                     timeout=self.timeout_s)
+        if response.status_code != 200:
+            raise TokenError(f"Endpoint de tokens: HTTP {response.status_code} {response.text[:200]}")
+        body = response.json()
+        token = body.get("token")
+        if not token:
+            raise TokenError("Réponse de l'endpoint de tokens sans champ token")
+        remaining = _parse_expiry(body, token) - time.time()
+        if remaining <= 0:
+            raise TokenError("Token déjà expiré (horloge locale décalée ?)")
+        header = {"Authorization": f"{body.get('type') or 'Bearer'} {token}"}
+        return header, time.monotonic() + remaining
+
+    def _refresh(self):
+        current = self._fetch()
+        with self._ready:
+            self._current = current
+            self.refreshes += 1
+            self.last_error = None
+            self._ready.notify_all()
+
+    def _record_failure(self, error):
+        self.failures += 1
+        self.last_error = error
+        print(f"[AUTH] Échec du renouvellement du token: {error}")
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            current = self._current
+            if current is not None:
+                lifetime = current[1] - time.monotonic()
+                # Renouvellement à refresh_margin_s de l'expiration (au plus tard à mi-vie pour un token court)
+                wait = max(0.0, lifetime - min(self.refresh_margin_s, lifetime / 2))
+                if self._stop_event.wait(wait):
+                    return
+            try:
+                self._refresh()
+                backoff = 1.0
+            except (requests.RequestException, TokenError, ValueError) as e:
+                self._record_failure(e)
+                if self._stop_event.wait(backoff):
+                    return
+                backoff = min(backoff * 2, self.max_backoff_s)
+
+    def seconds_left(self) -> float:
+        current = self._current
+        return max(0.0, current[1] - time.monotonic()) if current else 0.0
+
+    def get_auth_header(self, timeout_s: float = None):
+        """Header du token courant; n'attend que si aucun token valide n'est prêt."""
+        current = self._current
+        if current is not None and current[1] > time.monotonic():
+            return dict(current[0])  # Copie: l'appelant y ajoute ses headers
+        if self._thread is None:
+            self.start()
+        start = time.monotonic()
+        deadline = start + (timeout_s if timeout_s is not None else self.timeout_s * 2)
+        with self._ready:
+            while not self._stop_event.is_set():
+                current = self._current
+                now = time.monotonic()
+                if current is not None and current[1] > now:
+                    break
+                if now >= deadline:
+                    current = None
+                    break
+                self._ready.wait(deadline - now)
+        self.waits += 1
+        self.wait_s += time.monotonic() - start
+        if current is None or current[1] <= time.monotonic():
+            raise TokenError(f"Aucun token valide ({self.last_error or 'délai dépassé'})")
+        return dict(current[0])
+
+
+def create_auth(token_url: str = None):
+    """InworldTokenAuth si un endpoint de tokens est configuré (argument ou INWORLD_TOKEN_URL), sinon Basic."""
+    token_url = token_url or os.getenv("INWORLD_TOKEN_URL")
+    if token_url:
+        return InworldTokenAuth(token_url)
+    return InworldAuth()
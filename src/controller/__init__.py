@@ -1 +1,2 @@
-from .orchestrator import VoiceChangerOrchestrator, PipelineConfig, PipelineState
+from .orchestrator import VoiceChangerOrchestrator, PipelineConfig, PipelineState, StateSnapshot
+from .events import EventBus, LatencyTrace, PipelineError, StateChanged, Transcript
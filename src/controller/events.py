@@ -0,0 +1,176 @@
+"""
+Bus d'événements du pipeline: changements d'état, transcriptions, erreurs et
+traces de latence, livrés de façon asynchrone aux abonnés (UI, logs...).
+
+publish() ne fait qu'empiler l'événement dans une SimpleQueue (opération C,
+sans verrou Python ni code utilisateur): son coût est constant quels que
+soient le nombre et la lenteur des abonnés, il peut donc être appelé depuis
+le callback de capture. Un thread de dispatch recopie chaque événement dans
+la queue bornée de chaque abonné (PolicyQueue drop-oldest: un abonné lent
+perd ses plus vieux événements, comptés dans dropped), et chaque abonné à
+callback a son propre thread de livraison.
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Tuple
+
+from .queues import OverloadPolicy, PolicyQueue
+
+
+@dataclass(frozen=True)
+class StateChanged:
+    old: Any  # PipelineState
+    new: Any
+    at: float = field(default_factory=time.monotonic)
+
+
+@dataclass(frozen=True)
+class Transcript:
+    text: str
+    stt_s: float
+    engine: Optional[str] = None  # Moteur retenu en cascade
+    at: float = field(default_factory=time.monotonic)
+
+
+@dataclass(frozen=True)
+class PipelineError:
+    stage: str  # "processing", "tts"...
+    error: Exception
+    at: float = field(default_factory=time.monotonic)
+
+
+@dataclass(frozen=True)
+class LatencyTrace:
+    stage: str  # "stt", "tts", "coalesce"
+    seconds: float
+    at: float = field(default_factory=time.monotonic)
+
+
+class Subscription:
+    """
+    Abonné du bus: queue bornée d'événements, vidée par callback (thread
+    dédié) ou par get() (mode pull).
+    """
+
+    def __init__(self, name: str, maxsize: int, types: Tuple[type, ...] = None,
+                 callback: Callable[[Any], None] = None):
+        self.name = name
+        self.types = types
+        self.callback = callback
+        self.queue = PolicyQueue(f"events:{name}", maxsize=maxsize, policy=OverloadPolicy.DROP_OLDEST)
+        self.errors = 0  # Exceptions levées par le callback
+        self._thread = None
+        self._closed = threading.Event()
+
+    @property
+    def dropped(self) -> int:
+        return self.queue.dropped_oldest
+
+    def wants(self, event) -> bool:
+        return self.types is None or isinstance(event, self.types)
+
+    def get(self, timeout: Optional[float] = None):
+        """Prochain événement (mode pull). Lève queue.Empty si aucun avant timeout."""
+        return self.queue.get(timeout)
+
+    def _start(self):
+        if self.callback is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name=f"Events-{self.name}")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                event = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+            try:
+                self.callback(event)
+            except Exception as e:
+                self.errors += 1
+                print(f"[EVENTS] Erreur de l'abonné '{self.name}': {e}")
+
+    def _close(self, timeout: float):
+        """Laisse le thread de livraison vider la queue, au plus timeout secondes."""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class EventBus:
+    """Bus d'événements à publication non bloquante (voir docstring du module)."""
+
+    _STOP = object()
+
+    def __init__(self):
+        self._inbox = queue.SimpleQueue()
+        self._subscribers = ()  # Tuple remplacé en bloc (copy-on-write): lu sans verrou
+        self._subscribe_lock = threading.Lock()
+        self._thread = None
+        self.published = 0
+
+    def subscribe(self, callback: Callable[[Any], None] = None, types=None, maxsize: int = 256,
+                  name: str = None) -> Subscription:
+        """
+        Abonne callback (appelé depuis un thread dédié) ou, sans callback,
+        retourne une Subscription à vider avec get().
+
+        Args:
+            types: Classe ou tuple de classes d'événements reçus (None = tous)
+            maxsize: Événements en attente au-delà desquels les plus anciens sont jetés
+        """
+        if types is not None and not isinstance(types, tuple):
+            types = (types,)
+        with self._subscribe_lock:
+            subscription = Subscription(name or f"sub{len(self._subscribers) + 1}", maxsize, types, callback)
+            self._subscribers = self._subscribers + (subscription,)
+        if self._thread is not None:
+            subscription._start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._subscribe_lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+        subscription._close(timeout=0.5)
+
+    def publish(self, event):
+        """Publie sans bloquer ni prendre de verrou (sûr depuis le callback de capture)."""
+        if self._subscribers:
+            self.published += 1
+            self._inbox.put(event)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, daemon=True, name="EventBus")
+            self._thread.start()
+            for subscription in self._subscribers:
+                subscription._start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        """Livre les événements déjà publiés (au plus timeout secondes par abonné) puis arrête les threads."""
+        if self._thread is None:
+            return
+        self._inbox.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        for subscription in self._subscribers:
+            subscription._close(timeout)
+
+    def _dispatch(self):
+        while True:
+            event = self._inbox.get()
+            if event is self._STOP:
+                return
+            for subscription in self._subscribers:
+                if subscription.wants(event):
+                    subscription.queue.put(event)
+
+    def dropped(self) -> dict:
+        """Événements jetés par abonné (queue pleine)."""
+        return {s.name: s.dropped for s in self._subscribers}
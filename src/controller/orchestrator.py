@@ -3,9 +3,24 @@ import queue
 import time
 import sys
 from enum import Enum, auto
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Callable
 
+from core.audio_backends import AudioBufferConfig, create_audio_backend
+from core.flight_recorder import (FLAG_FINAL, FLAG_GATED, FLAG_SPEECH, FRAME, TRANSCRIPT, TTS_AUDIO, UTTERANCE,
+                                  FlightRecorder)
+from core.metrics import MetricsRegistry, MetricsServer
+from .events import EventBus, LatencyTrace, PipelineError, StateChanged, Transcript
+from .queues import OverloadPolicy, PolicyQueue, merge_utterances, merge_audio_chunks
+
+
+# Liste de mots/bruits parasites à ignorer après STT
+NOISE_WORDS = frozenset({
+    "hum", "euh", "ah", "oh", "hein", "hmm", "mm", "mh",
+    "oui", "non", "ok", "ouais", "bah", "ben", "eh",
+    "the", "a", "i", "you", "it", "is", "and"
+})
+
 
 class PipelineState(Enum):
     IDLE = auto()
@@ -16,27 +31,106 @@ class PipelineState(Enum):
     STOPPING = auto()
 
 
+@dataclass(frozen=True)
+class StateSnapshot:
+    """État courant, immuable: remplacé en bloc à chaque transition, lu sans verrou."""
+    state: PipelineState
+    since: float    # time.monotonic() d'entrée dans l'état
+    seconds: dict   # Temps cumulé par état avant since (copié à chaque transition, jamais modifié)
+
+
 @dataclass
 class PipelineConfig:
     """Configuration du pipeline voice changer."""
     input_device: Optional[int] = None
     output_device: Optional[int] = None
+    # Backend audio (pyaudio, numpy, file, null) et ses réglages de latence
+    audio_backend: str = "pyaudio"
+    audio_latency: str = "low"       # "low", "high" ou secondes
+    output_buffer_ms: int = 20
+    input_file: Optional[str] = None   # Backend file: WAV ou "-" (PCM brut sur stdin)
+    output_file: Optional[str] = None  # Backend file: WAV ou "-" (PCM brut sur stdout)
+    # Sorties supplémentaires (casque de retour...): [(device_index, gain)]. Si
+    # non vide, la voix part en parallèle vers output_device et ces sorties,
+    # chacune avec son thread, son buffer de gigue et son gain.
+    monitor_devices: list = field(default_factory=list)
+    output_gain: float = 1.0
+    jitter_buffer_ms: int = 0
+    monitor_max_buffer_s: float = 10.0
     voice_id: str = ""
     # STT config
     stt_engine: str = "vosk"  # "vosk", "whisper" ou "windows"
     vosk_model_path: str = "models/vosk-model-small-fr-0.22"
+    # Grammaire Vosk (phrases autorisées): décodage contraint ("grammar"), ou
+    # contraint puis ouvert si la confiance est basse ("hybrid")
+    vosk_grammar_path: Optional[str] = None
+    vosk_grammar_mode: str = "hybrid"
+    vosk_min_confidence: float = 0.6
     whisper_model: str = "base"  # "tiny", "base", "small", "medium"
+    # Réglages CPU de Whisper calibrés par calibrate-whisper (None = WHISPER_PROFILE
+    # ou whisper_profile.json), et CPUs gardés à la capture audio (None = profil)
+    whisper_profile_path: Optional[str] = None
+    stt_reserve_cpus: Optional[int] = None
+    # Cascade STT: moteur rapide ("vosk" ou "whisper-tiny") en parallèle ou en
+    # secours du moteur principal, résultat retenu selon une deadline par utterance
+    stt_fast_engine: Optional[str] = None
+    stt_deadline_s: float = 0.8
+    stt_cascade_mode: str = "parallel"  # "parallel" ou "fallback"
     language: str = "fr"
-    sample_rate: int = 48000
+    # Sample rates (None = négocié au démarrage): capture au plus bas rate que
+    # le micro et le VAD acceptent au-dessus du besoin STT (16kHz), TTS et
+    # lecture au rate natif de la sortie. Rééchantillonnage seulement si écart.
+    sample_rate: Optional[int] = None
+    output_sample_rate: Optional[int] = None
     chunk_ms: int = 20
     # Paramètres VAD
     vad_aggressiveness: int = 0  # Plus agressif pour filtrer le bruit
-    min_speech_ms: int = 300     # Minimum 300ms de parole (évite les clics)
+    min_speech_ms: int = 0       # Tour abandonné sous ce total de parole (0 = aucun, voir sweep-endpointing)
     min_silence_ms: int = 600    # 600ms de silence pour détecter fin de phrase
     padding_ms: int = 200
+    # Durée max d'un segment envoyé au STT (0 = illimité): un tour plus long est
+    # découpé au creux d'énergie des split_search_ms précédant la limite
+    max_utterance_s: float = 10.0
+    split_search_ms: int = 1500
+    # Rattrapage du retard de lecture: au-delà de target_lag_s d'audio non joué,
+    # speakingRate et compression temporelle montent jusqu'à leur max (1.0 = désactivé)
+    target_lag_s: float = 2.0
+    max_speaking_rate: float = 1.0
+    max_time_compression: float = 1.0
+    # Regroupement des transcriptions rapprochées en une requête TTS (0 = désactivé):
+    # attente de la suivante pendant la fenêtre, ou tant que l'utilisateur parle,
+    # sans dépasser coalesce_max_delay_s de délai ajouté
+    coalesce_window_s: float = 0.0
+    coalesce_max_delay_s: float = 1.5
+    # Pré-filtre acoustique avant STT (0 = désactivé, seuil à choisir avec eval-prefilter)
+    prefilter_threshold: float = 0.0
     # Push-to-Talk
     push_to_talk: bool = False
     push_to_talk_key: str = "space"  # space, f1, f2, f3, f4, ctrl_r, caps_lock
+    # Queues et politiques de surcharge (drop-oldest, drop-newest, merge, shed-stale;
+    # block pour la queue de lecture uniquement: le callback de capture ne doit jamais attendre)
+    audio_queue_size: int = 5
+    audio_queue_policy: str = "drop-newest"
+    tts_queue_size: int = 50
+    tts_queue_policy: str = "block"
+    stale_deadline_s: float = 8.0  # Âge max d'un élément en mode shed-stale
+    # Client Inworld: deadlines, retries, hedging
+    tts_connect_timeout_s: float = 3.0
+    tts_first_byte_timeout_s: float = 5.0
+    tts_total_timeout_s: float = 15.0
+    tts_max_attempts: int = 3
+    tts_hedge: bool = False
+    tts_encoding: str = "LINEAR16"  # LINEAR16, OGG_OPUS ou MP3 (décodé localement via ffmpeg)
+    tts_stream: bool = False        # Lecture dès le premier chunk (endpoint voice:stream)
+    # Endpoint Prometheus local (None = désactivé)
+    metrics_port: Optional[int] = None
+    # Enregistreur de vol: anneau mappé des frames, énoncés, transcriptions et audio TTS (None = désactivé)
+    flight_recorder_path: Optional[str] = None
+    flight_recorder_mb: int = 64
+    # Banque de phrases pré-rendues: CSV/JSONL (text, hotkey), pack mappé
+    # reconstruit si la voix, le modèle ou la liste change (None = désactivée)
+    phrases_path: Optional[str] = None
+    phrase_pack_path: Optional[str] = None  # None = même nom que phrases_path, extension .pack
 
 
 class VoiceChangerOrchestrator:
@@ -45,13 +139,22 @@ class VoiceChangerOrchestrator:
 
     Modèle de threading:
     - Thread principal: Contrôle, gestion utilisateur
-    - Thread PyAudio: Callback capture micro
+    - Thread capture: Callback du backend audio (PortAudio ou fichier)
     - Thread Processing: Transcription STT + appel TTS
     - Thread Playback: Lecture audio vers sortie
 
     Communication:
     - audio_queue: Utterances depuis VAD -> Processing
     - tts_queue: Chunks audio TTS -> Playback
+
+    Les deux queues sont des PolicyQueue: un put() ne bloque jamais, la
+    politique configurée décide quoi jeter quand la queue est pleine.
+
+    L'état courant est un StateSnapshot lu sans verrou; _state_lock ne sert
+    qu'à sérialiser les transitions, et rien d'autre n'est fait sous ce
+    verrou. Les observateurs (UI, logs) s'abonnent à events, un EventBus
+    livré par des threads dédiés: un abonné lent ne ralentit jamais la
+    capture ni le processing.
     """
 
     # Mapping des noms de touches vers les objets pynput
@@ -68,44 +171,227 @@ class VoiceChangerOrchestrator:
     def __init__(self, config: PipelineConfig, auth):
         self.config = config
         self.auth = auth
-        self.state = PipelineState.IDLE
-        self._state_lock = threading.Lock()
+        self._snapshot = StateSnapshot(PipelineState.IDLE, time.monotonic(), {s.name: 0.0 for s in PipelineState})
+        self._state_lock = threading.Lock()  # Sérialise les transitions (jamais pris par les lecteurs)
+        self.events = EventBus()
 
         # Queues pour communication inter-threads
-        self.audio_queue = queue.Queue(maxsize=5)
-        self.tts_queue = queue.Queue(maxsize=50)
+        self.audio_queue = PolicyQueue(
+            "audio",
+            maxsize=config.audio_queue_size,
+            policy=OverloadPolicy(config.audio_queue_policy),
+            merge_fn=merge_utterances,
+            max_age_s=config.stale_deadline_s
+        )
+        self.tts_queue = PolicyQueue(
+            "tts",
+            maxsize=config.tts_queue_size,
+            policy=OverloadPolicy(config.tts_queue_policy),
+            merge_fn=merge_audio_chunks,
+            max_age_s=config.stale_deadline_s,
+            units=True  # None = fin d'utterance: jamais jeté, éviction par utterance entière
+        )
 
         # Composants (initialisés dans start())
+        self.audio_backend = None
         self.mic_capture = None
         self.vad = None
         self.utterance_buffer = None
+        self.prefilter = None
         self.stt_engine = None
         self.tts_client = None
         self.audio_output = None
+        self.pacing = None
+        self.coalescer = None
+        self.recorder = None
+        self.phrase_bank = None
 
         # Threads
         self._processing_thread = None
         self._playback_thread = None
         self._stop_event = threading.Event()
 
-        # Push-to-Talk
+        # Push-to-Talk et raccourcis de phrases (même listener clavier)
         self.ptt_enabled = config.push_to_talk
         self.ptt_active = False
         self._ptt_listener = None
-
-        # Callbacks optionnels
+        self._phrase_hotkeys = []  # [(touche pynput, index de phrase)]
+        self._phrase_plays = {"hotkey": 0, "transcript": 0}
+        # Phrases à jouer (index, déclencheur), mises en lecture par le thread de processing entre
+        # deux utterances: un clip n'est jamais intercalé dans l'audio d'une synthèse en cours
+        self._pending_phrases = queue.SimpleQueue()
+
+        # Télémétrie (compteurs mis à jour sans verrou depuis le hot path)
+        self.metrics = MetricsRegistry()
+        self._metrics_server = None
+        self._vad_frames = 0
+        self._vad_speech_frames = 0
+        self.stt_latency = self.metrics.histogram("stt_latency_seconds", "Durée de transcription par utterance")
+        self.tts_latency = self.metrics.histogram("tts_latency_seconds", "Durée de synthèse Inworld par utterance")
+        self.coalesce_delay = self.metrics.histogram("tts_coalesce_delay_seconds",
+                                                     "Délai ajouté par le regroupement des transcriptions")
+
+        # Callbacks optionnels, abonnés au bus d'événements au démarrage (appelés hors
+        # des threads du pipeline). Préférer events.subscribe() pour les événements typés.
         self.on_state_change: Optional[Callable[[PipelineState], None]] = None
         self.on_transcription: Optional[Callable[[str], None]] = None
         self.on_error: Optional[Callable[[Exception], None]] = None
 
+    @property
+    def state(self) -> PipelineState:
+        return self._snapshot.state
+
+    def snapshot(self) -> StateSnapshot:
+        """État courant et temps cumulés, cohérents entre eux, sans verrou."""
+        return self._snapshot
+
     def _set_state(self, new_state: PipelineState):
-        """Transition d'état thread-safe."""
+        """Transition d'état thread-safe, journalisée (pas depuis le callback de capture)."""
+        old_state = self._switch_state(new_state)
+        if self.recorder:
+            self.recorder.event(f"STATE {old_state.name} -> {new_state.name}")
+        print(f"[STATE] {old_state.name} -> {new_state.name}")
+
+    def _switch_state(self, new_state: PipelineState, expected: PipelineState = None) -> Optional[PipelineState]:
+        """
+        Remplace le snapshot (si l'état courant est expected, quand précisé) et
+        publie StateChanged. Coût constant, utilisable depuis le hot path.
+
+        Returns:
+            L'ancien état, None si la transition n'a pas eu lieu
+        """
         with self._state_lock:
-            old_state = self.state
-            self.state = new_state
-            if self.on_state_change:
-                self.on_state_change(new_state)
-            print(f"[STATE] {old_state.name} -> {new_state.name}")
+            old = self._snapshot
+            if expected is not None and old.state != expected:
+                return None
+            now = time.monotonic()
+            seconds = dict(old.seconds)
+            seconds[old.state.name] += now - old.since
+            self._snapshot = StateSnapshot(new_state, now, seconds)
+            # Sous le verrou: les événements sortent dans l'ordre des snapshots
+            # (publish ne fait qu'un put non bloquant, pas de risque d'interblocage)
+            self.events.publish(StateChanged(old.state, new_state, now))
+        return old.state
+
+    def _state_seconds_snapshot(self) -> dict:
+        """Temps cumulé par état, y compris l'état courant."""
+        snapshot = self._snapshot
+        seconds = dict(snapshot.seconds)
+        seconds[snapshot.state.name] += time.monotonic() - snapshot.since
+        return seconds
+
+    def _subscribe_callbacks(self):
+        """Abonne les callbacks on_* au bus: ils tournent dans leur propre thread."""
+        if self.on_state_change:
+            self.events.subscribe(lambda e: self.on_state_change(e.new), StateChanged, name="on_state_change")
+        if self.on_transcription:
+            self.events.subscribe(lambda e: self.on_transcription(e.text), Transcript, name="on_transcription")
+        if self.on_error:
+            self.events.subscribe(lambda e: self.on_error(e.error), PipelineError, name="on_error")
+
+    def _negotiate_sample_rates(self, manager, stt_rate: int, tts_rates):
+        """Fixe config.sample_rate (capture) et config.output_sample_rate (TTS/lecture) s'ils sont à None."""
+        config = self.config
+        if config.sample_rate is not None and config.output_sample_rate is not None:
+            return
+        try:
+            if config.sample_rate is None:
+                # Rates du VAD (8/16/32/48kHz) qui couvrent le besoin STT, du plus bas au plus haut
+                candidates = [r for r in (8000, 16000, 32000, 48000) if r >= stt_rate]
+                config.sample_rate = manager.negotiate_input_rate(config.input_device, candidates)
+            if config.output_sample_rate is None:
+                native = manager.native_output_rate(config.output_device)
+                # Inworld n'accepte pas tous les rates: sinon 48kHz, l'OS rééchantillonne
+                config.output_sample_rate = native if native in tts_rates else 48000
+        finally:
+            manager.terminate()
+
+        resample = "aucun" if config.sample_rate == stt_rate else f"{config.sample_rate} -> {stt_rate}Hz"
+        print(f"[ORCHESTRATOR] Sample rates: capture/VAD {config.sample_rate}Hz (rééchantillonnage STT: {resample}), "
+              f"TTS/lecture {config.output_sample_rate}Hz")
+
+    def _register_metrics(self):
+        """Déclare les métriques lues au scrape depuis les compteurs des composants."""
+        m = self.metrics
+        m.gauge("queue_depth", "Éléments en attente", {"queue": "audio"}, fn=self.audio_queue.qsize)
+        m.gauge("queue_depth", "Éléments en attente", {"queue": "tts"}, fn=self.tts_queue.qsize)
+        for q in (self.audio_queue, self.tts_queue):
+            m.counter_map(
+                "queue_overload_total", "Éléments jetés, fusionnés ou délestés par politique", "action",
+                fn=lambda q=q: {k: v for k, v in q.stats().items()
+                                if k in ("dropped_oldest", "dropped_newest", "merged", "shed")},
+                labels={"queue": q.name}
+            )
+        m.counter_map("state_seconds_total", "Temps passé dans chaque PipelineState", "state",
+                      fn=self._state_seconds_snapshot)
+        m.counter("events_published_total", "Événements publiés sur le bus", fn=lambda: self.events.published)
+        m.counter_map("events_dropped_total", "Événements jetés car la queue de l'abonné était pleine",
+                      "subscriber", fn=self.events.dropped)
+        m.counter("inworld_requests_total", "Requêtes TTS envoyées", fn=lambda: self.tts_client.request_count)
+        m.counter("inworld_bytes_received_total", "Octets reçus d'Inworld", fn=lambda: self.tts_client.bytes_received)
+        m.counter_map("inworld_http_errors_total", "Erreurs HTTP Inworld par code", "code",
+                      fn=lambda: dict(self.tts_client.http_errors))
+        m.counter("stt_skipped_total", "Utterances rejetées par le pré-filtre (inférences STT évitées)",
+                  fn=lambda: self.prefilter.rejected)
+        if hasattr(self.auth, "waits"):
+            m.counter("inworld_auth_waits_total", "Requêtes TTS qui ont attendu un token de session",
+                      fn=lambda: self.auth.waits)
+            m.counter("inworld_auth_wait_seconds_total", "Temps passé à attendre un token de session",
+                      fn=lambda: self.auth.wait_s)
+            m.counter("inworld_auth_refreshes_total", "Tokens de session obtenus", fn=lambda: self.auth.refreshes)
+            m.counter("inworld_auth_refresh_failures_total", "Échecs de renouvellement du token",
+                      fn=lambda: self.auth.failures)
+            m.gauge("inworld_auth_token_ttl_seconds", "Durée de validité restante du token courant",
+                    fn=self.auth.seconds_left)
+        m.counter("inworld_retries_total", "Nouvelles tentatives après erreur transitoire",
+                  fn=lambda: self.tts_client.retries)
+        m.counter("inworld_hedged_total", "Requêtes dupliquées (hedging)", fn=lambda: self.tts_client.hedged)
+        m.counter("inworld_hedge_wins_total", "Requêtes dupliquées arrivées en premier",
+                  fn=lambda: self.tts_client.hedge_wins)
+        m.counter("inworld_circuit_rejected_total", "Requêtes refusées par le circuit breaker",
+                  fn=lambda: self.tts_client.breaker.rejected)
+        m.gauge("inworld_circuit_open", "1 si le circuit breaker est ouvert",
+                fn=lambda: 1 if self.tts_client.breaker.state == "open" else 0)
+        if getattr(self.stt_engine, "mode", None) == "hybrid":
+            m.counter_map("stt_grammar_decodes_total", "Utterances Vosk retenues en contraint ou redécodées en ouvert",
+                          "result", fn=lambda: {"grammar": self.stt_engine.grammar_hits,
+                                                "fallback": self.stt_engine.fallbacks})
+        if hasattr(self.stt_engine, "wins"):
+            m.counter_map("stt_cascade_wins_total", "Utterances dont le résultat vient de chaque moteur", "engine",
+                          fn=lambda: {self.stt_engine.names[k]: v for k, v in self.stt_engine.wins.items()})
+            m.counter("stt_cascade_empty_total", "Utterances sans texte d'aucun moteur (hors victoires)",
+                      fn=lambda: self.stt_engine.empty)
+            m.counter("stt_cascade_deadline_misses_total", "Moteur précis sans résultat à la deadline",
+                      fn=lambda: self.stt_engine.deadline_misses)
+            m.counter("stt_cascade_saved_seconds_total", "Latence évitée quand le moteur rapide gagne",
+                      fn=lambda: self.stt_engine.saved_s)
+        m.counter("vad_frames_total", "Frames analysées par le VAD", fn=lambda: self._vad_frames)
+        m.counter("vad_speech_frames_total", "Frames classées parole", fn=lambda: self._vad_speech_frames)
+        m.gauge("vad_speech_ratio", "Proportion de frames parole",
+                fn=lambda: self._vad_speech_frames / self._vad_frames if self._vad_frames else 0.0)
+        m.counter("capture_overflows_total", "Overflows d'entrée PortAudio", fn=lambda: self.mic_capture.overflows)
+        m.counter("capture_underflows_total", "Underflows d'entrée PortAudio", fn=lambda: self.mic_capture.underflows)
+        m.counter("playback_underruns_total", "Trous de lecture au milieu d'un flux",
+                  fn=lambda: self.audio_output.underruns)
+        for sink in getattr(self.audio_output, "sinks", ()):
+            labels = {"sink": sink.name}
+            m.counter("playback_sink_underruns_total", "Trous de lecture par sortie", labels,
+                      fn=lambda sink=sink: sink.output.underruns)
+            m.counter("playback_sink_dropped_seconds_total", "Audio jeté par sortie trop lente", labels,
+                      fn=lambda sink=sink: sink.dropped_s)
+            m.gauge("playback_sink_drift_seconds", "Délai de lecture médian comparé à la sortie principale", labels,
+                    fn=lambda sink=sink: self.audio_output.sink_stats()[sink.name]["drift_s"])
+        m.gauge("playback_lag_seconds", "Audio TTS reçu mais pas encore joué", fn=lambda: self.pacing.lag_s)
+        m.gauge("tts_speaking_rate", "speakingRate demandé pour la prochaine synthèse",
+                fn=self.pacing.speaking_rate)
+        m.counter("playback_compressed_seconds_total", "Temps de lecture économisé par compression temporelle",
+                  fn=lambda: self.pacing.compressed_saved_s)
+        if self.coalescer:
+            m.counter("tts_coalesce_saved_total", "Requêtes TTS évitées par le regroupement des transcriptions",
+                      fn=lambda: self.coalescer.saved)
+        if self.phrase_bank:
+            m.counter_map("phrase_bank_plays_total", "Phrases pré-rendues jouées sans STT ni Inworld", "trigger",
+                          fn=lambda: dict(self._phrase_plays))
 
     def start(self):
         """Initialise tous les composants et démarre le pipeline."""
@@ -114,12 +400,25 @@ class VoiceChangerOrchestrator:
         import os
         sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-        from core.audio import MicCapture, AudioOutput
+        from core.audio import AudioDeviceManager, MicCapture, AudioOutput, FanOutOutput
         from processing.vad import VoiceActivityDetector, UtteranceBuffer
-        from processing.stt import create_stt_engine
-        from client.inworld import InworldTTSClient
+        from processing.prefilter import SpeechPreFilter
+        from processing.stt import STT_SAMPLE_RATE, create_stt_engine
+        from client.inworld import InworldTTSClient, SUPPORTED_SAMPLE_RATES
+        from client.resilience import Deadlines, RetryPolicy
+        from processing.pacing import AdaptiveRateController
+        from processing.coalesce import TranscriptCoalescer
 
         print("[ORCHESTRATOR] Initialisation des composants...")
+        if hasattr(self.auth, "start"):
+            # Token de session obtenu avant la première requête, puis renouvelé en tâche de fond
+            self.auth.start()
+        self.audio_backend = create_audio_backend(
+            self.config.audio_backend,
+            self._audio_buffers(),
+            **self._audio_backend_options()
+        ).acquire()  # Un seul runtime hôte pour la négociation, la capture et la lecture
+        self._negotiate_sample_rates(AudioDeviceManager(self.audio_backend), STT_SAMPLE_RATE, SUPPORTED_SAMPLE_RATES)
 
         # Initialiser les composants
         self.vad = VoiceActivityDetector(
@@ -130,31 +429,107 @@ class VoiceChangerOrchestrator:
             min_speech_ms=self.config.min_speech_ms,
             min_silence_ms=self.config.min_silence_ms,
             padding_ms=self.config.padding_ms,
-            chunk_ms=self.config.chunk_ms
+            chunk_ms=self.config.chunk_ms,
+            max_utterance_ms=self.config.max_utterance_s * 1000 or None,
+            split_search_ms=self.config.split_search_ms
+        )
+        self.pacing = AdaptiveRateController(
+            target_lag_s=self.config.target_lag_s,
+            max_speaking_rate=self.config.max_speaking_rate,
+            max_compression=self.config.max_time_compression
+        )
+        if self.config.coalesce_window_s > 0:
+            self.coalescer = TranscriptCoalescer(self.config.coalesce_window_s, self.config.coalesce_max_delay_s)
+        self.prefilter = SpeechPreFilter(
+            sample_rate=self.config.sample_rate,
+            frame_ms=self.config.chunk_ms,
+            threshold=self.config.prefilter_threshold
         )
 
         # Créer le moteur STT selon la config
-        print(f"[ORCHESTRATOR] Chargement du moteur STT: {self.config.stt_engine}")
+        print(f"[ORCHESTRATOR] Chargement du moteur STT: {self.config.stt_engine}"
+              + (f" + {self.config.stt_fast_engine} (cascade {self.config.stt_cascade_mode}, "
+                 f"deadline {self.config.stt_deadline_s}s)" if self.config.stt_fast_engine else ""))
         self.stt_engine = create_stt_engine(
             engine_type=self.config.stt_engine,
             model_path=self.config.vosk_model_path,
+            grammar_path=self.config.vosk_grammar_path,
+            grammar_mode=self.config.vosk_grammar_mode,
+            grammar_min_confidence=self.config.vosk_min_confidence,
             model_name=self.config.whisper_model,
             language=self.config.language,
-            input_sample_rate=self.config.sample_rate
+            input_sample_rate=self.config.sample_rate,
+            fast_engine=self.config.stt_fast_engine,
+            deadline_s=self.config.stt_deadline_s,
+            cascade_mode=self.config.stt_cascade_mode,
+            profile_path=self.config.whisper_profile_path,
+            reserve_cpus=self.config.stt_reserve_cpus
         )
         print(f"[ORCHESTRATOR] Moteur STT chargé.")
 
-        self.tts_client = InworldTTSClient(self.auth)
+        self.tts_client = InworldTTSClient(
+            self.auth,
+            deadlines=Deadlines(
+                connect_s=self.config.tts_connect_timeout_s,
+                first_byte_s=self.config.tts_first_byte_timeout_s,
+                total_s=self.config.tts_total_timeout_s
+            ),
+            retry=RetryPolicy(max_attempts=self.config.tts_max_attempts),
+            hedge=self.config.tts_hedge,
+            audio_encoding=self.config.tts_encoding,
+            sample_rate=self.config.output_sample_rate
+        )
+
+        if self.config.phrases_path:
+            from core.phrase_bank import open_phrase_bank
+
+            # Synthèse des phrases manquantes au rate de lecture négocié, avant toute capture
+            self.phrase_bank = open_phrase_bank(self.config.phrases_path, self.config.phrase_pack_path,
+                                                self.tts_client, self.config.voice_id)
+            self._phrase_hotkeys = [(self._resolve_hotkey(name), index)
+                                    for name, index in self.phrase_bank.hotkeys().items()]
+            print(f"[PHRASES] {len(self.phrase_bank.phrases)} phrases pré-rendues, "
+                  f"{len(self._phrase_hotkeys)} raccourcis ({self.phrase_bank.path})")
 
         self.mic_capture = MicCapture(
             device_index=self.config.input_device,
             sample_rate=self.config.sample_rate,
-            chunk_ms=self.config.chunk_ms
-        )
-        self.audio_output = AudioOutput(
-            device_index=self.config.output_device,
-            sample_rate=self.config.sample_rate
+            chunk_ms=self.config.chunk_ms,
+            backend=self.audio_backend
         )
+        if self.config.monitor_devices:
+            sinks = [("principale", self.config.output_device, self.config.output_gain)]
+            sinks += [(f"retour{i}", device, gain) for i, (device, gain) in enumerate(self.config.monitor_devices, 1)]
+            self.audio_output = FanOutOutput(
+                sinks,
+                sample_rate=self.config.output_sample_rate,
+                backend=self.audio_backend,
+                jitter_ms=self.config.jitter_buffer_ms,
+                max_buffer_s=self.config.monitor_max_buffer_s
+            )
+            print(f"[ORCHESTRATOR] Sorties: " + ", ".join(f"{name} (device {device or 'défaut'}, gain {gain})"
+                                                        for name, device, gain in sinks))
+        else:
+            self.audio_output = AudioOutput(
+                device_index=self.config.output_device,
+                sample_rate=self.config.output_sample_rate,
+                backend=self.audio_backend
+            )
+
+        if self.config.flight_recorder_path:
+            self.recorder = FlightRecorder(self.config.flight_recorder_path, self.config.flight_recorder_mb).start(
+                capture_rate=self.config.sample_rate,
+                output_rate=self.config.output_sample_rate,
+                info={"stt": self.config.stt_engine, "vad_aggressiveness": self.config.vad_aggressiveness,
+                      "min_silence_ms": self.config.min_silence_ms, "padding_ms": self.config.padding_ms}
+            )
+            print(f"[RECORDER] Enregistreur de vol: {self.config.flight_recorder_path} "
+                  f"({self.config.flight_recorder_mb} Mo)")
+
+        self._register_metrics()
+        if self.config.metrics_port:
+            self._metrics_server = MetricsServer(self.metrics, self.config.metrics_port)
+            self._metrics_server.start()
 
         # Démarrer la sortie audio en premier
         self.audio_output.start()
@@ -170,9 +545,13 @@ class VoiceChangerOrchestrator:
         self._processing_thread.start()
         self._playback_thread.start()
 
-        # Démarrer le Push-to-Talk si activé
-        if self.ptt_enabled:
-            self._start_ptt_listener()
+        # Démarrer le listener clavier (Push-to-Talk et/ou raccourcis de phrases)
+        if self.ptt_enabled or self._phrase_hotkeys:
+            self._start_key_listener()
+
+        # Bus d'événements démarré avant la première transition
+        self._subscribe_callbacks()
+        self.events.start()
 
         # Démarrer la capture avec callback
         self._set_state(PipelineState.LISTENING)
@@ -185,37 +564,75 @@ class VoiceChangerOrchestrator:
         else:
             print("[ORCHESTRATOR] Pipeline démarré. Parlez dans le micro...")
 
+    def _audio_buffers(self) -> AudioBufferConfig:
+        """Réglages de buffers du backend audio, dérivés de la config."""
+        latency = self.config.audio_latency
+        try:
+            latency = float(latency)
+        except ValueError:
+            pass  # "low" / "high"
+        # UtteranceBuffer garde les frames d'un tour jusqu'à max_utterance_s: au-delà
+        # de cette durée (plus une marge), le backend numpy peut réutiliser leur mémoire
+        lifetime = 0.0
+        if self.config.max_utterance_s:
+            lifetime = self.config.max_utterance_s + (self.config.padding_ms + self.config.min_silence_ms) / 1000 + 1.0
+        return AudioBufferConfig(
+            chunk_ms=self.config.chunk_ms,
+            output_buffer_ms=self.config.output_buffer_ms,
+            latency=latency,
+            frame_lifetime_s=lifetime
+        )
+
+    def _audio_backend_options(self) -> dict:
+        if self.config.audio_backend == "file":
+            return {"input_path": self.config.input_file, "output_path": self.config.output_file}
+        return {}
+
     def _audio_callback(self, frame_bytes: bytes):
         """
-        Appelé par PyAudio pour chaque chunk audio (20ms).
-        Exécuté dans le thread callback de PyAudio - doit être rapide!
+        Appelé par le backend audio pour chaque chunk audio (20ms).
+        Exécuté dans le thread callback de capture - doit être rapide!
         """
         if self._stop_event.is_set():
             return
 
+        recorder = self.recorder
         # Push-to-Talk : ignorer les frames si PTT activé mais touche non maintenue
         if self.ptt_enabled and not self.ptt_active:
+            if recorder:
+                recorder.record(FRAME, frame_bytes, FLAG_GATED, self.config.sample_rate)
             return
 
         # Détection VAD
         is_speech = self.vad.is_speech(frame_bytes)
+        self._vad_frames += 1
+        if is_speech:
+            self._vad_speech_frames += 1
+        if recorder:
+            recorder.record(FRAME, frame_bytes, FLAG_SPEECH if is_speech else 0, self.config.sample_rate)
 
-        # Mettre à jour l'état selon la détection
-        with self._state_lock:
-            if is_speech and self.state == PipelineState.LISTENING:
-                self.state = PipelineState.RECORDING
+        # Mettre à jour l'état selon la détection (lecture sans verrou, transition une fois par tour)
+        if is_speech and self._snapshot.state == PipelineState.LISTENING:
+            self._switch_state(PipelineState.RECORDING, expected=PipelineState.LISTENING)
 
         # Traiter via le buffer d'utterance
         utterance = self.utterance_buffer.process_frame(frame_bytes, is_speech)
 
         if utterance:
             # Utterance complète - envoyer à la queue de processing
-            try:
-                self.audio_queue.put_nowait(utterance)
-                with self._state_lock:
-                    self.state = PipelineState.PROCESSING
-            except queue.Full:
-                print("[WARN] Queue de processing pleine, utterance ignorée")
+            self._enqueue_utterance(utterance)
+
+    def _enqueue_utterance(self, utterance: bytes):
+        """Envoie une utterance au thread de processing selon la politique de la queue."""
+        if self.recorder:
+            final = getattr(utterance, "final", True)
+            self.recorder.record(UTTERANCE, utterance, FLAG_FINAL if final else 0, getattr(utterance, "index", 0))
+        if self.audio_queue.put(utterance):
+            # Segment intermédiaire d'un tour découpé: l'utilisateur parle toujours
+            if getattr(utterance, "final", True):
+                self._switch_state(PipelineState.PROCESSING)
+        else:
+            print("[WARN] Queue de processing pleine, utterance ignorée")
 
     def _resolve_ptt_key(self):
         """Résout le nom de touche en objet pynput.keyboard.Key."""
@@ -237,22 +654,41 @@ class VoiceChangerOrchestrator:
             )
         return key_mapping[key_name]
 
-    def _start_ptt_listener(self):
-        """Démarre le listener clavier pour le push-to-talk."""
+    def _resolve_hotkey(self, name: str):
+        """Résout un raccourci de phrase: nom de touche pynput (f5, ctrl_r...) ou caractère."""
+        from pynput.keyboard import Key, KeyCode
+        if len(name) == 1:
+            return KeyCode.from_char(name)
+        key = getattr(Key, name.lower(), None)
+        if not isinstance(key, Key):
+            raise ValueError(f"Raccourci de phrase inconnu: '{name}' (nom de touche pynput ou caractère)")
+        return key
+
+    def _start_key_listener(self):
+        """Démarre le listener clavier pour le push-to-talk et les raccourcis de phrases."""
         from pynput import keyboard
 
-        target_key = self._resolve_ptt_key()
+        target_key = self._resolve_ptt_key() if self.ptt_enabled else None
+        held = set()  # Phrases dont la touche est maintenue: pas de relecture par répétition clavier
 
         def on_press(key):
-            if key == target_key and not self.ptt_active:
+            if target_key is not None and key == target_key and not self.ptt_active:
                 self.ptt_active = True
                 sys.stdout.write("[PTT] ")
                 sys.stdout.flush()
+            # KeyCode n'a pas un hash stable (vk présent ou non): comparaison directe
+            for hotkey, index in self._phrase_hotkeys:
+                if key == hotkey and index not in held:
+                    held.add(index)
+                    self._pending_phrases.put((index, "hotkey"))
 
         def on_release(key):
-            if key == target_key and self.ptt_active:
+            if target_key is not None and key == target_key and self.ptt_active:
                 self.ptt_active = False
                 self._on_ptt_release()
+            for hotkey, index in self._phrase_hotkeys:
+                if key == hotkey:
+                    held.discard(index)
 
         self._ptt_listener = keyboard.Listener(
             on_press=on_press,
@@ -266,85 +702,187 @@ class VoiceChangerOrchestrator:
         if self.utterance_buffer:
             utterance = self.utterance_buffer.force_finalize()
             if utterance:
-                try:
-                    self.audio_queue.put_nowait(utterance)
-                    with self._state_lock:
-                        self.state = PipelineState.PROCESSING
-                except queue.Full:
-                    print("[WARN] Queue de processing pleine, utterance ignorée")
+                self._enqueue_utterance(utterance)
+
+    def _play_phrase(self, index: int, trigger: str):
+        """
+        Met en lecture un clip du pack (vue sur le mapping, sans copie) suivi d'un marqueur de fin.
+        Appelé uniquement depuis le thread de processing, seul producteur de tts_queue.
+        """
+        clip = self.phrase_bank.clip(index)
+        self._phrase_plays[trigger] += 1
+        print(f"[PHRASES] {trigger}: '{self.phrase_bank.phrases[index]['text']}' "
+              f"({self.phrase_bank.duration(index):.1f}s)")
+        if not self.tts_queue.put(clip):
+            print("[WARN] Queue de lecture pleine, phrase ignorée")
+        self.tts_queue.put(None)
+
+    def _play_pending_phrases(self):
+        """Joue les phrases en attente (raccourcis clavier), chacune comme une unité complète."""
+        while True:
+            try:
+                index, trigger = self._pending_phrases.get_nowait()
+            except queue.Empty:
+                return
+            self._play_phrase(index, trigger)
 
     def _processing_loop(self):
         """
         Thread worker: Prend les utterances, exécute STT, envoie au TTS.
         """
+        # Avec des raccourcis, attente courte: une phrase demandée part sans attendre la prochaine utterance
+        timeout = 0.05 if self._phrase_hotkeys else 0.5
         while not self._stop_event.is_set():
+            self._play_pending_phrases()
             try:
-                utterance = self.audio_queue.get(timeout=0.5)
+                utterance, enqueued_at = self.audio_queue.get_entry(timeout=timeout)
             except queue.Empty:
                 continue
 
             try:
-                # Exécuter STT
-                print("\n" + "=" * 50)
-                print("[STT] Transcription en cours...")
-                start_time = time.time()
-                text = self.stt_engine.transcribe(utterance)
-                stt_time = time.time() - start_time
-                print(f"[STT] Résultat ({stt_time:.2f}s):")
-                print(f"")
-                print(f"    >>> {text} <<<")
-                print(f"")
-
-                if self.on_transcription:
-                    self.on_transcription(text)
-
-                # Filtrer les transcriptions inutiles
-                if not text or len(text.strip()) < 3:
-                    print("[STT] Transcription trop courte, ignorée")
-                    self._set_state(PipelineState.LISTENING)
+                text = self._transcribe(utterance)
+                if text is None:
+                    continue
+
+                # Délestage: l'utterance a trop attendu, la synthétiser ne ferait qu'ajouter du retard
+                if self.audio_queue.is_stale(enqueued_at):
+                    self.audio_queue.record_shed()
+                    print(f"[STT] Utterance périmée ({time.monotonic() - enqueued_at:.1f}s), TTS ignoré")
                     continue
 
-                # Liste de mots/bruits parasites à ignorer
-                noise_words = {
-                    "hum", "euh", "ah", "oh", "hein", "hmm", "mm", "mh",
-                    "oui", "non", "ok", "ouais", "bah", "ben", "eh",
-                    "the", "a", "i", "you", "it", "is", "and"
-                }
-                if text.lower().strip() in noise_words:
-                    print(f"[STT] Bruit parasite ignoré: '{text}'")
-                    self._set_state(PipelineState.LISTENING)
+                # Phrase du pack prononcée telle quelle: clip pré-rendu, pas d'appel Inworld
+                phrase = self.phrase_bank.match(text) if self.phrase_bank else None
+                if phrase is not None:
+                    self._play_phrase(phrase, "transcript")
                     continue
 
+                # Regroupement avec les transcriptions qui suivent de près (une requête au lieu de plusieurs)
+                if self.coalescer:
+                    merged, delay = self.coalescer.collect(text, self._next_transcript,
+                                                           lambda: self.utterance_buffer.triggered or self.ptt_active)
+                    self.coalesce_delay.observe(delay)
+                    self.events.publish(LatencyTrace("coalesce", delay))
+                    if merged != text:
+                        print(f"[COALESCE] Transcriptions regroupées (+{delay * 1000:.0f}ms): '{merged}'")
+                    text = merged
+
                 # Envoyer au TTS (non-streaming pour plus de fiabilité)
                 self._set_state(PipelineState.STREAMING)
-                print(f"[TTS] Envoi à Inworld: '{text}'")
+                self.pacing.observe(self._playback_lag())
+                speaking_rate = self.pacing.speaking_rate()
+                if speaking_rate > 1.0:
+                    print(f"[TTS] Envoi à Inworld (retard {self.pacing.lag_s:.1f}s, speakingRate {speaking_rate}): '{text}'")
+                else:
+                    print(f"[TTS] Envoi à Inworld: '{text}'")
 
                 start_time = time.time()
                 try:
-                    # Mode non-streaming (plus fiable)
-                    audio_data = self.tts_client.synthesize(text, self.config.voice_id, stream=False)
-                    ttfb = time.time() - start_time
-                    print(f"[TTS] Audio reçu ({ttfb:.2f}s) - {len(audio_data)} bytes")
-
-                    if audio_data:
-                        self.tts_queue.put(audio_data)
+                    if self.config.tts_stream:
+                        self._synthesize_streaming(text, start_time, speaking_rate)
                     else:
-                        print("[TTS] Aucune donnée audio reçue!")
+                        # Mode non-streaming (plus fiable)
+                        audio_data = self.tts_client.synthesize(text, self.config.voice_id, stream=False,
+                                                                speaking_rate=speaking_rate)
+                        ttfb = time.time() - start_time
+                        self.tts_latency.observe(ttfb)
+                        self.events.publish(LatencyTrace("tts", ttfb))
+                        print(f"[TTS] Audio reçu ({ttfb:.2f}s) - {len(audio_data)} bytes")
+
+                        if audio_data:
+                            if not self.tts_queue.put(audio_data):
+                                print("[WARN] Queue de lecture pleine, audio ignoré")
+                        else:
+                            print("[TTS] Aucune donnée audio reçue!")
 
                 except Exception as tts_error:
                     print(f"[TTS] Erreur: {tts_error}")
+                    self.events.publish(PipelineError("tts", tts_error))
 
                 # Marqueur de fin de stream
                 self.tts_queue.put(None)
 
             except Exception as e:
                 print(f"[ERROR] Échec du processing: {e}")
-                if self.on_error:
-                    self.on_error(e)
+                self.events.publish(PipelineError("processing", e))
 
             finally:
                 self._set_state(PipelineState.LISTENING)
 
+    def _transcribe(self, utterance) -> Optional[str]:
+        """Pré-filtre puis STT d'une utterance. Retourne None si elle est ignorée (bruit, trop courte)."""
+        # Pré-filtre acoustique: pas d'inférence STT pour un bruit évident
+        if not self.prefilter.is_speech(utterance):
+            print(f"[PREFILTER] Bruit non-vocal ignoré ({self.prefilter.rejected} inférences évitées)")
+            return None
+
+        # Exécuter STT
+        print("\n" + "=" * 50)
+        if getattr(utterance, "index", 0) or not getattr(utterance, "final", True):
+            part = "fin" if utterance.final else "suite"
+            print(f"[STT] Tour {utterance.turn}, segment {utterance.index + 1} ({part}, "
+                  f"{len(utterance) / 2 / self.config.sample_rate:.1f}s)")
+        print("[STT] Transcription en cours...")
+        start_time = time.time()
+        text = self.stt_engine.transcribe(utterance)
+        stt_time = time.time() - start_time
+        self.stt_latency.observe(stt_time)
+        self.events.publish(LatencyTrace("stt", stt_time))
+        if self.recorder:
+            self.recorder.record(TRANSCRIPT, text.encode("utf-8"))
+        winner = getattr(self.stt_engine, "last_winner", None)
+        print(f"[STT] Résultat ({stt_time:.2f}s{', ' + winner if winner else ''}):")
+        print(f"")
+        print(f"    >>> {text} <<<")
+        print(f"")
+
+        self.events.publish(Transcript(text, stt_time, winner))
+
+        # Filtrer les transcriptions inutiles
+        if not text or len(text.strip()) < 3:
+            print("[STT] Transcription trop courte, ignorée")
+            return None
+
+        if text.lower().strip() in NOISE_WORDS:
+            print(f"[STT] Bruit parasite ignoré: '{text}'")
+            return None
+        return text
+
+    def _next_transcript(self, timeout: float) -> Optional[str]:
+        """
+        Transcription de la prochaine utterance de la queue (queue.Empty si aucune avant timeout),
+        avec les mêmes règles que _processing_loop: None si elle est filtrée, périmée ou si c'est
+        une phrase du pack (jouée après le texte regroupé, sans être fusionnée avec lui).
+        """
+        utterance, enqueued_at = self.audio_queue.get_entry(timeout=timeout)
+        text = self._transcribe(utterance)
+        if text is None:
+            return None
+        if self.audio_queue.is_stale(enqueued_at):
+            self.audio_queue.record_shed()
+            print(f"[STT] Utterance périmée ({time.monotonic() - enqueued_at:.1f}s), TTS ignoré")
+            return None
+        phrase = self.phrase_bank.match(text) if self.phrase_bank else None
+        if phrase is not None:
+            self._pending_phrases.put((phrase, "transcript"))
+            return None
+        return text
+
+    def _synthesize_streaming(self, text: str, start_time: float, speaking_rate: float = 1.0):
+        """Mode streaming: chaque chunk PCM décodé part en lecture dès sa réception."""
+        total_bytes = 0
+        for pcm in self.tts_client.synthesize(text, self.config.voice_id, stream=True,
+                                              speaking_rate=speaking_rate):
+            if total_bytes == 0:
+                print(f"[TTS] Premier chunk ({time.time() - start_time:.2f}s)")
+            total_bytes += len(pcm)
+            # Le client réutilise son buffer de décodage: copie avant mise en queue
+            if not self.tts_queue.put(bytes(pcm)):
+                print("[WARN] Queue de lecture pleine, chunk ignoré")
+        elapsed = time.time() - start_time
+        self.tts_latency.observe(elapsed)
+        self.events.publish(LatencyTrace("tts", elapsed))
+        print(f"[TTS] Stream terminé ({elapsed:.2f}s) - {total_bytes} bytes")
+
     def _playback_loop(self):
         """
         Thread worker: Joue les chunks audio depuis la queue TTS.
@@ -353,25 +891,55 @@ class VoiceChangerOrchestrator:
             try:
                 chunk = self.tts_queue.get(timeout=0.5)
             except queue.Empty:
+                self.pacing.observe(self._playback_lag())
                 continue
 
             if chunk is None:
                 # Marqueur de fin de stream
                 print("[PLAYBACK] Fin du stream audio")
+                self.audio_output.mark_idle()
                 continue
 
             try:
+                # Retard au moment de jouer ce chunk (lui compris): accélérer s'il dépasse la cible
+                self.pacing.observe(self._playback_lag() + len(chunk) / 2 / self.config.output_sample_rate)
+                compressed = self.pacing.compress(chunk, self.config.output_sample_rate)
+                if len(compressed) < len(chunk):
+                    print(f"[PLAYBACK] Compression temporelle x{len(chunk) / len(compressed):.2f} "
+                          f"(retard {self.pacing.lag_s:.1f}s)")
+                    chunk = compressed
+                if self.recorder:
+                    self.recorder.record(TTS_AUDIO, chunk, aux=self.config.output_sample_rate)
                 print(f"[PLAYBACK] Lecture de {len(chunk)} bytes...")
                 self.audio_output.write(chunk)
                 print("[PLAYBACK] Lecture terminée")
             except Exception as e:
                 print(f"[ERROR] Échec playback: {e}")
 
+    def _playback_lag(self) -> float:
+        """Secondes d'audio TTS en file ou en cours de lecture, pas encore entendues."""
+        queued = self.tts_queue.sum_items(lambda chunk: len(chunk) if chunk else 0)
+        return queued / 2 / self.config.output_sample_rate + self.audio_output.pending_seconds()
+
+    def is_idle(self) -> bool:
+        """Rien en cours: en écoute, queues vides, plus d'audio à jouer."""
+        # empty() et non qsize(): un marqueur de fin encore en file compte (lecture pas terminée)
+        return (self.state == PipelineState.LISTENING and self.audio_queue.empty()
+                and self.tts_queue.empty() and self.audio_output.pending_seconds() == 0.0)
+
+    def queue_stats(self) -> dict:
+        """Compteurs de surcharge et profondeurs des queues du pipeline."""
+        return {
+            "audio": self.audio_queue.stats(),
+            "tts": self.tts_queue.stats(),
+        }
+
     def stop(self):
         """Arrête tous les composants et threads proprement."""
         print("[ORCHESTRATOR] Arrêt en cours...")
         self._set_state(PipelineState.STOPPING)
         self._stop_event.set()
+        self.tts_queue.close()  # Débloque le thread de processing en attente de place (politique block)
 
         if self._ptt_listener:
             self._ptt_listener.stop()
@@ -385,8 +953,46 @@ class VoiceChangerOrchestrator:
         if self._playback_thread and self._playback_thread.is_alive():
             self._playback_thread.join(timeout=2.0)
 
+        # Plus de transcription à venir: workers de la cascade libérés
+        if hasattr(self.stt_engine, "close"):
+            self.stt_engine.close()
+
         if self.audio_output:
             self.audio_output.stop()
 
+        if self.audio_backend:
+            self.audio_backend.release()
+
+        if self._metrics_server:
+            self._metrics_server.stop()
+
+        if hasattr(self.auth, "stop"):
+            self.auth.stop()
+            if self.auth.waits:
+                print(f"[AUTH] {self.auth.waits} requêtes ont attendu un token ({self.auth.wait_s:.2f}s au total)")
+
         self._set_state(PipelineState.IDLE)
+        self.events.stop()  # Livre les derniers événements (IDLE compris)
+
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+        if self.phrase_bank:
+            self.phrase_bank.close()
+
+        for stats in self.queue_stats().values():
+            print(
+                f"[QUEUE] {stats['name']} ({stats['policy']}): max {stats['max_depth']}/{stats['maxsize']}, "
+                f"put {stats['put']}, drop-oldest {stats['dropped_oldest']}, "
+                f"drop-newest {stats['dropped_newest']}, merge {stats['merged']}, shed {stats['shed']}"
+            )
+        if self.pacing:
+            self.pacing.report()
+        if self.coalescer:
+            self.coalescer.report()
+        if hasattr(self.stt_engine, "report"):
+            self.stt_engine.report()
+        if hasattr(self.audio_output, "report"):
+            self.audio_output.report()
         print("[ORCHESTRATOR] Arrêté.")
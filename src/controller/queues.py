@@ -0,0 +1,270 @@
+import collections
+import queue
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Optional
+
+from processing.vad import UtteranceSegment
+
+
+class OverloadPolicy(Enum):
+    """Comportement d'une queue du pipeline quand elle est pleine."""
+    DROP_OLDEST = "drop-oldest"   # Jette l'élément le plus ancien pour faire de la place
+    DROP_NEWEST = "drop-newest"   # Refuse le nouvel élément
+    MERGE = "merge"               # Fusionne le nouvel élément avec le plus récent en attente
+    SHED_STALE = "shed-stale"     # Comme drop-oldest, et jette les éléments trop vieux à la lecture
+    BLOCK = "block"               # Le producteur attend qu'une place se libère (backpressure)
+
+
+class PolicyQueue:
+    """
+    Queue bornée non bloquante en écriture, avec politique de surcharge.
+
+    Contrairement à queue.Queue, put() ne bloque pas le producteur (sauf
+    politique block): quand la queue est pleine, la politique décide quoi
+    jeter. Chaque élément est horodaté (time.monotonic) à l'insertion pour
+    permettre le délestage des éléments périmés.
+
+    Avec units=True, None est un marqueur de fin d'unité (fin d'utterance
+    dans la queue de lecture). Les marqueurs ne comptent pas dans maxsize et
+    ne sont jamais jetés, fusionnés ni délestés; l'éviction jette une unité
+    complète (ses chunks et son marqueur), jamais celle en cours de lecture.
+    Si aucune unité complète ne peut être jetée, le nouvel élément est refusé.
+
+    Compteurs exposés par stats(): put, dropped_oldest, dropped_newest,
+    merged, shed, ainsi que la profondeur courante et le maximum atteint.
+    """
+
+    def __init__(self, name: str, maxsize: int, policy: OverloadPolicy = OverloadPolicy.DROP_NEWEST,
+                 merge_fn: Optional[Callable[[Any, Any], Any]] = None,
+                 max_age_s: Optional[float] = None, units: bool = False):
+        """
+        Args:
+            name: Nom de la queue (logs et métriques)
+            maxsize: Nombre maximum d'éléments en attente (> 0)
+            policy: Politique appliquée quand la queue est pleine
+            merge_fn: Fonction (ancien, nouveau) -> fusionné, requise pour MERGE.
+                Peut retourner None si les deux éléments ne sont pas fusionnables,
+                auquel cas on retombe sur drop-oldest.
+            max_age_s: Âge maximum d'un élément (secondes) pour SHED_STALE
+            units: None délimite des unités (voir docstring de la classe)
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize doit être > 0")
+        if policy == OverloadPolicy.MERGE and merge_fn is None:
+            raise ValueError("La politique 'merge' nécessite une merge_fn")
+        if policy == OverloadPolicy.SHED_STALE and not max_age_s:
+            raise ValueError("La politique 'shed-stale' nécessite max_age_s")
+
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.merge_fn = merge_fn
+        self.max_age_s = max_age_s
+        self.units = units
+
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._markers = 0             # Marqueurs None en attente (units)
+        self._consumer_in_unit = False  # Le consommateur a commencé l'unité en tête de queue
+        self._closed = False
+
+        # Compteurs et jauges
+        self.put_count = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.merged = 0
+        self.shed = 0
+        self.max_depth = 0
+
+    def put(self, item) -> bool:
+        """
+        Ajoute un élément sans jamais bloquer.
+
+        Returns:
+            True si l'élément (ou sa fusion) est en queue, False s'il a été refusé
+        """
+        with self._cond:
+            self.put_count += 1
+            if self.units and item is None:
+                # Marqueur de fin d'unité: jamais refusé
+                self._markers += 1
+                self._items.append((item, time.monotonic()))
+                self._cond.notify_all()
+                return True
+
+            if self.policy == OverloadPolicy.BLOCK:
+                while self._depth() >= self.maxsize and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    self.dropped_newest += 1
+                    return False
+
+            if self._depth() >= self.maxsize:
+                if self.policy == OverloadPolicy.DROP_NEWEST:
+                    self.dropped_newest += 1
+                    return False
+
+                if self.policy == OverloadPolicy.MERGE and self._items[-1][0] is not None:
+                    last_item, last_ts = self._items[-1]
+                    merged = self.merge_fn(last_item, item)
+                    if merged is not None:
+                        # On garde l'horodatage le plus ancien: l'âge reflète l'attente réelle
+                        self._items[-1] = (merged, last_ts)
+                        self.merged += 1
+                        self._cond.notify_all()
+                        return True
+
+                # DROP_OLDEST, SHED_STALE, ou fusion impossible
+                if not self._evict_oldest():
+                    self.dropped_newest += 1
+                    return False
+
+            self._items.append((item, time.monotonic()))
+            if self._depth() > self.max_depth:
+                self.max_depth = self._depth()
+            self._cond.notify_all()
+            return True
+
+    def _depth(self) -> int:
+        """Éléments comptés dans maxsize (les marqueurs n'en font pas partie)."""
+        return len(self._items) - self._markers
+
+    def _evict_oldest(self) -> bool:
+        """Jette l'élément (ou, avec units, l'unité complète) le plus ancien. False si rien n'est jetable."""
+        if not self.units:
+            self._items.popleft()
+            self.dropped_oldest += 1
+            return True
+        items = list(self._items)
+        start = 0
+        if self._consumer_in_unit:
+            # L'unité en tête est en cours de lecture: on saute jusqu'après son marqueur
+            while start < len(items) and items[start][0] is not None:
+                start += 1
+            start += 1
+        while start < len(items) and items[start][0] is None:
+            start += 1  # Marqueurs sans audio: rien à gagner à les jeter
+        end = start
+        while end < len(items) and items[end][0] is not None:
+            end += 1
+        if end >= len(items):
+            return False  # Seule l'unité en cours de production reste: pas d'unité complète à jeter
+        self.dropped_oldest += end - start
+        self._markers -= 1
+        del items[start:end + 1]
+        self._items = collections.deque(items)
+        return True
+
+    def close(self):
+        """Libère les producteurs bloqués (politique block): leurs put() retournent False."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get_entry(self, timeout: Optional[float] = None):
+        """
+        Retire le prochain élément et retourne (item, enqueued_at).
+
+        En mode SHED_STALE, les éléments plus vieux que max_age_s sont jetés
+        (et comptés dans shed) au lieu d'être retournés.
+
+        Raises:
+            queue.Empty: si aucun élément n'est disponible avant le timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._items:
+                    item, ts = self._items.popleft()
+                    if self.units and item is None:
+                        self._markers -= 1
+                        self._consumer_in_unit = False
+                        self._cond.notify_all()
+                        return item, ts
+                    if self.is_stale(ts):
+                        self.shed += 1
+                        continue
+                    self._consumer_in_unit = self.units
+                    self._cond.notify_all()  # Place libérée pour un producteur bloqué
+                    return item, ts
+
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Empty
+                    self._cond.wait(remaining)
+
+    def get(self, timeout: Optional[float] = None):
+        """Retire le prochain élément (voir get_entry)."""
+        item, _ = self.get_entry(timeout)
+        return item
+
+    def is_stale(self, enqueued_at: float) -> bool:
+        """True si un élément inséré à enqueued_at a dépassé max_age_s (SHED_STALE uniquement)."""
+        if self.policy != OverloadPolicy.SHED_STALE:
+            return False
+        return time.monotonic() - enqueued_at > self.max_age_s
+
+    def record_shed(self):
+        """Compte un élément délesté par le consommateur (ex: TTS sauté car périmé)."""
+        with self._cond:
+            self.shed += 1
+
+    def sum_items(self, fn) -> float:
+        """Somme de fn(item) sur les éléments en attente (ex: secondes d'audio en file)."""
+        with self._cond:
+            return sum(fn(item) for item, _ in self._items)
+
+    def qsize(self) -> int:
+        """Éléments en attente comptés comme dans maxsize (hors marqueurs de fin d'unité)."""
+        with self._cond:
+            return self._depth()
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+            self._markers = 0
+            self._consumer_in_unit = False
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot des compteurs et jauges de la queue."""
+        with self._cond:
+            return {
+                "name": self.name,
+                "policy": self.policy.value,
+                "depth": self._depth(),
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "put": self.put_count,
+                "dropped_oldest": self.dropped_oldest,
+                "dropped_newest": self.dropped_newest,
+                "merged": self.merged,
+                "shed": self.shed,
+            }
+
+
+def merge_utterances(older: bytes, newer: bytes) -> bytes:
+    """
+    Fusionne deux utterances adjacentes en un seul job STT. Un UtteranceSegment
+    garde sa place dans le tour (turn, index, final) du segment le plus récent.
+    """
+    audio = older + newer
+    if isinstance(newer, UtteranceSegment):
+        return UtteranceSegment.create(audio, newer.turn, newer.index, newer.final)
+    return audio
+
+
+def merge_audio_chunks(older, newer):
+    """Fusionne deux chunks PCM de la queue TTS (pas les marqueurs de fin None)."""
+    if older is None or newer is None:
+        return None
+    # join: les chunks peuvent être des memoryview (clips de la banque de phrases)
+    return b"".join((older, newer))
@@ -1,104 +1,299 @@
-import pyaudio
+import collections
+import threading
 import time
-from dataclasses import dataclass
 
-@dataclass
-class AudioDevice:
-    index: int
-    name: str
-    channels: int
-    sample_rate: int
-    is_input: bool
+import numpy as np
+
+from core.audio_backends import AudioBackend, AudioDevice, INPUT_OVERFLOW, INPUT_UNDERFLOW, get_audio_backend
+
 
 class AudioDeviceManager:
-    def __init__(self):
-        self.pa = pyaudio.PyAudio()
-
-    def list_devices(self):
-        devices = []
-        info = self.pa.get_host_api_info_by_index(0)
-        num_devices = info.get('deviceCount')
-
-        for i in range(0, num_devices):
-            if (self.pa.get_device_info_by_host_api_device_index(0, i).get('maxInputChannels')) > 0:
-                dev = self.pa.get_device_info_by_host_api_device_index(0, i)
-                devices.append(AudioDevice(
-                    index=i,
-                    name=dev.get('name'),
-                    channels=dev.get('maxInputChannels'),
-                    sample_rate=int(dev.get('defaultSampleRate')),
-                    is_input=True
-                ))
-            
-            if (self.pa.get_device_info_by_host_api_device_index(0, i).get('maxOutputChannels')) > 0:
-                dev = self.pa.get_device_info_by_host_api_device_index(0, i)
-                devices.append(AudioDevice(
-                    index=i,
-                    name=dev.get('name'),
-                    channels=dev.get('maxOutputChannels'),
-                    sample_rate=int(dev.get('defaultSampleRate')),
-                    is_input=False
-                ))
-        return devices
+    def __init__(self, backend: AudioBackend = None):
+        """backend: runtime audio partagé (défaut: backend pyaudio du processus)."""
+        self.backend = (backend or get_audio_backend()).acquire()
+
+    def list_devices(self, refresh: bool = False):
+        return self.backend.list_devices(refresh)
+
+    def negotiate_input_rate(self, device_index=None, candidates=(16000, 32000, 48000)) -> int:
+        """
+        Premier sample rate de candidates (ordre de préférence) que le micro
+        accepte nativement en mono 16-bit. 48000 si aucun n'est confirmé.
+        """
+        for rate in candidates:
+            if self.backend.supports_input_rate(device_index, rate):
+                return rate
+        return 48000
+
+    def native_output_rate(self, device_index=None) -> int:
+        """Sample rate par défaut (natif) de la sortie: aucun rééchantillonnage côté OS."""
+        return self.backend.default_output_rate(device_index)
 
     def terminate(self):
-        self.pa.terminate()
+        self.backend.release()
 
 class MicCapture:
-    def __init__(self, device_index=None, sample_rate=48000, chunk_ms=20):
-        self.pa = pyaudio.PyAudio()
+    def __init__(self, device_index=None, sample_rate=48000, chunk_ms=20, backend: AudioBackend = None):
+        self.backend = (backend or get_audio_backend()).acquire()
         self.device_index = device_index
         self.sample_rate = sample_rate
+        self.chunk_ms = chunk_ms
         self.chunk_size = int(sample_rate * (chunk_ms / 1000))
         self.stream = None
         self.callback = None
+        # Incidents signalés par PortAudio (lus par les métriques)
+        self.overflows = 0
+        self.underflows = 0
+        self._thread_named = False
     
     def start(self, callback):
         self.callback = callback
-        self.stream = self.pa.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self.sample_rate,
-            input=True,
-            input_device_index=self.device_index,
-            frames_per_buffer=self.chunk_size,
-            stream_callback=self._stream_callback
-        )
-        self.stream.start_stream()
-
-    def _stream_callback(self, in_data, frame_count, time_info, status):
+        self.stream = self.backend.open_input(self.device_index, self.sample_rate, self._on_frame, self.chunk_ms)
+
+    def _on_frame(self, frame, status):
+        if not self._thread_named:
+            # Thread natif PortAudio: nom lisible dans les profils et les logs
+            threading.current_thread().name = "CaptureCallback"
+            self._thread_named = True
+        if status:
+            if status & INPUT_OVERFLOW:
+                self.overflows += 1
+            if status & INPUT_UNDERFLOW:
+                self.underflows += 1
         if self.callback:
-            self.callback(in_data)
-        return (None, pyaudio.paContinue)
+            self.callback(frame)
 
     def stop(self):
         if self.stream:
-            self.stream.stop_stream()
             self.stream.close()
-        self.pa.terminate()
+            self.stream = None
+        self.backend.release()
 
 class AudioOutput:
-    def __init__(self, device_index=None, sample_rate=48000):
-        self.pa = pyaudio.PyAudio()
+    def __init__(self, device_index=None, sample_rate=48000, backend: AudioBackend = None):
+        self.backend = (backend or get_audio_backend()).acquire()
         self.device_index = device_index
         self.sample_rate = sample_rate
         self.stream = None
+        # Détection d'underrun: un chunk arrive après la fin de lecture du précédent
+        self.underruns = 0
+        self._play_until = None
 
     def start(self):
-        self.stream = self.pa.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self.sample_rate,
-            output=True,
-            output_device_index=self.device_index
-        )
+        self.stream = self.backend.open_output(self.device_index, self.sample_rate)
     
     def write(self, data):
         if self.stream:
+            now = time.monotonic()
+            if self._play_until is not None and now > self._play_until:
+                self.underruns += 1
+            start = now if self._play_until is None else max(now, self._play_until)
+            self._play_until = start + len(data) / 2 / self.sample_rate
             self.stream.write(data)
 
+    def pending_seconds(self) -> float:
+        """Audio écrit mais pas encore joué (estimation à partir de l'horloge d'écriture)."""
+        if self._play_until is None:
+            return 0.0
+        return max(0.0, self._play_until - time.monotonic())
+
+    def mark_idle(self):
+        """Signale la fin d'un flux: le silence qui suit n'est pas un underrun."""
+        self._play_until = None
+
     def stop(self):
         if self.stream:
-            self.stream.stop_stream()
             self.stream.close()
-        self.pa.terminate()
+            self.stream = None
+        self.backend.release()
+
+class _OutputSink:
+    """
+    Une sortie du fan-out: son propre flux, son thread de lecture, son buffer
+    de gigue et son gain. Les chunks reçus sont les bytes partagés par toutes
+    les sorties (aucune copie tant que gain == 1).
+    """
+
+    def __init__(self, name: str, output: AudioOutput, gain: float, jitter_s: float, max_buffer_s: float):
+        self.name = name
+        self.output = output
+        self.gain = gain
+        self.jitter_s = jitter_s
+        self.max_buffer_s = max_buffer_s
+        self.buffered_s = 0.0
+        self.dropped_s = 0.0      # Audio jeté: sortie trop lente, buffer plein
+        self.delays = collections.deque(maxlen=2000)  # Fan-out -> début d'écriture sur la sortie
+        self._queue = collections.deque()  # (pcm, horodatage fan-out) ou (None, _) = fin de flux
+        self._cond = threading.Condition()
+        self._streaming = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"Sink-{name}")
+
+    def _duration(self, pcm) -> float:
+        return len(pcm) / 2 / self.output.sample_rate
+
+    def push(self, pcm, stamp: float):
+        """
+        Ajoute un chunk (None = fin de flux). Ne bloque jamais: au-delà de
+        max_buffer_s, le plus ancien chunk PCM est jeté. Les marqueurs de fin
+        sont conservés: sans eux la sortie ne repasserait jamais au repos.
+        """
+        with self._cond:
+            self._queue.append((pcm, stamp))
+            if pcm is not None:
+                self.buffered_s += self._duration(pcm)
+                while self.buffered_s > self.max_buffer_s:
+                    index = next((i for i, (old, _) in enumerate(self._queue) if old is not None), None)
+                    if index is None:
+                        break
+                    old, _ = self._queue[index]
+                    del self._queue[index]
+                    self.buffered_s -= self._duration(old)
+                    self.dropped_s += self._duration(old)
+            self._cond.notify_all()
+
+    def _ready(self) -> bool:
+        """Assez d'audio pour démarrer (ou reprendre) la lecture sans trou."""
+        if not self._queue:
+            return False
+        if self._streaming or self.buffered_s >= self.jitter_s:
+            return True
+        return any(pcm is None for pcm, _ in self._queue)  # Flux court: tout est arrivé
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._ready():
+                    self._cond.wait(0.1)
+                if self._stopped:
+                    return
+                pcm, stamp = self._queue.popleft()
+                if pcm is not None:
+                    self.buffered_s -= self._duration(pcm)
+                    self._streaming = True
+                    self.delays.append(time.monotonic() - stamp)  # Sous _cond: lu par sink_stats()
+                else:
+                    self._streaming = False
+                self._cond.notify_all()
+            if pcm is None:
+                self.output.mark_idle()
+                continue
+            if self.gain != 1.0:
+                samples = np.frombuffer(pcm, dtype=np.int16) * self.gain
+                pcm = np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+            self.output.write(pcm)
+
+    def wait_below(self, seconds: float, timeout_s: float) -> bool:
+        """Attend que le buffer repasse sous seconds (False si timeout_s est atteint avant)."""
+        # Jamais sous le buffer de gigue: la lecture ne démarrerait pas
+        seconds = max(seconds, self.jitter_s)
+        deadline = time.monotonic() + timeout_s
+        with self._cond:
+            while self.buffered_s > seconds and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def pending_seconds(self) -> float:
+        return self.buffered_s + self.output.pending_seconds()
+
+    def start(self):
+        self.output.start()
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
+        self.output.stop()
+
+
+class FanOutOutput:
+    """
+    Même interface qu'AudioOutput, mais chaque chunk part vers plusieurs
+    sorties (câble virtuel + casque de retour, par ex.).
+
+    write() pousse le même objet bytes dans le buffer de chaque sortie puis
+    n'attend que la première (sortie principale, horloge du pipeline) tant
+    qu'elle a plus de high_water_s d'avance: même contre-pression qu'une
+    écriture directe. Une sortie secondaire lente ne ralentit personne: son
+    buffer est borné à max_buffer_s, le plus ancien audio est jeté au-delà.
+    Une sortie principale bloquée plus de stall_timeout_s est traitée pareil.
+
+    Chaque sortie a un buffer de gigue (jitter_ms d'audio accumulé avant de
+    démarrer un flux) et un gain linéaire. Underruns, audio jeté et dérive
+    (délai de lecture comparé à la sortie principale) sont suivis par sortie.
+    """
+
+    def __init__(self, sinks, sample_rate=48000, backend: AudioBackend = None, jitter_ms: int = 0,
+                 max_buffer_s: float = 10.0, high_water_s: float = 0.2, stall_timeout_s: float = 1.0):
+        """
+        Args:
+            sinks: [(nom, device_index, gain)], la première est la sortie principale
+        """
+        self.sample_rate = sample_rate
+        self.high_water_s = high_water_s
+        self.stall_timeout_s = stall_timeout_s
+        self.stalls = 0
+        self.sinks = [
+            _OutputSink(name, AudioOutput(device_index, sample_rate, backend), gain, jitter_ms / 1000, max_buffer_s)
+            for name, device_index, gain in sinks
+        ]
+        self.primary = self.sinks[0]
+
+    @property
+    def underruns(self) -> int:
+        return self.primary.output.underruns
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+
+    def write(self, data):
+        stamp = time.monotonic()
+        for sink in self.sinks:
+            sink.push(data, stamp)
+        if not self.primary.wait_below(self.high_water_s, self.stall_timeout_s):
+            self.stalls += 1
+
+    def pending_seconds(self) -> float:
+        return self.primary.pending_seconds()
+
+    def mark_idle(self):
+        stamp = time.monotonic()
+        for sink in self.sinks:
+            sink.push(None, stamp)
+
+    def sink_stats(self) -> dict:
+        """Par sortie: underruns, audio jeté (s), délai médian et p95 (s), dérive vs principale (s)."""
+        # Appelé depuis le thread des métriques: copie des délais sous le verrou de chaque sortie
+        copies = []
+        for sink in self.sinks:
+            with sink._cond:
+                copies.append(list(sink.delays))
+        reference = np.median(copies[0]) if copies[0] else 0.0  # sinks[0] est la principale
+        stats = {}
+        for sink, copy in zip(self.sinks, copies):
+            delays = np.array(copy or [0.0])
+            stats[sink.name] = {
+                "underruns": sink.output.underruns,
+                "dropped_s": sink.dropped_s,
+                "delay_p50_s": float(np.median(delays)),
+                "delay_p95_s": float(np.percentile(delays, 95)),
+                "drift_s": float(np.median(delays) - reference),
+            }
+        return stats
+
+    def report(self):
+        for name, s in self.sink_stats().items():
+            print(f"[OUTPUT] {name}: délai p50 {s['delay_p50_s'] * 1000:.0f}ms, p95 {s['delay_p95_s'] * 1000:.0f}ms, "
+                  f"dérive {s['drift_s'] * 1000:+.0f}ms, {s['underruns']} underruns, {s['dropped_s']:.1f}s jetées")
+        if self.stalls:
+            print(f"[OUTPUT] Sortie principale bloquée {self.stalls} fois (> {self.stall_timeout_s:.1f}s)")
+
+    def stop(self):
+        for sink in self.sinks:
+            sink.stop()
@@ -0,0 +1,585 @@
+"""
+Backends audio interchangeables derrière MicCapture / AudioOutput / AudioDeviceManager.
+
+- pyaudio: PortAudio via PyAudio (historique), frames en bytes
+- numpy:   PortAudio via sounddevice, callbacks sur buffers NumPy: les frames
+           capturées sont des vues sur un anneau préalloué (aucune allocation
+           par frame) et la lecture est tirée par le callback de sortie
+- file:    entrée depuis un WAV ou un pipe PCM brut ("-" = stdin), sortie vers
+           un WAV ou un pipe ("-" = stdout), cadencées en temps réel ou non
+- null:    entrée silencieuse, sortie jetée (benchmarks headless, CI)
+
+Un backend porte le runtime hôte (une seule instance PyAudio / sounddevice
+par processus via get_audio_backend), la liste des périphériques (interrogée
+une fois puis en cache) et les réglages de latence et de buffers
+(AudioBufferConfig), communs à tous les flux qu'il ouvre.
+
+Les frames passées aux callbacks de capture sont des objets bytes-like
+(bytes ou memoryview), PCM 16-bit mono.
+"""
+import os
+import sys
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+# Incidents signalés au callback de capture (masque de bits)
+INPUT_OVERFLOW = 1
+INPUT_UNDERFLOW = 2
+
+@dataclass
+class AudioDevice:
+    index: int
+    name: str
+    channels: int
+    sample_rate: int
+    is_input: bool
+
+
+@dataclass
+class AudioBufferConfig:
+    """Latence et tailles de buffers, appliquées par le backend à tous ses flux."""
+    chunk_ms: int = 20                  # Bloc de capture (= frame VAD: 10, 20 ou 30ms)
+    output_buffer_ms: int = 20          # Bloc de sortie (frames_per_buffer / blocksize)
+    latency: Union[str, float] = "low"  # "low", "high" ou secondes (latence suggérée à PortAudio)
+    output_queue_ms: int = 200          # Backend numpy: audio accepté d'avance par write()
+    # Backend numpy: durée pendant laquelle une frame capturée reste valide
+    # (anneau préalloué). 0 = une copie par frame, sûr si le consommateur
+    # garde les frames indéfiniment.
+    frame_lifetime_s: float = 0.0
+
+    def output_frames(self, sample_rate: int) -> int:
+        return int(sample_rate * self.output_buffer_ms / 1000)
+
+
+class AudioBackend:
+    """
+    Interface commune. Les sous-classes implémentent _open_runtime /
+    _close_runtime, _query_devices, les rates par défaut et l'ouverture des flux.
+
+    acquire()/release() comptent les utilisateurs: le runtime est ouvert au
+    premier acquire() et fermé au dernier release().
+    """
+
+    name = "base"
+
+    def __init__(self, buffers: AudioBufferConfig = None):
+        self.buffers = buffers or AudioBufferConfig()
+        self._devices = None
+        self._users = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._users == 0:
+                self._open_runtime()
+            self._users += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            if self._users == 0:
+                return
+            self._users -= 1
+            if self._users == 0:
+                self._close_runtime()
+                self._devices = None
+
+    def _open_runtime(self):
+        pass
+
+    def _close_runtime(self):
+        pass
+
+    def list_devices(self, refresh: bool = False):
+        """Périphériques d'entrée et de sortie (interrogés une fois, puis en cache)."""
+        if self._devices is None or refresh:
+            self._devices = self._query_devices()
+        return self._devices
+
+    def _query_devices(self):
+        raise NotImplementedError
+
+    def supports_input_rate(self, device_index, sample_rate: int) -> bool:
+        raise NotImplementedError
+
+    def default_output_rate(self, device_index) -> int:
+        raise NotImplementedError
+
+    def open_input(self, device_index, sample_rate: int, callback, chunk_ms: int = None):
+        """Démarre la capture: callback(frame, status) par bloc de chunk_ms, status = INPUT_*."""
+        raise NotImplementedError
+
+    def open_output(self, device_index, sample_rate: int):
+        """Flux de sortie: write(pcm) bloque tant que le buffer de sortie est plein."""
+        raise NotImplementedError
+
+
+class PyAudioBackend(AudioBackend):
+    """PortAudio via PyAudio. La latence suggérée n'est pas exposée par PyAudio (toujours "low")."""
+
+    name = "pyaudio"
+
+    def __init__(self, buffers: AudioBufferConfig = None):
+        super().__init__(buffers)
+        self.pa = None
+        self._pyaudio = None
+
+    def _open_runtime(self):
+        import pyaudio
+        self._pyaudio = pyaudio
+        self.pa = pyaudio.PyAudio()
+
+    def _close_runtime(self):
+        self.pa.terminate()
+        self.pa = None
+
+    def _query_devices(self):
+        devices = []
+        num_devices = self.pa.get_host_api_info_by_index(0).get('deviceCount')
+        for i in range(num_devices):
+            dev = self.pa.get_device_info_by_host_api_device_index(0, i)
+            for is_input, key in ((True, 'maxInputChannels'), (False, 'maxOutputChannels')):
+                if dev.get(key) > 0:
+                    devices.append(AudioDevice(
+                        index=i,
+                        name=dev.get('name'),
+                        channels=dev.get(key),
+                        sample_rate=int(dev.get('defaultSampleRate')),
+                        is_input=is_input
+                    ))
+        return devices
+
+    def supports_input_rate(self, device_index, sample_rate: int) -> bool:
+        if device_index is None:
+            device_index = self.pa.get_default_input_device_info()["index"]
+        try:
+            return self.pa.is_format_supported(sample_rate, input_device=device_index, input_channels=1,
+                                               input_format=self._pyaudio.paInt16)
+        except ValueError:
+            return False  # PortAudio lève ValueError pour un format non supporté
+
+    def default_output_rate(self, device_index) -> int:
+        if device_index is None:
+            info = self.pa.get_default_output_device_info()
+        else:
+            info = self.pa.get_device_info_by_index(device_index)
+        return int(info["defaultSampleRate"])
+
+    def open_input(self, device_index, sample_rate: int, callback, chunk_ms: int = None):
+        pyaudio = self._pyaudio
+
+        def stream_callback(in_data, frame_count, time_info, status):
+            flags = 0
+            if status & pyaudio.paInputOverflow:
+                flags |= INPUT_OVERFLOW
+            if status & pyaudio.paInputUnderflow:
+                flags |= INPUT_UNDERFLOW
+            callback(in_data, flags)
+            return (None, pyaudio.paContinue)
+
+        chunk_ms = chunk_ms or self.buffers.chunk_ms
+        stream = self.pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=sample_rate,
+            input=True,
+            input_device_index=device_index,
+            frames_per_buffer=int(sample_rate * chunk_ms / 1000),
+            stream_callback=stream_callback
+        )
+        stream.start_stream()
+        return _PortAudioStream(stream)
+
+    def open_output(self, device_index, sample_rate: int):
+        stream = self.pa.open(
+            format=self._pyaudio.paInt16,
+            channels=1,
+            rate=sample_rate,
+            output=True,
+            output_device_index=device_index,
+            frames_per_buffer=self.buffers.output_frames(sample_rate)
+        )
+        return _PortAudioStream(stream)
+
+
+class _PortAudioStream:
+    """Flux PyAudio ou sounddevice: même interface write/close."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, pcm):
+        self.stream.write(pcm)
+
+    def close(self):
+        if hasattr(self.stream, "stop_stream"):
+            self.stream.stop_stream()
+        else:
+            self.stream.stop()
+        self.stream.close()
+
+
+class _FrameRing:
+    """
+    Anneau de frames préallouées: chaque bloc capturé est copié dans le slot
+    suivant et exposé en memoryview lecture seule. Un slot est réécrit après
+    n_slots blocs, d'où la durée de validité frame_lifetime_s.
+    """
+
+    def __init__(self, n_slots: int, chunk_frames: int):
+        self.slots = np.zeros((n_slots, chunk_frames), dtype=np.int16)
+        self.views = []
+        for slot in self.slots:
+            view = slot.view()
+            view.flags.writeable = False
+            self.views.append(memoryview(view).cast("B"))
+        self.next = 0
+
+    def push(self, samples):
+        self.slots[self.next] = samples
+        view = self.views[self.next]
+        self.next = (self.next + 1) % len(self.slots)
+        return view
+
+
+class _SampleRing:
+    """
+    File d'échantillons int16 à capacité fixe entre write() (producteur) et le
+    callback de sortie (consommateur). Aucune allocation après construction.
+    """
+
+    def __init__(self, capacity: int):
+        self.buf = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.read_pos = 0
+        self.size = 0
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def put(self, samples):
+        """Copie samples dans l'anneau, en attendant la place nécessaire."""
+        offset = 0
+        while offset < len(samples):
+            with self.cond:
+                while self.size == self.capacity and not self.closed:
+                    self.cond.wait(0.1)
+                if self.closed:
+                    return
+                n = min(len(samples) - offset, self.capacity - self.size)
+                start = (self.read_pos + self.size) % self.capacity
+                first = min(n, self.capacity - start)
+                self.buf[start:start + first] = samples[offset:offset + first]
+                self.buf[:n - first] = samples[offset + first:offset + n]
+                self.size += n
+                offset += n
+
+    def take_into(self, out) -> int:
+        """Remplit out (complété par du silence), retourne le nombre d'échantillons réels."""
+        with self.cond:
+            n = min(len(out), self.size)
+            first = min(n, self.capacity - self.read_pos)
+            out[:first] = self.buf[self.read_pos:self.read_pos + first]
+            out[first:n] = self.buf[:n - first]
+            out[n:] = 0
+            self.read_pos = (self.read_pos + n) % self.capacity
+            self.size -= n
+            self.cond.notify()
+        return n
+
+    def drain(self, timeout_s: float):
+        """Attend que l'anneau soit joué (au plus timeout_s)."""
+        deadline = time.monotonic() + timeout_s
+        with self.cond:
+            while self.size and not self.closed and time.monotonic() < deadline:
+                self.cond.wait(0.05)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class NumpyBackend(AudioBackend):
+    """
+    PortAudio via sounddevice, entièrement en callbacks sur buffers NumPy.
+
+    Capture: le bloc PortAudio est copié dans un anneau préalloué (pas de
+    bytes alloué par frame) si buffers.frame_lifetime_s > 0, sinon dans une
+    nouvelle frame. Lecture: write() copie le PCM (vue np.frombuffer, sans
+    copie intermédiaire) dans un anneau que le callback de sortie vide
+    directement dans le buffer PortAudio.
+    """
+
+    name = "numpy"
+
+    def __init__(self, buffers: AudioBufferConfig = None):
+        super().__init__(buffers)
+        self.sd = None
+
+    def _open_runtime(self):
+        try:
+            import sounddevice
+        except ImportError:
+            raise ImportError("sounddevice n'est pas installé. Installez-le avec: pip install sounddevice")
+        self.sd = sounddevice
+
+    def _close_runtime(self):
+        self.sd = None
+
+    def _query_devices(self):
+        devices = []
+        for i, dev in enumerate(self.sd.query_devices()):
+            if dev["hostapi"] != 0:
+                continue  # Mêmes index que le backend pyaudio (API hôte par défaut)
+            for is_input, key in ((True, "max_input_channels"), (False, "max_output_channels")):
+                if dev[key] > 0:
+                    devices.append(AudioDevice(index=i, name=dev["name"], channels=dev[key],
+                                               sample_rate=int(dev["default_samplerate"]), is_input=is_input))
+        return devices
+
+    def supports_input_rate(self, device_index, sample_rate: int) -> bool:
+        try:
+            self.sd.check_input_settings(device=device_index, channels=1, dtype="int16", samplerate=sample_rate)
+            return True
+        except Exception:
+            return False
+
+    def default_output_rate(self, device_index) -> int:
+        return int(self.sd.query_devices(device_index, "output")["default_samplerate"])
+
+    def open_input(self, device_index, sample_rate: int, callback, chunk_ms: int = None):
+        chunk = int(sample_rate * (chunk_ms or self.buffers.chunk_ms) / 1000)
+        lifetime = self.buffers.frame_lifetime_s
+        ring = _FrameRing(int(lifetime * sample_rate / chunk) + 1, chunk) if lifetime > 0 else None
+
+        def stream_callback(indata, frames, time_info, status):
+            flags = (INPUT_OVERFLOW if status.input_overflow else 0) | \
+                    (INPUT_UNDERFLOW if status.input_underflow else 0)
+            samples = indata[:, 0]
+            if ring is not None:
+                callback(ring.push(samples), flags)
+            else:
+                callback(memoryview(samples.copy()).cast("B"), flags)
+
+        stream = self.sd.InputStream(device=device_index, samplerate=sample_rate, blocksize=chunk, channels=1,
+                                     dtype="int16", latency=self.buffers.latency, callback=stream_callback)
+        stream.start()
+        return _PortAudioStream(stream)
+
+    def open_output(self, device_index, sample_rate: int):
+        return _NumpyOutputStream(self.sd, device_index, sample_rate, self.buffers)
+
+
+class _NumpyOutputStream:
+    def __init__(self, sd, device_index, sample_rate: int, buffers: AudioBufferConfig):
+        self.ring = _SampleRing(max(int(sample_rate * buffers.output_queue_ms / 1000),
+                                    buffers.output_frames(sample_rate)))
+        self.sample_rate = sample_rate
+        self.stream = sd.OutputStream(device=device_index, samplerate=sample_rate,
+                                      blocksize=buffers.output_frames(sample_rate), channels=1, dtype="int16",
+                                      latency=buffers.latency, callback=self._callback)
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        self.ring.take_into(outdata[:, 0])
+
+    def write(self, pcm):
+        self.ring.put(np.frombuffer(pcm, dtype=np.int16))
+
+    def close(self):
+        self.ring.drain(timeout_s=self.ring.capacity / self.sample_rate + 0.5)
+        self.ring.close()
+        self.stream.stop()
+        self.stream.close()
+
+
+class FileBackend(AudioBackend):
+    """
+    Entrée/sortie sur fichiers ou pipes, sans périphérique audio.
+
+    input_path: WAV 16-bit (capture à son rate, mixé en mono) ou "-" pour du
+    PCM brut sur stdin au rate demandé. None = silence. En fin de fichier, la
+    capture continue en silence (comme un micro après la dernière phrase):
+    l'énoncé en cours se termine normalement, input_finished est levé.
+
+    output_path: WAV écrit au rate de sortie, ou "-" pour du PCM brut sur
+    stdout. None = audio jeté.
+
+    realtime=True cadence capture et lecture sur l'horloge (un bloc toutes les
+    chunk_ms); False traite aussi vite que possible.
+    """
+
+    name = "file"
+
+    def __init__(self, buffers: AudioBufferConfig = None, input_path: str = None, output_path: str = None,
+                 realtime: bool = True, output_rate: int = 48000):
+        super().__init__(buffers)
+        self.input_path = input_path
+        self.output_path = output_path
+        self.realtime = realtime
+        self.output_rate = output_rate
+        self.input_finished = threading.Event()
+        self._wav_rate = None
+        if input_path and input_path != "-":
+            with wave.open(input_path, "rb") as wf:
+                self._wav_rate = wf.getframerate()
+
+    def _query_devices(self):
+        return [
+            AudioDevice(index=0, name=f"{self.name}:{self.input_path or 'silence'}", channels=1,
+                        sample_rate=self._wav_rate or 48000, is_input=True),
+            AudioDevice(index=0, name=f"{self.name}:{self.output_path or 'null'}", channels=1,
+                        sample_rate=self.output_rate, is_input=False),
+        ]
+
+    def supports_input_rate(self, device_index, sample_rate: int) -> bool:
+        return self._wav_rate is None or sample_rate == self._wav_rate
+
+    def default_output_rate(self, device_index) -> int:
+        return self.output_rate
+
+    def open_input(self, device_index, sample_rate: int, callback, chunk_ms: int = None):
+        if self._wav_rate is not None and sample_rate != self._wav_rate:
+            raise ValueError(f"{self.input_path} est à {self._wav_rate}Hz, capture demandée à {sample_rate}Hz")
+        return _FileInputStream(self, sample_rate, chunk_ms or self.buffers.chunk_ms, callback)
+
+    def open_output(self, device_index, sample_rate: int):
+        return _FileOutputStream(self.output_path, sample_rate, self.realtime, self.buffers)
+
+    def _read_input(self):
+        """Itérateur de blocs PCM bruts (bytes, taille libre) de l'entrée."""
+        if self.input_path is None:
+            return
+        if self.input_path == "-":
+            stream = sys.stdin.buffer
+            while True:
+                block = stream.read(65536)
+                if not block:
+                    return
+                yield block
+        from core.wavfile import MappedWav
+        with MappedWav(self.input_path) as wav:
+            yield bytes(wav.mono_pcm())
+
+
+class _FileInputStream:
+    def __init__(self, backend: FileBackend, sample_rate: int, chunk_ms: int, callback):
+        self.backend = backend
+        self.chunk_bytes = int(sample_rate * chunk_ms / 1000) * 2
+        self.chunk_s = chunk_ms / 1000
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="FileCapture")
+        self._thread.start()
+
+    def _run(self):
+        silence = bytes(self.chunk_bytes)
+        next_at = time.monotonic()
+        data, pos = b"", 0
+        blocks = self.backend._read_input()
+        while not self._stop.is_set():
+            while blocks is not None and len(data) - pos < self.chunk_bytes:
+                block = next(blocks, None)
+                if block is None:
+                    blocks = None
+                    if self.backend.input_path is not None:
+                        print(f"[AUDIO] Fin de l'entrée {self.backend.input_path}, capture en silence")
+                    self.backend.input_finished.set()
+                    break
+                data, pos = data[pos:] + block, 0
+            if len(data) - pos >= self.chunk_bytes:
+                frame = data[pos:pos + self.chunk_bytes]
+                pos += self.chunk_bytes
+            else:
+                frame = silence
+            self.callback(frame, 0)
+            if self.backend.realtime:
+                # Échéances absolues: pas de dérive cumulée
+                next_at += self.chunk_s
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+            elif blocks is None:
+                self._stop.wait(self.chunk_s)  # Hors temps réel, le silence final reste cadencé
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+
+class _FileOutputStream:
+    def __init__(self, path: Optional[str], sample_rate: int, realtime: bool, buffers: AudioBufferConfig):
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.ahead_s = buffers.output_buffer_ms / 1000
+        self._play_until = None
+        self._wav = None
+        self._pipe = None
+        if path == "-":
+            self._pipe = sys.__stdout__.buffer  # Vrai stdout, même si sys.stdout a été redirigé pour les logs
+        elif path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._wav = wave.open(path, "wb")
+            self._wav.setnchannels(1)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(sample_rate)
+
+    def write(self, pcm):
+        if self._wav:
+            self._wav.writeframes(pcm)
+        elif self._pipe:
+            self._pipe.write(pcm)
+            self._pipe.flush()
+        if self.realtime:
+            # Comme un périphérique: write() rend la main quand il ne reste qu'un buffer à jouer
+            now = time.monotonic()
+            start = now if self._play_until is None else max(now, self._play_until)
+            self._play_until = start + len(pcm) / 2 / self.sample_rate
+            delay = self._play_until - self.ahead_s - now
+            if delay > 0:
+                time.sleep(delay)
+
+    def close(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+
+
+class NullBackend(FileBackend):
+    """Entrée silencieuse, sortie jetée: pipeline complet sans carte son."""
+
+    name = "null"
+
+    def __init__(self, buffers: AudioBufferConfig = None, realtime: bool = True, output_rate: int = 48000):
+        super().__init__(buffers, realtime=realtime, output_rate=output_rate)
+
+
+AUDIO_BACKENDS = {
+    "pyaudio": PyAudioBackend,
+    "numpy": NumpyBackend,
+    "file": FileBackend,
+    "null": NullBackend,
+}
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def create_audio_backend(name: str = "pyaudio", buffers: AudioBufferConfig = None, **options) -> AudioBackend:
+    """Nouveau backend (options: input_path, output_path, realtime, output_rate pour file/null)."""
+    if name not in AUDIO_BACKENDS:
+        raise ValueError(f"Backend audio inconnu: '{name}'. Backends: {', '.join(AUDIO_BACKENDS)}")
+    return AUDIO_BACKENDS[name](buffers, **options)
+
+
+def get_audio_backend(name: str = "pyaudio") -> AudioBackend:
+    """Backend partagé du processus (réglages par défaut): un seul runtime hôte pour tous les flux."""
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = create_audio_backend(name)
+        return _shared[name]
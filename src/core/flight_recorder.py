@@ -0,0 +1,264 @@
+"""
+Enregistreur de vol: anneau de taille fixe, mappé en mémoire, de tout ce qui
+traverse le pipeline (frames micro + décision VAD, énoncés, transcriptions,
+audio TTS joué, changements d'état), horodaté en time.monotonic().
+
+Coût côté capture: un struct.pack et un deque.append par frame, sans verrou
+ni I/O. Un thread dédié copie les enregistrements dans le mapping; les pages
+restent dans le cache de l'OS même si le processus est tué. Le fichier
+survit aux redémarrages: une nouvelle session continue l'anneau.
+
+Format:
+    en-tête (64 octets): magic, capacité, position d'écriture, plus ancien
+    enregistrement intact, fin du tour d'anneau précédent, prochain numéro
+    de séquence, enregistrements perdus, rates de capture et de sortie
+    enregistrement: en-tête (28 octets: taille, type, flags, aux 32 bits,
+    séquence, horodatage) + données. Un enregistrement ne chevauche jamais la fin de
+    l'anneau.
+"""
+import collections
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import wave
+from dataclasses import dataclass
+
+
+def _cache_dir() -> str:
+    """Dossier cache de l'utilisateur (%LOCALAPPDATA% sous Windows, $XDG_CACHE_HOME ou ~/.cache ailleurs)."""
+    base = os.getenv("LOCALAPPDATA") if os.name == "nt" else os.getenv("XDG_CACHE_HOME")
+    return os.path.join(base or os.path.join(os.path.expanduser("~"), ".cache"), "tts-inworldapi")
+
+
+# Fichier par défaut de run/replay: hors du répertoire de travail (gros binaire, rien à versionner)
+DEFAULT_RECORDING_PATH = os.path.join(_cache_dir(), "flight_recorder.bin")
+
+# Types d'enregistrement
+FRAME = 1       # Frame micro (aux = sample rate, flags = FLAG_*)
+UTTERANCE = 2   # Énoncé envoyé au STT (aux = index du segment dans le tour)
+TRANSCRIPT = 3  # Texte STT (UTF-8)
+TTS_AUDIO = 4   # Chunk TTS joué (aux = sample rate)
+EVENT = 5       # Événement texte (changement d'état, début de session)
+
+FLAG_SPEECH = 1     # FRAME: classée parole par le VAD
+FLAG_GATED = 2      # FRAME: ignorée (push-to-talk relâché), VAD non évalué
+FLAG_FINAL = 1      # UTTERANCE: dernier segment du tour
+
+KIND_NAMES = {FRAME: "frame", UTTERANCE: "utterance", TRANSCRIPT: "transcript", TTS_AUDIO: "tts", EVENT: "event"}
+
+_MAGIC = b"TTSFLRC2"  # v2: aux sur 32 bits (sample rates > 65535 Hz)
+_HEADER = struct.Struct("<8sQQQQQQII")  # 64 octets
+_RECORD = struct.Struct("<IBBxxIQd")    # taille, type, flags, aux, séquence, horodatage (28 octets)
+
+
+@dataclass
+class Record:
+    kind: int
+    flags: int
+    aux: int
+    seq: int
+    t: float
+    payload: bytes
+
+
+class FlightRecorder:
+    """
+    Ajout non bloquant d'enregistrements dans l'anneau mappé.
+
+    record() est appelé depuis n'importe quel thread (y compris le callback
+    de capture): il ne fait qu'empiler. Si le thread d'écriture prend plus de
+    max_pending_bytes de retard, les nouveaux enregistrements sont comptés
+    comme perdus au lieu d'occuper la mémoire.
+    """
+
+    def __init__(self, path: str, size_mb: int = 64, max_pending_bytes: int = 8 * 1024 * 1024,
+                 flush_interval_s: float = 0.02):
+        self.path = path
+        self.capacity = size_mb * 1024 * 1024
+        self.max_pending_bytes = max_pending_bytes
+        self.flush_interval_s = flush_interval_s
+        self.dropped = 0
+        self.written = 0
+        self._pending = collections.deque()
+        self._pending_bytes = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._open()
+
+    def _open(self):
+        size = _HEADER.size + self.capacity
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) == size
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        header = _HEADER.unpack_from(self._mmap, 0)
+        if exists and header[0] == _MAGIC and header[1] == self.capacity:
+            # Reprise de l'anneau d'une session précédente
+            _, _, self._write_pos, self._oldest, self._lap_end, self._seq, self._lost, _, _ = header
+        else:
+            self._write_pos, self._oldest, self._lap_end, self._seq, self._lost = 0, 0, 0, 0, 0
+        self._rates = (0, 0)
+        self._write_header()
+
+    def start(self, capture_rate: int = 0, output_rate: int = 0, info: dict = None):
+        """Démarre le thread d'écriture et marque le début d'une session."""
+        self._rates = (capture_rate, output_rate)
+        self._write_header()
+        session = {"capture_rate": capture_rate, "output_rate": output_rate, **(info or {})}
+        self.record(EVENT, ("SESSION " + json.dumps(session)).encode("utf-8"))
+        self._thread = threading.Thread(target=self._run, daemon=True, name="FlightRecorder")
+        self._thread.start()
+        return self
+
+    def record(self, kind: int, payload, flags: int = 0, aux: int = 0):
+        """Empile un enregistrement (payload bytes-like, copié par le thread d'écriture)."""
+        if self._pending_bytes > self.max_pending_bytes:
+            self.dropped += 1
+            return
+        self._pending_bytes += len(payload)
+        self._pending.append((kind, flags, aux, time.monotonic(), payload))
+
+    def event(self, text: str):
+        self.record(EVENT, text.encode("utf-8"))
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval_s):
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        pending = self._pending
+        while pending:
+            kind, flags, aux, t, payload = pending.popleft()
+            self._pending_bytes -= len(payload)
+            try:
+                self._append(kind, flags, aux, t, payload)
+            except (struct.error, ValueError, TypeError) as e:
+                # Un enregistrement invalide ne doit pas arrêter le thread d'écriture
+                self.dropped += 1
+                print(f"[RECORDER] Enregistrement {KIND_NAMES.get(kind, kind)} ignoré: {e}")
+        self._write_header()
+
+    def _append(self, kind: int, flags: int, aux: int, t: float, payload):
+        size = _RECORD.size + len(payload)
+        if size > self.capacity:
+            self.dropped += 1
+            return
+        if self._write_pos + size > self.capacity:
+            # Pas de chevauchement de la fin: nouveau tour d'anneau
+            self._lap_end = self._write_pos
+            self._write_pos = 0
+            self._oldest = 0
+        end = self._write_pos + size
+        # Enregistrements du tour précédent écrasés par celui-ci: le plus ancien intact avance
+        while self._oldest < end and self._oldest < self._lap_end:
+            old_size = _RECORD.size + struct.unpack_from("<I", self._mmap, _HEADER.size + self._oldest)[0]
+            self._oldest += old_size
+        if self._oldest >= self._lap_end:
+            self._oldest = self._lap_end = 0  # Tour précédent entièrement écrasé
+        offset = _HEADER.size + self._write_pos
+        _RECORD.pack_into(self._mmap, offset, len(payload), kind, flags, aux, self._seq, t)
+        self._mmap[offset + _RECORD.size:offset + size] = payload
+        self._write_pos = end
+        self._seq += 1
+        self.written += 1
+
+    def _write_header(self):
+        _HEADER.pack_into(self._mmap, 0, _MAGIC, self.capacity, self._write_pos, self._oldest, self._lap_end,
+                          self._seq, self._lost + self.dropped, *self._rates)
+
+    def close(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self._write_header()
+        self._mmap.flush()
+        self._mmap.close()
+        self._file.close()
+        if self.dropped:
+            print(f"[RECORDER] {self.dropped} enregistrements perdus (écriture en retard ou invalides)")
+
+
+class FlightRecording:
+    """Lecture d'un fichier d'enregistreur de vol (ordre chronologique)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = f.read()
+        header = _HEADER.unpack_from(self._data, 0)
+        if header[0] != _MAGIC:
+            raise ValueError(f"Pas un fichier d'enregistreur de vol (ou format antérieur): {path}")
+        _, self.capacity, self._write_pos, self._oldest, self._lap_end, self.next_seq, self.lost, \
+            self.capture_rate, self.output_rate = header
+
+    def _scan(self, start: int, end: int):
+        pos = start
+        while pos + _RECORD.size <= end:
+            length, kind, flags, aux, seq, t = _RECORD.unpack_from(self._data, _HEADER.size + pos)
+            if kind not in KIND_NAMES:
+                return
+            data_start = _HEADER.size + pos + _RECORD.size
+            yield Record(kind, flags, aux, seq, t, self._data[data_start:data_start + length])
+            pos += _RECORD.size + length
+
+    def records(self):
+        """Tous les enregistrements intacts, du plus ancien au plus récent."""
+        if self._lap_end:
+            yield from self._scan(self._oldest, self._lap_end)
+        yield from self._scan(0, self._write_pos)
+
+    def window(self, last_s: float, end_offset_s: float = 0.0):
+        """Enregistrements des last_s secondes finissant end_offset_s avant le dernier."""
+        records = list(self.records())
+        if not records:
+            return []
+        end = records[-1].t - end_offset_s
+        return [r for r in records if end - last_s <= r.t <= end]
+
+    def summary(self, records):
+        """Lignes de chronologie (hors frames et audio), temps relatifs au premier enregistrement."""
+        if not records:
+            return ["(vide)"]
+        t0 = records[0].t
+        frames = [r for r in records if r.kind == FRAME]
+        speech = sum(1 for r in frames if r.flags & FLAG_SPEECH)
+        lines = [f"{len(records)} enregistrements sur {records[-1].t - t0:.1f}s, {len(frames)} frames micro "
+                 f"({speech / len(frames) if frames else 0:.0%} parole)"]
+        for r in records:
+            if r.kind == EVENT or r.kind == TRANSCRIPT:
+                lines.append(f"  {r.t - t0:8.2f}s {KIND_NAMES[r.kind]:<10} {r.payload.decode('utf-8', 'replace')}")
+            elif r.kind == UTTERANCE:
+                part = "final" if r.flags & FLAG_FINAL else "partiel"
+                lines.append(f"  {r.t - t0:8.2f}s utterance  segment {r.aux} ({part}, {len(r.payload)} octets)")
+        return lines
+
+    @staticmethod
+    def export_frames(records, path: str) -> int:
+        """
+        Écrit en WAV les frames micro de records, silence inséré à la place des
+        trous (frames perdues). Retourne le sample rate.
+        """
+        frames = [r for r in records if r.kind == FRAME]
+        if not frames:
+            raise ValueError("Aucune frame micro dans la fenêtre")
+        rate = frames[-1].aux
+        frames = [r for r in frames if r.aux == rate]  # Rate de la dernière session de la fenêtre
+        chunk_s = len(frames[0].payload) / 2 / rate
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            previous_t = None
+            for r in frames:
+                if previous_t is not None and r.t - previous_t > 1.5 * chunk_s:
+                    wf.writeframes(bytes(int((r.t - previous_t - chunk_s) * rate) * 2))
+                wf.writeframes(r.payload)
+                previous_t = r.t
+        return rate
@@ -0,0 +1,206 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Buckets par défaut pour les latences (secondes)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+class Counter:
+    """
+    Compteur monotone.
+
+    Pas de verrou: chaque métrique ne doit avoir qu'un seul thread écrivain
+    (le thread qui possède l'étape instrumentée). Le scrape lit sans verrou,
+    une valeur légèrement en retard est acceptable.
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    """Valeur instantanée, écrite directement ou calculée au scrape via fn."""
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.fn() if self.fn else self.value
+
+
+class Histogram:
+    """Histogramme à buckets fixes (format Prometheus cumulatif au rendu)."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Dernier slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _CallbackCounter(Counter):
+    """Compteur dont la valeur est lue au scrape (compteur tenu par un composant)."""
+
+    def __init__(self, fn: Callable[[], float]):
+        super().__init__()
+        self.fn = fn
+
+    @property
+    def value(self):
+        return self.fn()
+
+    @value.setter
+    def value(self, _):
+        pass
+
+
+class _MapSeries:
+    """Séries d'une famille lues au scrape depuis un dict {valeur_label: valeur}."""
+
+    def __init__(self, label: str, fn: Callable[[], dict]):
+        self.label = label
+        self.fn = fn
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+    """
+    Registre de métriques rendu au format texte Prometheus.
+
+    Les métriques sont créées une fois (au démarrage) puis mises à jour depuis
+    le hot path sans verrou. Une famille (même nom) peut avoir plusieurs séries
+    distinguées par leurs labels.
+    """
+
+    def __init__(self, prefix: str = "voicechanger_"):
+        self.prefix = prefix
+        self._families: Dict[str, dict] = {}
+        self._lock = threading.Lock()  # Protège uniquement l'enregistrement
+
+    def _register(self, name: str, kind: str, help_text: str, labels: Optional[dict], metric):
+        full_name = self.prefix + name
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._families.setdefault(
+                full_name, {"type": kind, "help": help_text, "series": {}}
+            )
+            if family["type"] != kind:
+                raise ValueError(f"Métrique {full_name} déjà enregistrée en {family['type']}")
+            family["series"][key] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Optional[dict] = None,
+                fn: Optional[Callable[[], float]] = None) -> Counter:
+        metric = _CallbackCounter(fn) if fn else Counter()
+        return self._register(name, "counter", help_text, labels, metric)
+
+    def gauge(self, name: str, help_text: str, labels: Optional[dict] = None,
+              fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(name, "gauge", help_text, labels, Gauge(fn))
+
+    def counter_map(self, name: str, help_text: str, label: str, fn: Callable[[], dict],
+                    labels: Optional[dict] = None):
+        """Famille de compteurs aux labels dynamiques (ex: erreurs par code HTTP)."""
+        return self._register(name, "counter", help_text, labels, _MapSeries(label, fn))
+
+    def histogram(self, name: str, help_text: str, labels: Optional[dict] = None,
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(name, "histogram", help_text, labels, Histogram(buckets))
+
+    def render(self) -> str:
+        """Sérialise toutes les métriques au format d'exposition Prometheus 0.0.4."""
+        with self._lock:
+            families = [(name, dict(f, series=dict(f["series"]))) for name, f in self._families.items()]
+
+        lines = []
+        for name, family in families:
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for labels, metric in family["series"].items():
+                if isinstance(metric, _MapSeries):
+                    for value, count in list(metric.fn().items()):
+                        series_labels = labels + ((metric.label, value),)
+                        lines.append(f"{name}{_format_labels(series_labels)} {_format_value(count)}")
+                elif family["type"] == "histogram":
+                    cumulative = 0
+                    bounds = [str(b) for b in metric.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, metric.counts):
+                        cumulative += count
+                        le = 'le="' + bound + '"'
+                        lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(metric.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+                elif family["type"] == "gauge":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.get())}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Endpoint HTTP local exposant /metrics (thread daemon, aucun impact sur le pipeline)."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Pas de log par requête dans la console du pipeline
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="MetricsThread"
+        )
+        self._thread.start()
+        print(f"[METRICS] Endpoint Prometheus: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,213 @@
+"""
+Banque de phrases pré-rendues: répliques fixes (salutations, lectures de
+sponsor, réactions) synthétisées une fois par Inworld et rangées dans un seul
+fichier pack indexé, mappé en mémoire.
+
+À l'exécution, un raccourci clavier ou une transcription identique joue le
+clip directement, sans STT ni appel Inworld: le clip est une memoryview en
+lecture seule sur le mapping, aucune copie ni lecture disque d'avance.
+
+Format du pack:
+    en-tête (16 octets): magic, version, taille de l'index
+    index JSON (UTF-8): voix, modèle, sample rate, et par phrase texte,
+    raccourci, clé de requête, position et taille du PCM
+    PCM 16-bit mono de toutes les phrases, bout à bout: le bloc commence à
+    la première frontière de 4096 octets après l'index (les clips eux-mêmes
+    ne sont pas alignés, leur position est donnée par l'index)
+
+Le pack est reconstruit quand la voix, le modèle, le sample rate ou la liste
+de phrases change. Les clips dont la clé de requête n'a pas changé sont
+repris de l'ancien pack au lieu d'être resynthétisés.
+"""
+import csv
+import json
+import mmap
+import os
+import re
+import struct
+import time
+
+_MAGIC = b"TTSPHRAS"
+_VERSION = 1
+_HEADER = struct.Struct("<8sII")  # magic, version, taille de l'index
+_ALIGN = 4096
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    """Forme comparée aux transcriptions: minuscules, sans ponctuation ni espaces superflus."""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def default_pack_path(phrases_path: str) -> str:
+    return os.path.splitext(phrases_path)[0] + ".pack"
+
+
+def load_phrases(path: str):
+    """Lit les phrases (text, hotkey optionnel) d'un CSV ou d'un JSONL."""
+    phrases = []
+    hotkeys = set()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for record in records:
+            text = (record.get("text") or "").strip()
+            hotkey = (record.get("hotkey") or "").strip() or None
+            if not text:
+                continue
+            if hotkey and hotkey in hotkeys:
+                raise ValueError(f"Raccourci '{hotkey}' attribué à plusieurs phrases")
+            hotkeys.add(hotkey)
+            phrases.append({"text": text, "hotkey": hotkey})
+    return phrases
+
+
+class PhraseBank:
+    """
+    Pack de phrases mappé en lecture seule.
+
+    clip(i) retourne une memoryview sur le PCM de la phrase i, valable tant
+    que la banque n'est pas fermée.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Pack de phrases vide: {path}")
+        magic, version, index_len = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"Pas un pack de phrases (ou version incompatible): {path}")
+        index = json.loads(self._mmap[_HEADER.size:_HEADER.size + index_len].decode("utf-8"))
+        self.voice_id = index["voice_id"]
+        self.model_id = index["model_id"]
+        self.sample_rate = index["sample_rate"]
+        self.phrases = index["phrases"]
+        self._data_start = _aligned(_HEADER.size + index_len)
+        self._view = memoryview(self._mmap)
+        self._by_text = {normalize_text(p["text"]): i for i, p in enumerate(self.phrases)}
+
+    def is_current(self, voice_id: str, model_id: str, sample_rate: int, phrases) -> bool:
+        """Vrai si le pack correspond à cette voix, ce modèle, ce rate et cette liste de phrases."""
+        return (self.voice_id == voice_id and self.model_id == model_id and self.sample_rate == sample_rate
+                and [(p["text"], p["hotkey"]) for p in self.phrases] == [(p["text"], p["hotkey"]) for p in phrases])
+
+    def clip(self, index: int):
+        phrase = self.phrases[index]
+        start = self._data_start + phrase["offset"]
+        return self._view[start:start + phrase["length"]]
+
+    def clip_by_key(self, key: str):
+        for i, phrase in enumerate(self.phrases):
+            if phrase["key"] == key:
+                return self.clip(i)
+        return None
+
+    def match(self, text: str):
+        """Index de la phrase dont le texte est celui transcrit (à la casse et ponctuation près), sinon None."""
+        return self._by_text.get(normalize_text(text))
+
+    def hotkeys(self) -> dict:
+        """{nom de touche: index de phrase} pour les phrases qui ont un raccourci."""
+        return {p["hotkey"]: i for i, p in enumerate(self.phrases) if p["hotkey"]}
+
+    def duration(self, index: int) -> float:
+        return self.phrases[index]["length"] / 2 / self.sample_rate
+
+    def close(self):
+        view = getattr(self, "_view", None)
+        try:
+            if view is not None:
+                view.release()
+            self._mmap.close()
+        except BufferError:
+            pass  # Un clip est encore en lecture: le mapping sera libéré avec lui
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def build_pack(phrases, pack_path: str, client, voice_id: str, previous: PhraseBank = None) -> dict:
+    """
+    Synthétise phrases via client (InworldTTSClient) et écrit le pack.
+
+    Les clips de previous dont la clé de requête est inchangée sont repris
+    tels quels. previous est fermé avant le remplacement du fichier (un
+    fichier mappé ne peut pas être remplacé sous Windows).
+
+    Returns:
+        Statistiques (phrases, synthétisées, reprises, secondes d'audio)
+    """
+    from client.inworld import request_key
+
+    entries = []
+    clips = []
+    synthesized = reused = 0
+    start = time.perf_counter()
+    for i, phrase in enumerate(phrases, 1):
+        key = request_key(phrase["text"], voice_id, client.model_id, client.sample_rate)
+        pcm = previous.clip_by_key(key) if previous is not None else None
+        if pcm is not None:
+            pcm = bytes(pcm)
+            reused += 1
+        else:
+            pcm = client.synthesize(phrase["text"], voice_id, stream=False)
+            synthesized += 1
+            print(f"[PHRASES] [{i}/{len(phrases)}] '{phrase['text'][:40]}' "
+                  f"({len(pcm) / 2 / client.sample_rate:.1f}s)")
+        entries.append({"text": phrase["text"], "hotkey": phrase["hotkey"], "key": key,
+                        "offset": sum(len(c) for c in clips), "length": len(pcm)})
+        clips.append(pcm)
+
+    index = json.dumps({"voice_id": voice_id, "model_id": client.model_id, "sample_rate": client.sample_rate,
+                        "phrases": entries}, ensure_ascii=False).encode("utf-8")
+    header_len = _HEADER.size + len(index)
+    tmp = pack_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(index)))
+        f.write(index)
+        f.write(bytes(_aligned(header_len) - header_len))
+        for pcm in clips:
+            f.write(pcm)
+    if previous is not None:
+        previous.close()
+    os.replace(tmp, pack_path)
+    audio_s = sum(len(c) for c in clips) / 2 / client.sample_rate
+    return {"phrases": len(phrases), "synthesized": synthesized, "reused": reused, "audio_s": audio_s,
+            "wall_s": time.perf_counter() - start}
+
+
+def open_phrase_bank(phrases_path: str, pack_path: str, client, voice_id: str) -> PhraseBank:
+    """Ouvre le pack de phrases_path, reconstruit d'abord s'il est absent ou obsolète."""
+    pack_path = pack_path or default_pack_path(phrases_path)
+    phrases = load_phrases(phrases_path)
+    previous = None
+    if os.path.exists(pack_path):
+        try:
+            previous = PhraseBank(pack_path)
+        except ValueError as e:
+            print(f"[PHRASES] {e}, reconstruction")
+        else:
+            if previous.is_current(voice_id, client.model_id, client.sample_rate, phrases):
+                return previous
+            print(f"[PHRASES] Pack obsolète (voix {previous.voice_id}, modèle {previous.model_id}, "
+                  f"{previous.sample_rate}Hz, {len(previous.phrases)} phrases), reconstruction")
+    stats = build_pack(phrases, pack_path, client, voice_id, previous)
+    print(f"[PHRASES] Pack {pack_path}: {stats['phrases']} phrases ({stats['audio_s']:.1f}s d'audio), "
+          f"{stats['synthesized']} synthétisées, {stats['reused']} reprises en {stats['wall_s']:.1f}s")
+    return PhraseBank(pack_path)
@@ -0,0 +1,125 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+# Fonctions Python où un thread ne fait qu'attendre (queue vide, Event, Condition)
+_IDLE_FUNCTIONS = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("selectors.py", "select"),
+}
+
+
+class SamplingProfiler:
+    """
+    Profileur échantillonnant de tous les threads Python du processus.
+
+    Un thread daemon relève la pile de chaque thread (sys._current_frames)
+    toutes les interval_s secondes: coût proportionnel à la fréquence
+    d'échantillonnage, pas au code profilé, et aucun hook dans le hot path.
+    Le temps passé dans du code natif (webrtcvad, PortAudio, inférence STT)
+    est attribué à la fonction Python appelante.
+
+    Les piles d'un thread bloqué en attente (queue.get, Event.wait) sont
+    comptées à part comme "idle" et exclues du résumé.
+
+    À l'arrêt, écrit pour chaque thread un fichier de piles repliées
+    (<thread>.collapsed, format flamegraph.pl / speedscope) et un résumé top-N
+    (summary.txt, aussi affiché).
+    """
+
+    def __init__(self, output_dir: str = "profiles", interval_s: float = 0.005, top_n: int = 15,
+                 ignore_threads=()):
+        """
+        Args:
+            output_dir: Dossier parent des résultats (un sous-dossier horodaté par session)
+            interval_s: Période d'échantillonnage
+            top_n: Fonctions listées par thread dans le résumé
+            ignore_threads: Noms de threads à ne pas échantillonner (ex: thread principal qui dort)
+        """
+        self.output_dir = output_dir
+        self.ignore_threads = set(ignore_threads)
+        self.interval_s = interval_s
+        self.top_n = top_n
+        self.samples = 0
+        self._stacks = collections.defaultdict(collections.Counter)  # thread -> pile repliée -> count
+        self._idle = collections.Counter()                           # thread -> samples en attente
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="SamplingProfiler")
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f"native-{ident}")
+                if ident == own or name in self.ignore_threads:
+                    continue
+                self._sample(name, frame)
+            self.samples += 1
+
+    def _sample(self, thread_name: str, frame):
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FUNCTIONS:
+            self._idle[thread_name] += 1
+            return
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self._stacks[thread_name][";".join(reversed(stack))] += 1
+
+    def stop(self):
+        """Arrête l'échantillonnage, écrit les fichiers et affiche le résumé."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        duration = time.monotonic() - self._started_at
+
+        run_dir = os.path.join(self.output_dir, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(run_dir, exist_ok=True)
+        for thread_name, stacks in self._stacks.items():
+            safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in thread_name)
+            with open(os.path.join(run_dir, f"{safe}.collapsed"), "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        summary = self.summary(duration)
+        with open(os.path.join(run_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary + "\n")
+        print(summary)
+        print(f"[PROFILE] Piles repliées et résumé: {run_dir}/")
+
+    def summary(self, duration_s: float) -> str:
+        """Top-N par thread: temps propre (fonction en haut de pile) et inclusif."""
+        lines = [f"[PROFILE] {self.samples} échantillons en {duration_s:.1f}s "
+                 f"(intervalle {self.interval_s * 1000:.0f}ms)"]
+        threads = sorted(self._stacks, key=lambda t: -sum(self._stacks[t].values()))
+        for thread_name in threads:
+            stacks = self._stacks[thread_name]
+            active = sum(stacks.values())
+            total = active + self._idle[thread_name]
+            self_counts = collections.Counter()
+            inclusive = collections.Counter()
+            for stack, count in stacks.items():
+                frames = stack.split(";")
+                self_counts[frames[-1]] += count
+                for name in set(frames):
+                    inclusive[name] += count
+            lines.append("")
+            lines.append(f"== {thread_name}: actif {active / total:.0%} des échantillons ({active}/{total})")
+            lines.append(f"   {'propre':>7} {'inclus':>7}  fonction")
+            for name, count in self_counts.most_common(self.top_n):
+                lines.append(f"   {count / active:>7.1%} {inclusive[name] / active:>7.1%}  {name}")
+        return "\n".join(lines)
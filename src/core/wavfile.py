@@ -0,0 +1,145 @@
+import mmap
+import queue
+import struct
+import threading
+import wave
+
+import numpy as np
+
+
+class MappedWav:
+    """
+    Fichier WAV PCM mappé en mémoire (lecture seule, sans copie).
+
+    Contrairement à wave.readframes(), rien n'est lu d'avance: `pcm` est une
+    memoryview sur la zone de données du fichier, les pages sont chargées par
+    l'OS à la demande. À utiliser comme context manager pour libérer le mapping.
+
+        with MappedWav("long.wav") as wav:
+            samples = wav.samples()  # np.ndarray int16 sur le mapping
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Fichier vide: mmap refuse une taille nulle
+            self._file.close()
+            raise ValueError(f"Fichier WAV vide: {path}")
+        self._parse()
+
+    def _parse(self):
+        data = self._mmap
+        if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+            self.close()
+            raise ValueError(f"Pas un fichier WAV RIFF: {self.path}")
+
+        fmt = None
+        offset = 12
+        while offset + 8 <= len(data):
+            chunk_id = data[offset:offset + 4]
+            chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack_from("<HHIIHH", data, body)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    break
+                audio_format, self.channels, self.sample_rate, _, _, bits = fmt
+                if audio_format not in (1, 0xFFFE) or bits != 16:
+                    self.close()
+                    raise ValueError(f"Seul le PCM 16-bit est supporté: {self.path}")
+                self.sample_width = 2
+                # Fichiers tronqués (enregistrement interrompu): on borne à la taille réelle
+                end = min(body + chunk_size, len(data))
+                end -= (end - body) % (self.channels * self.sample_width)
+                self.data_offset = body
+                self.pcm = memoryview(data)[body:end]
+                return
+            offset = body + chunk_size + (chunk_size & 1)  # Les chunks RIFF sont alignés sur 2 octets
+
+        self.close()
+        raise ValueError(f"Chunk fmt/data introuvable: {self.path}")
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.pcm) // (self.channels * self.sample_width)
+
+    @property
+    def duration_s(self) -> float:
+        return self.n_frames / self.sample_rate
+
+    def samples(self) -> np.ndarray:
+        """Échantillons int16 (frames x canaux aplaties) sans copie."""
+        return np.frombuffer(self.pcm, dtype="<i2")
+
+    def mono_pcm(self):
+        """PCM 16-bit mono: vue directe si mono, sinon downmix (copie)."""
+        if self.channels == 1:
+            return self.pcm
+        frames = self.samples().reshape(-1, self.channels).astype(np.int32)
+        return frames.mean(axis=1).astype(np.int16).tobytes()
+
+    def close(self):
+        try:
+            pcm = getattr(self, "pcm", None)
+            if pcm is not None:
+                pcm.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            pass  # Une vue numpy est encore vivante: le mapping sera libéré avec elle
+        self.pcm = None
+        self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SegmentWriter:
+    """
+    Écrit des fichiers WAV PCM 16-bit mono depuis un thread dédié.
+
+    write() ne fait qu'enfiler (path, pcm): le thread appelant (capture audio,
+    boucle de segmentation) ne touche jamais le disque. La file est bornée,
+    write() bloque si le disque ne suit pas plutôt que d'accumuler en mémoire.
+    """
+
+    def __init__(self, sample_rate: int = 48000, max_pending: int = 64):
+        self.sample_rate = sample_rate
+        self.written = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="SegmentWriterThread")
+        self._thread.start()
+
+    def write(self, path: str, pcm: bytes):
+        self._queue.put((path, pcm))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            path, pcm = item
+            try:
+                with wave.open(path, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(self.sample_rate)
+                    wf.writeframes(pcm)
+                self.written += 1
+            except OSError as e:
+                self.errors += 1
+                print(f"[WRITER] Erreur d'écriture {path}: {e}")
+
+    def close(self):
+        """Vide la file puis arrête le thread."""
+        self._queue.put(None)
+        self._thread.join()
@@ -1,10 +1,12 @@
 import argparse
+import atexit
 import os
 import sys
 import time
 from dotenv import load_dotenv
 from core.audio import AudioDeviceManager, AudioOutput, MicCapture
 from client.inworld import InworldAuth, InworldTTSClient
+from client.token_auth import create_auth
 from processing.vad import VoiceActivityDetector, UtteranceBuffer
 
 def main():
@@ -12,8 +14,72 @@ def main():
     parser = argparse.ArgumentParser(description="TTS-inworldAPI MVP")
     subparsers = parser.add_subparsers(dest="command")
 
+    def add_profile_args(command_parser):
+        command_parser.add_argument("--profile", action="store_true", help="Sample all threads and write collapsed stacks + top-N summary on exit")
+        command_parser.add_argument("--profile-dir", type=str, default="profiles", help="Output directory for profiles")
+        command_parser.add_argument("--profile-interval", type=float, default=5.0, help="Sampling interval (ms)")
+
+    def add_pipeline_args(command_parser, flight_recorder=None):
+        command_parser.add_argument("--input-device", type=int, help="Input device ID (microphone)")
+        command_parser.add_argument("--output-device", type=int, help="Output device ID (virtual cable)")
+        command_parser.add_argument("--audio-backend", type=str, default="pyaudio", choices=["pyaudio", "numpy", "file", "null"], help="Audio I/O backend (null: no sound card)")
+        command_parser.add_argument("--latency", type=str, default="low", help="Suggested device latency: low, high or seconds (numpy backend)")
+        command_parser.add_argument("--output-buffer-ms", type=int, default=20, help="Playback block size (ms)")
+        command_parser.add_argument("--monitor-device", type=int, action="append", default=[], help="Extra output device playing the same voice (repeatable)")
+        command_parser.add_argument("--monitor-gain", type=float, action="append", default=[], help="Gain of each --monitor-device, in order (default 1.0)")
+        command_parser.add_argument("--output-gain", type=float, default=1.0, help="Gain of the main output when monitors are used")
+        command_parser.add_argument("--jitter-ms", type=int, default=0, help="Audio buffered per output before a stream starts playing (with monitors)")
+        command_parser.add_argument("--input-file", type=str, default=None, help="File backend: input WAV, or - for raw PCM on stdin")
+        command_parser.add_argument("--output-file", type=str, default=None, help="File backend: output WAV, or - for raw PCM on stdout")
+        command_parser.add_argument("--voice", type=str, help="Inworld voice ID (overrides .env)")
+        command_parser.add_argument("--stt", type=str, default="vosk", choices=["vosk", "whisper", "windows"], help="STT engine (vosk, whisper, or windows)")
+        command_parser.add_argument("--model", type=str, default="models/vosk-model-small-fr-0.22", help="Path to Vosk model")
+        command_parser.add_argument("--whisper-model", type=str, default="base", choices=["tiny", "base", "small", "medium"], help="Whisper model size")
+        command_parser.add_argument("--vosk-grammar", type=str, default=None, help="Phrase list (.txt, one per line, or .json) constraining Vosk decoding")
+        command_parser.add_argument("--vosk-grammar-mode", type=str, default="hybrid", choices=["grammar", "hybrid"], help="grammar: constrained only; hybrid: open vocabulary when confidence is low")
+        command_parser.add_argument("--vosk-min-confidence", type=float, default=0.6, help="Hybrid mode: mean word confidence below which Vosk re-decodes with open vocabulary")
+        command_parser.add_argument("--whisper-profile", type=str, default=None, help="Calibrated Whisper CPU profile (default: WHISPER_PROFILE or whisper_profile.json)")
+        command_parser.add_argument("--stt-reserve-cpus", type=int, default=None, help="Keep the first N CPUs free for audio capture: pin Whisper inference to the others (Linux)")
+        command_parser.add_argument("--language", type=str, default="fr", help="Language code for STT (fr, en, etc.)")
+        command_parser.add_argument("--stt-fast", type=str, default=None, choices=["vosk", "whisper-tiny"], help="Fast STT engine cascaded with --stt (both stay loaded)")
+        command_parser.add_argument("--stt-deadline", type=float, default=0.8, help="Per-utterance STT deadline (s) in cascade mode")
+        command_parser.add_argument("--stt-cascade", type=str, default="parallel", choices=["parallel", "fallback"], help="Run the fast engine alongside the main one, or only after the deadline")
+        command_parser.add_argument("--vad-aggressiveness", type=int, default=3, choices=[0, 1, 2, 3], help="VAD aggressiveness (0=least, 3=most)")
+        command_parser.add_argument("--min-speech-ms", type=int, default=0, help="Discard turns with less speech than this, e.g. clicks (0 = keep all)")
+        command_parser.add_argument("--max-utterance", type=float, default=10.0, help="Max seconds per STT segment; longer turns are split at a pause (0 = unlimited)")
+        command_parser.add_argument("--target-lag", type=float, default=2.0, help="Unplayed TTS audio (s) above which playback catches up")
+        command_parser.add_argument("--max-speaking-rate", type=float, default=1.0, help="Max Inworld speakingRate when lagging (1.0 = off)")
+        command_parser.add_argument("--max-time-compression", type=float, default=1.0, help="Max WSOLA speed-up of queued audio when lagging (1.0 = off)")
+        command_parser.add_argument("--sample-rate", type=int, default=None, choices=[16000, 32000, 48000], help="Capture rate (default: lowest supported by the mic)")
+        command_parser.add_argument("--output-rate", type=int, default=None, help="TTS/playback rate (default: output device native rate)")
+        command_parser.add_argument("--coalesce-window", type=float, default=0.0, help="Wait this long (s) for the next transcript and merge it into one TTS request (0 = off)")
+        command_parser.add_argument("--coalesce-max-delay", type=float, default=1.5, help="Max delay (s) added to a transcript by coalescing")
+        command_parser.add_argument("--prefilter-threshold", type=float, default=0.0, help="Acoustic pre-STT speech score threshold (0 disables; pick one with eval-prefilter)")
+        command_parser.add_argument("--ptt", action="store_true", help="Enable push-to-talk mode")
+        command_parser.add_argument("--ptt-key", type=str, default=None, help="PTT key (space, f1, f2, f3, f4, ctrl_r, caps_lock)")
+        queue_policies = ["drop-oldest", "drop-newest", "merge", "shed-stale"]
+        command_parser.add_argument("--audio-queue-size", type=int, default=5, help="Max utterances waiting for STT")
+        command_parser.add_argument("--audio-queue-policy", type=str, default="drop-newest", choices=queue_policies, help="Overload policy for the STT queue")
+        command_parser.add_argument("--tts-queue-size", type=int, default=50, help="Max audio chunks waiting for playback")
+        command_parser.add_argument("--tts-queue-policy", type=str, default="block", choices=["block"] + queue_policies, help="Overload policy for the playback queue (block: backpressure on the TTS stream; others drop whole utterances)")
+        command_parser.add_argument("--stale-deadline", type=float, default=8.0, help="Max age in seconds of a queued item (shed-stale policy)")
+        command_parser.add_argument("--tts-timeout", type=float, default=15.0, help="Total deadline per Inworld request (s)")
+        command_parser.add_argument("--tts-first-byte-timeout", type=float, default=5.0, help="Deadline to the first response byte (s)")
+        command_parser.add_argument("--tts-retries", type=int, default=3, help="Max attempts per Inworld request")
+        command_parser.add_argument("--tts-encoding", type=str, default="LINEAR16", choices=["LINEAR16", "OGG_OPUS", "MP3"], help="Audio transport from Inworld (compressed needs ffmpeg)")
+        command_parser.add_argument("--tts-stream", action="store_true", help="Play TTS audio as soon as the first chunk arrives")
+        command_parser.add_argument("--token-url", type=str, default=None, help="Session token endpoint: use refreshed Bearer tokens instead of Basic auth (default: INWORLD_TOKEN_URL)")
+        command_parser.add_argument("--tts-hedge", action="store_true", help="Send a duplicate request when the first one is slower than p95")
+        command_parser.add_argument("--metrics-port", type=int, default=None, help="Expose Prometheus metrics on 127.0.0.1:PORT")
+        command_parser.add_argument("--flight-recorder", type=str, default=flight_recorder, help="Flight recorder ring file (frames, VAD, utterances, transcripts, TTS audio)")
+        command_parser.add_argument("--flight-recorder-mb", type=int, default=64, help="Flight recorder ring size (MB)")
+        command_parser.add_argument("--no-flight-recorder", action="store_true", help="Disable the flight recorder")
+        command_parser.add_argument("--phrases", type=str, default=None, help="CSV/JSONL of pre-rendered phrases (text, hotkey), played on hotkey or exact transcript match")
+        command_parser.add_argument("--phrase-pack", type=str, default=None, help="Phrase pack file (default: --phrases with a .pack extension)")
+
     # Command: list-devices
-    subparsers.add_parser("list-devices", help="List audio input/output devices")
+    devices_parser = subparsers.add_parser("list-devices", help="List audio input/output devices")
+    devices_parser.add_argument("--audio-backend", type=str, default="pyaudio", choices=["pyaudio", "numpy"], help="Audio backend to query")
 
     # Command: list-voices
     subparsers.add_parser("list-voices", help="List available Inworld voices")
@@ -24,6 +90,71 @@ def main():
     tts_parser.add_argument("--voice", type=str, help="Voice ID (overrides .env)")
     tts_parser.add_argument("--output", type=str, default="output.wav", help="Output file (test mode)")
     tts_parser.add_argument("--play", action="store_true", help="Play audio immediately")
+    tts_parser.add_argument("--encoding", type=str, default=None, choices=["LINEAR16", "OGG_OPUS", "MP3"], help="Transport encoding (decoded locally to PCM)")
+
+    # Command: synthesize-batch
+    batch_tts_parser = subparsers.add_parser("synthesize-batch", help="Synthesize a CSV/JSONL of (text, voice_id) to WAV files")
+    batch_tts_parser.add_argument("--input", type=str, required=True, help="CSV (text,voice_id columns) or JSONL file")
+    batch_tts_parser.add_argument("--output-dir", type=str, default="synth_output", help="Directory for WAV files and manifest.jsonl")
+    batch_tts_parser.add_argument("--voice", type=str, help="Default voice ID for rows without one (overrides .env)")
+    batch_tts_parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests")
+    batch_tts_parser.add_argument("--rate", type=float, default=5.0, help="Max requests per second (token bucket)")
+    batch_tts_parser.add_argument("--burst", type=int, default=2, help="Token bucket burst size")
+    batch_tts_parser.add_argument("--retries", type=int, default=5, help="Max attempts per request")
+    batch_tts_parser.add_argument("--encoding", type=str, default=None, choices=["LINEAR16", "OGG_OPUS", "MP3"], help="Transport encoding (decoded locally to PCM)")
+    batch_tts_parser.add_argument("--mock", action="store_true", help="Run against a local mock Inworld server")
+    batch_tts_parser.add_argument("--mock-error-rate", type=float, default=0.0, help="Mock server 503 probability (with --mock)")
+
+    # Command: build-phrases
+    phrases_parser = subparsers.add_parser("build-phrases", help="Pre-render a phrase list into a memory-mapped pack for hotkey playback")
+    phrases_parser.add_argument("--phrases", type=str, required=True, help="CSV (text,hotkey columns) or JSONL file")
+    phrases_parser.add_argument("--pack", type=str, default=None, help="Pack file (default: --phrases with a .pack extension)")
+    phrases_parser.add_argument("--voice", type=str, help="Voice ID (overrides .env)")
+    phrases_parser.add_argument("--output-rate", type=int, default=48000, help="Sample rate of the clips (must match the run output rate)")
+    phrases_parser.add_argument("--encoding", type=str, default=None, choices=["LINEAR16", "OGG_OPUS", "MP3"], help="Transport encoding (decoded locally to PCM)")
+    phrases_parser.add_argument("--mock", action="store_true", help="Run against a local mock Inworld server")
+
+    # Command: bench-transport
+    bench_tr_parser = subparsers.add_parser("bench-transport", help="Benchmark LINEAR16 vs compressed TTS transport on a local mock server")
+    bench_tr_parser.add_argument("--encodings", type=str, nargs="+", default=["LINEAR16", "OGG_OPUS", "MP3"], choices=["LINEAR16", "OGG_OPUS", "MP3"], help="Encodings to compare")
+    bench_tr_parser.add_argument("--runs", type=int, default=5, help="Requests per encoding")
+    bench_tr_parser.add_argument("--bandwidth-kbps", type=float, default=2000, help="Simulated link bandwidth (0 = unlimited)")
+    bench_tr_parser.add_argument("--fixtures", type=str, default=None, help="Directory with clip.pcm/clip.ogg/clip.mp3 fixtures")
+    add_profile_args(bench_tr_parser)
+
+    # Command: bench-stream-parser
+    bench_sp_parser = subparsers.add_parser("bench-stream-parser", help="Benchmark streaming TTS response decoding (CPU, allocations)")
+    bench_sp_parser.add_argument("--fixture", type=str, default=None, help="Recorded voice:stream response body (default: synthetic)")
+    bench_sp_parser.add_argument("--chunk-size", type=int, default=1400, help="Mean network chunk size in bytes")
+    bench_sp_parser.add_argument("--repeats", type=int, default=5, help="CPU timing repeats (best is kept)")
+    add_profile_args(bench_sp_parser)
+
+    # Command: bench-rates
+    bench_rates_parser = subparsers.add_parser("bench-rates", help="Benchmark capture-side CPU at 48 kHz vs 16 kHz")
+    bench_rates_parser.add_argument("--seconds", type=float, default=120.0, help="Simulated session length per rate")
+    add_profile_args(bench_rates_parser)
+
+    # Command: bench
+    bench_parser = subparsers.add_parser("bench", help="Component micro-benchmarks (no devices, no network) with baseline comparison")
+    bench_parser.add_argument("--output", type=str, default=None, help="Write results to this JSON file")
+    bench_parser.add_argument("--baseline", type=str, default=None, help="Compare against this results JSON (exit 1 on regression)")
+    bench_parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown (or allocation increase) counted as a regression")
+    bench_parser.add_argument("--sample-rate", type=int, default=48000, choices=[16000, 32000, 48000], help="Capture rate of the benchmark audio")
+    bench_parser.add_argument("--seconds", type=float, default=60.0, help="Synthetic audio length")
+    bench_parser.add_argument("--fixture", type=str, default=None, help="Mono WAV used instead of synthetic audio")
+    bench_parser.add_argument("--repeats", type=int, default=5, help="Timing passes (best is kept)")
+    bench_parser.add_argument("--vosk-model", type=str, default=None, help="Also benchmark VoskSTTEngine.transcribe with this model")
+    bench_parser.add_argument("--only", type=str, nargs="+", default=None, help="Run only benchmarks whose name starts with these prefixes")
+
+    # Command: mock-inworld
+    mock_parser = subparsers.add_parser("mock-inworld", help="Run a local fake Inworld TTS server with fault injection")
+    mock_parser.add_argument("--port", type=int, default=8099, help="Port to listen on (127.0.0.1)")
+    mock_parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 503 response")
+    mock_parser.add_argument("--hang-rate", type=float, default=0.0, help="Probability of a request that never answers")
+    mock_parser.add_argument("--header-delay", type=float, default=0.0, help="Delay before response headers (s)")
+    mock_parser.add_argument("--first-byte-delay", type=float, default=0.0, help="Delay between headers and body (s)")
+    mock_parser.add_argument("--slow-body-rate", type=float, default=0.0, help="Probability of a trickled response body")
+    mock_parser.add_argument("--token-ttl", type=float, default=None, help="Also run a stub token endpoint issuing JWTs with this lifetime (s) and require them")
 
     # Command: test-vad
     vad_parser = subparsers.add_parser("test-vad", help="Test Microphone Capture & VAD")
@@ -35,23 +166,101 @@ def main():
     stt_parser.add_argument("--file", type=str, required=True, help="WAV file to transcribe")
     stt_parser.add_argument("--model", type=str, default="models/vosk-model-small-fr-0.22", help="Path to Vosk model")
 
+    # Command: eval-prefilter
+    prefilter_parser = subparsers.add_parser("eval-prefilter", help="Evaluate the pre-STT noise filter on labelled clips")
+    prefilter_parser.add_argument("--dir", type=str, required=True, help="Directory with speech/ and noise/ subfolders of WAV clips")
+    prefilter_parser.add_argument("--threshold", type=float, action="append", help="Threshold to evaluate (repeatable, default: sweep)")
+
+    # Command: bench-grammar
+    grammar_parser = subparsers.add_parser("bench-grammar", help="Compare open, grammar and hybrid Vosk decoding on labelled clips")
+    grammar_parser.add_argument("--dir", type=str, required=True, help="Directory of WAV clips, each with a .txt reference transcript")
+    grammar_parser.add_argument("--grammar", type=str, required=True, help="Phrase list (.txt, one per line, or .json)")
+    grammar_parser.add_argument("--model", type=str, default="models/vosk-model-small-fr-0.22", help="Path to Vosk model")
+    grammar_parser.add_argument("--min-confidence", type=float, default=0.6, help="Hybrid mode confidence threshold")
+
+    # Command: sweep-endpointing
+    sweep_parser = subparsers.add_parser("sweep-endpointing", help="Sweep VAD/endpointing parameters on labelled recordings")
+    sweep_parser.add_argument("--dir", type=str, required=True, help="WAV files with Audacity label files (same name, .txt)")
+    sweep_parser.add_argument("--aggressiveness", type=int, nargs="+", default=[0, 1, 2, 3], help="VAD aggressiveness values")
+    sweep_parser.add_argument("--min-speech-ms", type=int, nargs="+", default=[100, 200, 300], help="min_speech_ms values")
+    sweep_parser.add_argument("--min-silence-ms", type=int, nargs="+", default=[300, 400, 500, 600, 800], help="min_silence_ms values")
+    sweep_parser.add_argument("--padding-ms", type=int, nargs="+", default=[100, 200, 300], help="padding_ms values")
+    sweep_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    sweep_parser.add_argument("--output", type=str, default=None, help="Write every grid point to this JSONL file")
+
+    # Command: transcribe-batch
+    batch_stt_parser = subparsers.add_parser("transcribe-batch", help="Transcribe a directory of WAV files on a process pool (JSONL, resumable)")
+    batch_stt_parser.add_argument("--dir", type=str, required=True, help="Directory of WAV files (searched recursively)")
+    batch_stt_parser.add_argument("--output", type=str, default="transcripts.jsonl", help="JSONL results file (appended, already done files are skipped)")
+    batch_stt_parser.add_argument("--stt", type=str, default="vosk", choices=["vosk", "whisper", "windows"], help="STT engine")
+    batch_stt_parser.add_argument("--model", type=str, default="models/vosk-model-small-fr-0.22", help="Path to Vosk model")
+    batch_stt_parser.add_argument("--whisper-model", type=str, default="base", choices=["tiny", "base", "small", "medium"], help="Whisper model size")
+    batch_stt_parser.add_argument("--language", type=str, default="fr", help="Language code for STT")
+    batch_stt_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    batch_stt_parser.add_argument("--threads-per-worker", type=int, default=1, help="Native inference threads per worker")
+
+    # Command: calibrate-whisper
+    calibrate_parser = subparsers.add_parser("calibrate-whisper", help="Benchmark Whisper CPU settings on a clip and save the best profile")
+    calibrate_parser.add_argument("--file", type=str, required=True, help="Fixture WAV (16, 32 or 48kHz speech)")
+    calibrate_parser.add_argument("--whisper-model", type=str, default="base", choices=["tiny", "base", "small", "medium"], help="Whisper model size")
+    calibrate_parser.add_argument("--language", type=str, default="fr", help="Language code for STT")
+    calibrate_parser.add_argument("--threads", type=int, nargs="+", default=None, help="CPU thread counts to try (default: 1, 2, 4... up to the CPU count)")
+    calibrate_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="Worker counts to try")
+    calibrate_parser.add_argument("--compute-types", type=str, nargs="+", default=["int8", "int8_float32", "float32"], help="CTranslate2 compute types to try")
+    calibrate_parser.add_argument("--beam-sizes", type=int, nargs="+", default=[1, 5], help="Beam sizes to try")
+    calibrate_parser.add_argument("--runs", type=int, default=3, help="Timed transcriptions per combination")
+    calibrate_parser.add_argument("--max-wer", type=float, default=0.1, help="Max word error rate vs the float32 reference")
+    calibrate_parser.add_argument("--reserve-cpus", type=int, default=0, help="CPUs kept free for audio capture during calibration (saved in the profile)")
+    calibrate_parser.add_argument("--output", type=str, default="whisper_profile.json", help="Profile file to write")
+
+    # Command: segment
+    segment_parser = subparsers.add_parser("segment", help="Split long WAV recordings into utterances with the VAD (offline)")
+    segment_parser.add_argument("--input", type=str, required=True, help="WAV file or directory (searched recursively)")
+    segment_parser.add_argument("--output-dir", type=str, default="segments", help="Directory for utterance WAVs and segments.jsonl")
+    segment_parser.add_argument("--vad-aggressiveness", type=int, default=3, choices=[0, 1, 2, 3], help="VAD aggressiveness (0=least, 3=most)")
+    segment_parser.add_argument("--min-silence-ms", type=int, default=500, help="Silence that ends an utterance (ms)")
+    segment_parser.add_argument("--padding-ms", type=int, default=300, help="Pre-roll kept before speech onset (ms)")
+    segment_parser.add_argument("--max-utterance", type=float, default=0, help="Max seconds per segment, split at a pause (0 = unlimited)")
+    segment_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+
     # Command: run (pipeline complet)
+    from core.flight_recorder import DEFAULT_RECORDING_PATH
+
     run_parser = subparsers.add_parser("run", help="Run the voice changer pipeline")
-    run_parser.add_argument("--input-device", type=int, help="Input device ID (microphone)")
-    run_parser.add_argument("--output-device", type=int, help="Output device ID (virtual cable)")
-    run_parser.add_argument("--voice", type=str, help="Inworld voice ID (overrides .env)")
-    run_parser.add_argument("--stt", type=str, default="vosk", choices=["vosk", "whisper", "windows"], help="STT engine (vosk, whisper, or windows)")
-    run_parser.add_argument("--model", type=str, default="models/vosk-model-small-fr-0.22", help="Path to Vosk model")
-    run_parser.add_argument("--whisper-model", type=str, default="base", choices=["tiny", "base", "small", "medium"], help="Whisper model size")
-    run_parser.add_argument("--language", type=str, default="fr", help="Language code for STT (fr, en, etc.)")
-    run_parser.add_argument("--vad-aggressiveness", type=int, default=3, choices=[0, 1, 2, 3], help="VAD aggressiveness (0=least, 3=most)")
-    run_parser.add_argument("--ptt", action="store_true", help="Enable push-to-talk mode")
-    run_parser.add_argument("--ptt-key", type=str, default=None, help="PTT key (space, f1, f2, f3, f4, ctrl_r, caps_lock)")
+    add_pipeline_args(run_parser, flight_recorder=DEFAULT_RECORDING_PATH)
+    add_profile_args(run_parser)
+
+    # Command: replay (fenêtre de l'enregistreur de vol rejouée dans le pipeline)
+    replay_parser = subparsers.add_parser("replay", help="Feed a flight recorder window back into the pipeline")
+    replay_parser.add_argument("--recording", type=str, default=DEFAULT_RECORDING_PATH, help="Flight recorder file")
+    replay_parser.add_argument("--last", type=float, default=60.0, help="Window length (s)")
+    replay_parser.add_argument("--end-offset", type=float, default=0.0, help="Window ends this many seconds before the last record")
+    replay_parser.add_argument("--list", action="store_true", help="Print the window timeline and exit")
+    replay_parser.add_argument("--export", type=str, default=None, help="Write the window's mic audio to this WAV (default: temp file)")
+    add_pipeline_args(replay_parser)
+    add_profile_args(replay_parser)
 
     args = parser.parse_args()
 
+    if getattr(args, "output_file", None) == "-":
+        # PCM brut sur stdout: les logs (print) passent sur stderr pour ne pas corrompre le flux
+        sys.stdout = sys.stderr
+
+    if getattr(args, "profile", False):
+        from core.profiler import SamplingProfiler
+
+        # run/replay: le thread principal ne fait que dormir, seuls les threads du pipeline comptent
+        profiler = SamplingProfiler(
+            output_dir=args.profile_dir,
+            interval_s=args.profile_interval / 1000,
+            ignore_threads={"MainThread"} if args.command in ("run", "replay") else ()
+        ).start()
+        atexit.register(profiler.stop)
+
     if args.command == "list-devices":
-        mgr = AudioDeviceManager()
+        from core.audio_backends import get_audio_backend
+
+        mgr = AudioDeviceManager(get_audio_backend(args.audio_backend))
         devices = mgr.list_devices()
         print(f"Found {len(devices)} devices:")
         for dev in devices:
@@ -63,7 +272,7 @@ def main():
         import requests
 
         try:
-            auth = InworldAuth()
+            auth = create_auth()
             headers = auth.get_auth_header()
 
             print("Fetching voices from Inworld API...")
@@ -104,6 +313,68 @@ def main():
             print(f"Error: {e}")
             sys.exit(1)
 
+    elif args.command == "bench-stream-parser":
+        from tools.bench_stream_parser import bench_stream_parser
+
+        if args.fixture and not os.path.exists(args.fixture):
+            print(f"Error: File not found: {args.fixture}")
+            sys.exit(1)
+        bench_stream_parser(args.fixture, chunk_size=args.chunk_size, repeats=args.repeats)
+
+    elif args.command == "bench-rates":
+        from tools.bench_rates import bench_rates
+
+        bench_rates(seconds=args.seconds)
+
+    elif args.command == "bench":
+        from tools.bench_suite import bench_suite
+
+        for path in (args.baseline, args.fixture, args.vosk_model):
+            if path and not os.path.exists(path):
+                print(f"Error: File not found: {path}")
+                sys.exit(1)
+        try:
+            regressions = bench_suite(args.output, args.baseline, args.threshold, sample_rate=args.sample_rate,
+                                      seconds=args.seconds, repeats=args.repeats, fixture_path=args.fixture,
+                                      vosk_model=args.vosk_model, only=args.only)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if regressions:
+            sys.exit(1)
+
+    elif args.command == "mock-inworld":
+        from client.mock_server import FaultConfig, MockInworldServer
+
+        faults = FaultConfig(
+            error_rate=args.error_rate,
+            hang_rate=args.hang_rate,
+            header_delay_s=args.header_delay,
+            first_byte_delay_s=args.first_byte_delay,
+            slow_body_rate=args.slow_body_rate
+        )
+        token_server = None
+        if args.token_ttl:
+            from client.mock_server import MockTokenServer
+
+            token_server = MockTokenServer(ttl_s=args.token_ttl).start()
+        server = MockInworldServer(port=args.port, faults=faults, token_server=token_server).start()
+        print(f"Mock Inworld server on {server.base_url}")
+        print(f"Use it with: INWORLD_BASE_URL={server.base_url}")
+        if token_server:
+            print(f"Token endpoint on {token_server.token_url} (tokens valid {args.token_ttl:g}s, required)")
+            print(f"Use it with: INWORLD_TOKEN_URL={token_server.token_url}")
+        print("Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print(f"\n{server.requests_received} requests, {server.faults_injected} faults injected")
+            if token_server:
+                print(f"{token_server.tokens_issued} tokens issued, {server.unauthorized} requests rejected (401)")
+                token_server.stop()
+            server.stop()
+
     elif args.command == "test-vad":
         if args.input_device is None:
             print("Warning: No input device specified, using system default.")
@@ -119,9 +390,12 @@ def main():
         vad = VoiceActivityDetector(sample_rate=48000)
         # On garde 48kHz pour le sample_rate final, mais le VAD peut vouloir du 48kHz
         # Padding 300ms pour bien capter le début
-        buffer = UtteranceBuffer(min_speech_ms=100, min_silence_ms=500, padding_ms=300) 
+        buffer = UtteranceBuffer(min_silence_ms=500, padding_ms=300) 
         
         utterance_count = 0
+        # Écriture disque hors du thread de capture
+        from core.wavfile import SegmentWriter
+        writer = SegmentWriter(sample_rate=48000)
 
         def audio_callback(in_data):
             nonlocal utterance_count
@@ -132,14 +406,7 @@ def main():
             wav_bytes = buffer.process_frame(in_data, is_speech)
             if wav_bytes:
                 filename = os.path.join(args.output_dir, f"utterance_{utterance_count}.wav")
-                # Ecriture simple d'un WAV header + PCM
-                import wave
-                with wave.open(filename, 'wb') as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2) # 16-bit
-                    wf.setframerate(48000)
-                    wf.writeframes(wav_bytes)
-                
+                writer.write(filename, wav_bytes)
                 print(f" [SAVED] {filename}")
                 utterance_count += 1
 
@@ -152,6 +419,7 @@ def main():
         except KeyboardInterrupt:
             print("\nStopping capture...")
             capture.stop()
+            writer.close()
 
     elif args.command == "test-tts":
         voice_id = args.voice or os.getenv("INWORLD_VOICE_ID")
@@ -163,8 +431,8 @@ def main():
         print(f"Voice ID: '{voice_id}'")
         
         try:
-            auth = InworldAuth()
-            client = InworldTTSClient(auth)
+            auth = create_auth()
+            client = InworldTTSClient(auth, audio_encoding=args.encoding)
             
             # Use stream=False for simple WAV dump in this test
             audio_data = client.synthesize(args.text, voice_id, stream=False)
@@ -186,6 +454,87 @@ def main():
             if "INWORLD_KEY" in str(e):
                 print("Tip: Check your .env file credentials.")
 
+    elif args.command == "synthesize-batch":
+        from tools.batch_synthesize import load_requests, synthesize_batch
+
+        if not os.path.exists(args.input):
+            print(f"Error: File not found: {args.input}")
+            sys.exit(1)
+        try:
+            rows = load_requests(args.input, default_voice=args.voice or os.getenv("INWORLD_VOICE_ID"))
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+        server = None
+        base_url = None
+        if args.mock:
+            from client.mock_server import FaultConfig, MockInworldServer
+
+            server = MockInworldServer(faults=FaultConfig(error_rate=args.mock_error_rate)).start()
+            base_url = server.base_url
+            auth = InworldAuth(key="mock", secret="mock")
+            print(f"Mock Inworld server on {base_url}")
+        else:
+            auth = create_auth()
+
+        try:
+            synthesize_batch(rows, args.output_dir, auth, concurrency=args.concurrency,
+                             rate_per_s=args.rate, burst=args.burst, max_attempts=args.retries,
+                             base_url=base_url, audio_encoding=args.encoding)
+        finally:
+            if server:
+                print(f"Mock: {server.requests_received} requests on {server.connections_opened} connections, "
+                      f"{server.faults_injected} faults injected")
+                server.stop()
+
+    elif args.command == "build-phrases":
+        from core.phrase_bank import open_phrase_bank
+
+        voice_id = args.voice or os.getenv("INWORLD_VOICE_ID")
+        if not voice_id:
+            print("Error: No voice ID. Set INWORLD_VOICE_ID in .env or use --voice")
+            sys.exit(1)
+        if not os.path.exists(args.phrases):
+            print(f"Error: File not found: {args.phrases}")
+            sys.exit(1)
+
+        server = None
+        base_url = None
+        if args.mock:
+            from client.mock_server import MockInworldServer
+
+            server = MockInworldServer().start()
+            base_url = server.base_url
+            auth = InworldAuth(key="mock", secret="mock")
+            print(f"Mock Inworld server on {base_url}")
+        else:
+            auth = create_auth()
+
+        try:
+            client = InworldTTSClient(auth, base_url=base_url, audio_encoding=args.encoding,
+                                      sample_rate=args.output_rate)
+            bank = open_phrase_bank(args.phrases, args.pack, client, voice_id)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        finally:
+            if server:
+                server.stop()
+        for i, phrase in enumerate(bank.phrases):
+            print(f"  {phrase['hotkey'] or '-':>8}  {bank.duration(i):5.1f}s  {phrase['text']}")
+        bank.close()
+
+    elif args.command == "bench-transport":
+        from tools.bench_transport import bench_transport
+
+        try:
+            bench_transport(args.encodings, runs=args.runs, bandwidth_kbps=args.bandwidth_kbps,
+                            fixtures_dir=args.fixtures)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
     elif args.command == "test-stt":
         import wave
         from processing.stt import VoskSTTEngine
@@ -202,16 +551,16 @@ def main():
             print(f"  unzip vosk-model-small-fr-0.22.zip")
             sys.exit(1)
 
-        print(f"Loading model: {args.model}")
-        stt = VoskSTTEngine(model_path=args.model, input_sample_rate=48000)
-
         print(f"Reading: {args.file}")
         with wave.open(args.file, 'rb') as wf:
             sample_rate = wf.getframerate()
             audio_bytes = wf.readframes(wf.getnframes())
 
-        if sample_rate != 48000:
-            print(f"Warning: File is {sample_rate}Hz, expected 48000Hz. Results may vary.")
+        if sample_rate % 16000:
+            print(f"Warning: File is {sample_rate}Hz, expected a multiple of 16000Hz. Results may vary.")
+
+        print(f"Loading model: {args.model}")
+        stt = VoskSTTEngine(model_path=args.model, input_sample_rate=sample_rate)
 
         print("Transcribing...")
         start_time = time.time()
@@ -220,16 +569,125 @@ def main():
 
         print(f"Result ({elapsed:.2f}s): '{text}'")
 
-    elif args.command == "run":
+    elif args.command == "eval-prefilter":
+        from tools.eval_prefilter import evaluate_prefilter
+
+        if not os.path.isdir(args.dir):
+            print(f"Error: Directory not found: {args.dir}")
+            sys.exit(1)
+
+        thresholds = args.threshold or [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+        evaluate_prefilter(args.dir, thresholds)
+
+    elif args.command == "bench-grammar":
+        from tools.bench_grammar import bench_grammar
+
+        if not os.path.isdir(args.dir):
+            print(f"Error: Directory not found: {args.dir}")
+            sys.exit(1)
+        for path in (args.grammar, args.model):
+            if not os.path.exists(path):
+                print(f"Error: File not found: {path}")
+                sys.exit(1)
+        try:
+            bench_grammar(args.dir, args.grammar, args.model, min_confidence=args.min_confidence)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    elif args.command == "sweep-endpointing":
+        from tools.sweep_endpointing import sweep_endpointing
+
+        if not os.path.isdir(args.dir):
+            print(f"Error: Directory not found: {args.dir}")
+            sys.exit(1)
+        grid = {
+            "aggressiveness": args.aggressiveness,
+            "min_speech_ms": args.min_speech_ms,
+            "min_silence_ms": args.min_silence_ms,
+            "padding_ms": args.padding_ms,
+        }
+        sweep_endpointing(args.dir, grid, workers=args.workers, output_path=args.output)
+
+    elif args.command == "transcribe-batch":
+        from tools.batch_transcribe import transcribe_batch
+
+        if not os.path.isdir(args.dir):
+            print(f"Error: Directory not found: {args.dir}")
+            sys.exit(1)
+        if args.stt == "vosk" and not os.path.exists(args.model):
+            print(f"Error: Vosk model not found: {args.model}")
+            sys.exit(1)
+
+        engine_kwargs = {
+            "engine_type": args.stt,
+            "model_path": args.model,
+            "model_name": args.whisper_model,
+            "language": args.language,
+        }
+        transcribe_batch(args.dir, args.output, engine_kwargs, workers=args.workers,
+                         threads_per_worker=args.threads_per_worker)
+
+    elif args.command == "calibrate-whisper":
+        from tools.calibrate_whisper import calibrate_whisper
+
+        if not os.path.exists(args.file):
+            print(f"Error: File not found: {args.file}")
+            sys.exit(1)
+        try:
+            best = calibrate_whisper(args.file, model_name=args.whisper_model, language=args.language,
+                                     threads=args.threads, workers=args.workers, compute_types=args.compute_types,
+                                     beam_sizes=args.beam_sizes, runs=max(1, args.runs), max_wer=args.max_wer,
+                                     reserve_cpus=args.reserve_cpus, output_path=args.output)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if best is None:
+            sys.exit(1)
+
+    elif args.command == "segment":
+        from tools.segment import segment_files
+
+        if not os.path.exists(args.input):
+            print(f"Error: Not found: {args.input}")
+            sys.exit(1)
+        segment_files(args.input, args.output_dir, workers=args.workers,
+                      aggressiveness=args.vad_aggressiveness, min_silence_ms=args.min_silence_ms,
+                      padding_ms=args.padding_ms, max_utterance_ms=args.max_utterance * 1000 or None)
+
+    elif args.command in ("run", "replay"):
         from controller.orchestrator import VoiceChangerOrchestrator, PipelineConfig
 
+        if args.command == "replay":
+            import tempfile
+            from core.flight_recorder import FlightRecording
+
+            if not os.path.exists(args.recording):
+                print(f"Error: File not found: {args.recording}")
+                sys.exit(1)
+            recording = FlightRecording(args.recording)
+            records = recording.window(args.last, args.end_offset)
+            for line in recording.summary(records):
+                print(line)
+            if args.list:
+                return
+            # Le micro enregistré remplace le micro: backend file au rate de capture d'origine
+            replay_wav = args.export or os.path.join(tempfile.gettempdir(), "replay_window.wav")
+            args.sample_rate = FlightRecording.export_frames(records, replay_wav)
+            args.audio_backend = "file"
+            args.input_file = replay_wav
+            print(f"Replaying {replay_wav} ({args.sample_rate}Hz)")
+            if args.flight_recorder and os.path.abspath(args.flight_recorder) == os.path.abspath(args.recording):
+                print("Error: --flight-recorder would overwrite the recording being replayed")
+                sys.exit(1)
+
         voice_id = args.voice or os.getenv("INWORLD_VOICE_ID")
         if not voice_id:
             print("Error: No voice ID. Set INWORLD_VOICE_ID in .env or use --voice")
             sys.exit(1)
 
         # Vérifier le modèle Vosk si utilisé
-        if args.stt == "vosk" and not os.path.exists(args.model):
+        if "vosk" in (args.stt, args.stt_fast) and not os.path.exists(args.model):
             print(f"Error: Vosk model not found: {args.model}")
             print("Download the French model with:")
             print(f"  python download_model.py")
@@ -245,6 +703,18 @@ def main():
         if output_dev is None and os.getenv("OUTPUT_DEVICE_INDEX"):
             output_dev = int(os.getenv("OUTPUT_DEVICE_INDEX"))
 
+        if args.phrases and not os.path.exists(args.phrases):
+            print(f"Error: File not found: {args.phrases}")
+            sys.exit(1)
+
+        if args.audio_backend == "file" and args.input_file not in (None, "-") and not os.path.exists(args.input_file):
+            print(f"Error: File not found: {args.input_file}")
+            sys.exit(1)
+
+        metrics_port = args.metrics_port
+        if metrics_port is None and os.getenv("METRICS_PORT"):
+            metrics_port = int(os.getenv("METRICS_PORT"))
+
         # Push-to-Talk: CLI > .env > défaut (désactivé)
         ptt_enabled = args.ptt or os.getenv("PTT_ENABLED", "false").lower() == "true"
         ptt_key = args.ptt_key or os.getenv("PTT_KEY", "space")
@@ -252,14 +722,57 @@ def main():
         config = PipelineConfig(
             input_device=input_dev,
             output_device=output_dev,
+            audio_backend=args.audio_backend,
+            audio_latency=args.latency,
+            output_buffer_ms=args.output_buffer_ms,
+            input_file=args.input_file,
+            output_file=args.output_file,
+            monitor_devices=[(device, args.monitor_gain[i] if i < len(args.monitor_gain) else 1.0)
+                             for i, device in enumerate(args.monitor_device)],
+            output_gain=args.output_gain,
+            jitter_buffer_ms=args.jitter_ms,
             voice_id=voice_id,
             stt_engine=args.stt,
             vosk_model_path=args.model,
+            vosk_grammar_path=args.vosk_grammar,
+            vosk_grammar_mode=args.vosk_grammar_mode,
+            vosk_min_confidence=args.vosk_min_confidence,
             whisper_model=args.whisper_model,
+            whisper_profile_path=args.whisper_profile,
+            stt_reserve_cpus=args.stt_reserve_cpus,
             language=args.language,
+            stt_fast_engine=args.stt_fast,
+            stt_deadline_s=args.stt_deadline,
+            stt_cascade_mode=args.stt_cascade,
             vad_aggressiveness=args.vad_aggressiveness,
+            min_speech_ms=args.min_speech_ms,
+            prefilter_threshold=args.prefilter_threshold,
+            coalesce_window_s=args.coalesce_window,
+            coalesce_max_delay_s=args.coalesce_max_delay,
+            max_utterance_s=args.max_utterance,
+            sample_rate=args.sample_rate,
+            output_sample_rate=args.output_rate,
+            target_lag_s=args.target_lag,
+            max_speaking_rate=args.max_speaking_rate,
+            max_time_compression=args.max_time_compression,
             push_to_talk=ptt_enabled,
-            push_to_talk_key=ptt_key
+            push_to_talk_key=ptt_key,
+            audio_queue_size=args.audio_queue_size,
+            audio_queue_policy=args.audio_queue_policy,
+            tts_queue_size=args.tts_queue_size,
+            tts_queue_policy=args.tts_queue_policy,
+            stale_deadline_s=args.stale_deadline,
+            tts_first_byte_timeout_s=args.tts_first_byte_timeout,
+            tts_total_timeout_s=args.tts_timeout,
+            tts_max_attempts=args.tts_retries,
+            tts_hedge=args.tts_hedge,
+            tts_encoding=args.tts_encoding,
+            tts_stream=args.tts_stream,
+            metrics_port=metrics_port,
+            flight_recorder_path=None if args.no_flight_recorder else args.flight_recorder,
+            flight_recorder_mb=args.flight_recorder_mb,
+            phrases_path=args.phrases,
+            phrase_pack_path=args.phrase_pack
         )
 
         print("=" * 50)
@@ -267,6 +780,10 @@ def main():
         print("=" * 50)
         print(f"Input device:  {input_dev or 'default'}")
         print(f"Output device: {output_dev or 'default'}")
+        if args.monitor_device:
+            print(f"Monitors:      {', '.join(str(d) for d in args.monitor_device)}")
+        if args.audio_backend != "pyaudio":
+            print(f"Audio backend: {args.audio_backend} (latency {args.latency})")
         print(f"Voice ID:      {voice_id}")
         if args.stt == "whisper":
             stt_detail = f" ({args.whisper_model})"
@@ -275,23 +792,44 @@ def main():
         else:
             stt_detail = " (Windows SAPI)"
         print(f"STT Engine:    {args.stt}{stt_detail}")
+        if args.stt_fast:
+            print(f"STT Cascade:   {args.stt_fast} ({args.stt_cascade}, deadline {args.stt_deadline}s)")
         print(f"Language:      {args.language}")
         print(f"VAD level:     {args.vad_aggressiveness}")
         if ptt_enabled:
             print(f"Push-to-Talk:  ON (touche: {ptt_key})")
         else:
             print(f"Push-to-Talk:  OFF (VAD continu)")
+        if metrics_port:
+            print(f"Metrics:       http://127.0.0.1:{metrics_port}/metrics")
+        if args.phrases:
+            print(f"Phrases:       {args.phrases}")
+        print(f"Queues:        STT {args.audio_queue_size} ({args.audio_queue_policy}), "
+              f"TTS {args.tts_queue_size} ({args.tts_queue_policy})")
         print("=" * 50)
         print("Press Ctrl+C to stop.")
         print()
 
-        auth = InworldAuth()
+        auth = create_auth(args.token_url)
         orchestrator = VoiceChangerOrchestrator(config, auth)
 
         try:
             orchestrator.start()
+            idle_since = None
             while True:
                 time.sleep(0.1)
+                if args.command != "replay":
+                    continue
+                # Replay: arrêt quand la fenêtre est consommée et le pipeline vidé
+                finished = orchestrator.audio_backend.input_finished.is_set()
+                if finished and orchestrator.is_idle():
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since > 2.0:
+                        break
+                else:
+                    idle_since = None
+            print("\nReplay finished.")
+            orchestrator.stop()
         except KeyboardInterrupt:
             print("\nShutting down...")
             orchestrator.stop()
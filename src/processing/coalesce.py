@@ -0,0 +1,72 @@
+import collections
+import queue
+import time
+
+import numpy as np
+
+
+class TranscriptCoalescer:
+    """
+    Regroupe des transcriptions consécutives en une seule requête TTS.
+
+    Avec un VAD agressif, une phrase arrive souvent en deux ou trois
+    utterances courtes: une requête Inworld chacune, c'est autant de latences
+    de premier octet, une prosodie hachée et du quota consommé. Après une
+    transcription, le coalesceur attend window_s la suivante; si
+    l'utilisateur parle encore (tour VAD en cours), il l'attend jusqu'à
+    max_delay_s. Chaque transcription fusionnée relance la fenêtre, le délai
+    d'attente ajouté à la première ne dépasse jamais max_delay_s (plus la
+    transcription de la dernière utterance arrivée dans les temps).
+    """
+
+    def __init__(self, window_s: float = 0.4, max_delay_s: float = 1.5, history: int = 1000):
+        self.window_s = window_s
+        self.max_delay_s = max_delay_s
+        self.requests = 0     # Requêtes TTS après regroupement
+        self.transcripts = 0  # Transcriptions reçues
+        self._delays = collections.deque(maxlen=history)
+
+    @property
+    def saved(self) -> int:
+        """Requêtes TTS évitées par le regroupement."""
+        return self.transcripts - self.requests
+
+    def collect(self, text: str, next_text, speaking) -> tuple:
+        """
+        Attend les transcriptions qui suivent text et retourne (texte fusionné, délai ajouté).
+
+        next_text(timeout) retourne la transcription suivante (None si elle est
+        vide ou filtrée) ou lève queue.Empty; speaking() est vrai pendant un
+        tour de parole pas encore terminé.
+        """
+        start = time.monotonic()
+        deadline = start + self.max_delay_s
+        parts = [text]
+        window_end = start + self.window_s
+        while True:
+            now = time.monotonic()
+            # Parole en cours: la suite arrive à la fin du tour, on attend jusqu'à la limite
+            end = deadline if speaking() else min(window_end, deadline)
+            if now >= end:
+                break
+            try:
+                following = next_text(min(end - now, 0.05))
+            except queue.Empty:
+                continue
+            if following:
+                self.transcripts += 1
+                parts.append(following)
+                window_end = time.monotonic() + self.window_s
+        delay = time.monotonic() - start
+        self.transcripts += 1
+        self.requests += 1
+        self._delays.append(delay)
+        return " ".join(parts), delay
+
+    def report(self):
+        if not self.requests:
+            return
+        delays = np.array(self._delays)
+        print(f"[COALESCE] {self.transcripts} transcriptions en {self.requests} requêtes TTS "
+              f"({self.saved} évitées), délai ajouté: p50 {np.percentile(delays, 50) * 1000:.0f}ms, "
+              f"p95 {np.percentile(delays, 95) * 1000:.0f}ms, max {delays.max() * 1000:.0f}ms")
@@ -0,0 +1,133 @@
+import collections
+import threading
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def wsola_compress(pcm: bytes, factor: float, sample_rate: int = 48000,
+                   window_ms: float = 40.0, tolerance_ms: float = 10.0) -> bytes:
+    """
+    Accélère un bloc PCM 16-bit mono d'un facteur factor (> 1) sans changer la hauteur (WSOLA).
+
+    Les fenêtres de Hann (recouvrement 50%) sont prises tous les hop*factor
+    échantillons en entrée, chacune décalée de ±tolerance_ms pour maximiser la
+    corrélation avec la continuation naturelle de la précédente: les phases
+    s'enchaînent et la voix reste propre. Pour chaque fenêtre, la recherche du
+    décalage est un seul produit matrice-vecteur (candidats x gabarit, sous-
+    échantillonnés); l'overlap-add final est entièrement vectorisé.
+    """
+    x = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    n = int(sample_rate * window_ms / 1000) // 2 * 2
+    hop = n // 2
+    tol = int(sample_rate * tolerance_ms / 1000)
+    if factor <= 1.0 or len(x) < 4 * n:
+        return pcm
+
+    analysis_hop = hop * factor
+    n_frames = int((len(x) - n - tol) / analysis_hop)
+    positions = np.zeros(n_frames, dtype=np.intp)
+    decim, step = 4, 2  # Corrélation sur 1 échantillon sur 4, candidats tous les 2
+    for k in range(1, n_frames):
+        natural = positions[k - 1] + hop
+        template = x[natural:natural + n:decim]
+        nominal = int(k * analysis_hop)
+        lo = max(0, nominal - tol)
+        hi = min(len(x) - n, nominal + tol)
+        candidates = sliding_window_view(x[lo:hi + n], n)[::step, ::decim]
+        positions[k] = lo + step * int(np.argmax(candidates @ template))
+
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)  # Hann périodique: somme = 1 à 50%
+    frames = x[positions[:, None] + np.arange(n)] * window
+    body = (frames[:-1, hop:] + frames[1:, :hop]).ravel()
+    # Bords non fenêtrés: ni fondu d'entrée ni de sortie
+    head = x[:hop]
+    tail = x[positions[-1] + hop:positions[-1] + n]
+    out = np.concatenate([head, body, tail])
+    return np.clip(out, -32768, 32767).astype(np.int16).tobytes()
+
+
+class AdaptiveRateController:
+    """
+    Régule le retard de lecture (audio TTS reçu mais pas encore joué).
+
+    Tant que le retard reste sous target_lag_s, rien ne change. Au-delà, le
+    speakingRate demandé à Inworld et le facteur de compression temporelle de
+    l'audio déjà en file montent linéairement avec l'excès de retard, jusqu'à
+    leur maximum atteint à target_lag_s + full_scale_s. Aucun contenu n'est
+    jeté: la parole est seulement jouée plus vite.
+
+    L'historique (horodatage, retard, rate) sert au rapport de fin de session.
+    """
+
+    def __init__(self, target_lag_s: float = 2.0, max_speaking_rate: float = 1.5,
+                 max_compression: float = 1.3, full_scale_s: float = 6.0, history: int = 7200):
+        self.target_lag_s = target_lag_s
+        self.max_speaking_rate = max_speaking_rate
+        self.max_compression = max_compression
+        self.full_scale_s = full_scale_s
+        self.lag_s = 0.0
+        self.compressed_chunks = 0
+        self.compressed_saved_s = 0.0  # Temps de lecture économisé par la compression
+        self._history = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def observe(self, lag_s: float):
+        """Enregistre le retard courant (appelé par les threads processing et playback)."""
+        with self._lock:
+            self.lag_s = lag_s
+            self._history.append((time.monotonic(), lag_s, self.speaking_rate()))
+
+    def _pressure(self) -> float:
+        """Excès de retard normalisé dans [0, 1]."""
+        excess = self.lag_s - self.target_lag_s
+        if excess <= 0:
+            return 0.0
+        return min(1.0, excess / self.full_scale_s)
+
+    def speaking_rate(self) -> float:
+        """speakingRate à demander pour la prochaine synthèse."""
+        return round(1.0 + (self.max_speaking_rate - 1.0) * self._pressure(), 2)
+
+    def compression_factor(self) -> float:
+        """Facteur d'accélération à appliquer à l'audio en file (1.0 = aucun)."""
+        return 1.0 + (self.max_compression - 1.0) * self._pressure()
+
+    def compress(self, pcm: bytes, sample_rate: int) -> bytes:
+        """Compresse pcm si le retard l'exige, sinon le retourne tel quel."""
+        factor = self.compression_factor()
+        if factor <= 1.01:
+            return pcm
+        out = wsola_compress(pcm, factor, sample_rate)
+        if len(out) < len(pcm):
+            self.compressed_chunks += 1
+            self.compressed_saved_s += (len(pcm) - len(out)) / 2 / sample_rate
+        return out
+
+    def report(self, bucket_s: float = 10.0):
+        """Affiche le retard dans le temps (par tranches de bucket_s) et ses percentiles."""
+        with self._lock:
+            history = list(self._history)
+        if len(history) < 2:
+            return
+        times = np.array([h[0] for h in history])
+        lags = np.array([h[1] for h in history])
+        rates = np.array([h[2] for h in history])
+        # Pondération par la durée de chaque échantillon (échantillonnage irrégulier)
+        durations = np.diff(times, append=times[-1])
+        total = durations.sum() or 1.0
+        over = durations[lags > self.target_lag_s].sum()
+
+        print(f"[PACING] Retard de lecture: p50 {np.percentile(lags, 50):.1f}s, "
+              f"p95 {np.percentile(lags, 95):.1f}s, max {lags.max():.1f}s, "
+              f"{over / total:.0%} du temps au-dessus de {self.target_lag_s:.1f}s")
+        print(f"[PACING] speakingRate max {rates.max():.2f}, {self.compressed_chunks} chunks compressés "
+              f"({self.compressed_saved_s:.1f}s de lecture économisées)")
+        start = times[0]
+        buckets = ((times - start) // bucket_s).astype(int)
+        line = []
+        for b in np.unique(buckets):
+            mask = buckets == b
+            line.append(f"{int(b * bucket_s)}s:{lags[mask].max():.1f}")
+        print(f"[PACING] Retard max par tranche de {bucket_s:.0f}s: " + " ".join(line))
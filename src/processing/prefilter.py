@@ -0,0 +1,126 @@
+import numpy as np
+
+
+class SpeechPreFilter:
+    """
+    Classifieur acoustique appliqué à une utterance finie, avant le STT.
+
+    Rejette les bruits évidents (toux, clics, clavier) pour économiser une
+    inférence Whisper/Vosk complète. Toutes les features sont calculées en
+    une passe vectorisée sur la matrice de frames:
+
+    - durée voisée: durée des frames au-dessus du plancher de bruit
+    - ratio de frames voisées: énergie suffisante ET taux de passage par zéro
+      faible (la parole voisée est quasi-périodique, le souffle non)
+    - platitude spectrale: ~0 pour un son harmonique, ~1 pour un bruit blanc
+    - enveloppe d'énergie: part de l'énergie concentrée dans les 10% de frames
+      les plus fortes (un clic est impulsionnel, la parole étalée)
+
+    Chaque feature est ramenée à un sous-score dans [0, 1]; le score final est
+    leur moyenne. L'utterance passe au STT si score >= threshold.
+    """
+
+    def __init__(self, sample_rate: int = 48000, frame_ms: int = 20, threshold: float = 0.0):
+        """
+        Args:
+            sample_rate: Sample rate de l'audio entrant
+            frame_ms: Taille des frames d'analyse
+            threshold: Score minimum pour envoyer au STT (0 = tout accepter; choisir
+                la valeur avec eval-prefilter sur des clips de la machine cible)
+        """
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.frame_ms = frame_ms
+        self.threshold = threshold
+
+        # Décimation vers ~16kHz: suffisant pour la parole, FFT 3x moins chère à 48kHz.
+        # Passe-bas FIR (sinc fenêtré, coupure à 90% du nouveau Nyquist) avant de garder un
+        # échantillon sur _decimation: sans lui, l'énergie au-dessus du nouveau Nyquist
+        # (souffle, clavier) se replierait dans la bande de la parole
+        self._decimation = max(1, sample_rate // 16000)
+        self._decimated_len = self.frame_len // self._decimation
+        taps = 16 * self._decimation + 1
+        n = np.arange(taps) - (taps - 1) / 2
+        lowpass = np.sinc(0.9 * n / self._decimation) * np.hamming(taps)
+        self._lowpass = (lowpass / lowpass.sum()).astype(np.float32)
+
+        # Compteurs
+        self.accepted = 0
+        self.rejected = 0
+
+    def features(self, audio_bytes: bytes) -> dict:
+        """Calcule les features acoustiques d'une utterance PCM 16-bit mono."""
+        samples = np.frombuffer(audio_bytes, dtype=np.int16)
+        n_frames = len(samples) // self.frame_len
+        duration_ms = len(samples) * 1000 / self.sample_rate
+        if n_frames == 0:
+            return {"duration_ms": duration_ms, "voiced_ms": 0.0, "voiced_ratio": 0.0,
+                    "flatness": 1.0, "peak_energy_share": 1.0}
+
+        frames = self._decimate(samples[:n_frames * self.frame_len]).reshape(n_frames, self._decimated_len)
+
+        # Énergie par frame (dB) et plancher de bruit estimé sur l'utterance
+        energy = np.mean(frames * frames, axis=1) + 1e-10
+        energy_db = 10.0 * np.log10(energy)
+        noise_floor_db = np.percentile(energy_db, 10)
+        loud = (energy_db > noise_floor_db + 6.0) & (energy_db > -55.0)
+
+        # Taux de passage par zéro par frame
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        voiced = loud & (zcr < 0.25)
+
+        # Platitude spectrale, moyennée sur les frames énergétiques
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        mean_flatness = float(np.mean(flatness[loud])) if loud.any() else 1.0
+
+        # Enveloppe: part de l'énergie dans les 10% de frames les plus fortes
+        top_k = max(1, n_frames // 10)
+        top_energy = np.partition(energy, n_frames - top_k)[n_frames - top_k:]
+        peak_share = float(np.sum(top_energy) / np.sum(energy))
+
+        return {
+            "duration_ms": duration_ms,
+            "voiced_ms": float(np.count_nonzero(voiced) * self.frame_ms),
+            "voiced_ratio": float(np.count_nonzero(voiced) / n_frames),
+            "flatness": mean_flatness,
+            "peak_energy_share": peak_share,
+        }
+
+    def _decimate(self, samples: np.ndarray) -> np.ndarray:
+        """Signal float32 normalisé, filtré puis décimé (n_frames * _decimated_len échantillons)."""
+        x = samples.astype(np.float32) / 32768.0
+        if self._decimation == 1:
+            return x
+        # Filtrage calculé seulement aux échantillons conservés (polyphase: un produit matriciel)
+        half = len(self._lowpass) // 2
+        x = np.pad(x, (half, half))
+        windows = np.lib.stride_tricks.sliding_window_view(x, len(self._lowpass))[::self._decimation]
+        n_frames = len(samples) // self.frame_len
+        return windows[:n_frames * self._decimated_len] @ self._lowpass
+
+    @staticmethod
+    def score_features(features: dict) -> float:
+        """Combine les features en un score de parole dans [0, 1]."""
+        sub_scores = (
+            np.clip((features["voiced_ms"] - 80.0) / 170.0, 0.0, 1.0),
+            np.clip(features["voiced_ratio"] / 0.3, 0.0, 1.0),
+            np.clip((0.5 - features["flatness"]) / 0.4, 0.0, 1.0),
+            np.clip((0.9 - features["peak_energy_share"]) / 0.5, 0.0, 1.0),
+        )
+        return float(np.mean(sub_scores))
+
+    def score(self, audio_bytes: bytes) -> float:
+        return self.score_features(self.features(audio_bytes))
+
+    def is_speech(self, audio_bytes: bytes) -> bool:
+        """True si l'utterance mérite une transcription. Met à jour les compteurs."""
+        if self.threshold <= 0:
+            self.accepted += 1
+            return True
+        if self.score(audio_bytes) >= self.threshold:
+            self.accepted += 1
+            return True
+        self.rejected += 1
+        return False
@@ -1,7 +1,54 @@
 import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import numpy as np
 
 
+# Sample rate utilisé par tous les moteurs: capturer plus haut ne sert qu'à le jeter
+STT_SAMPLE_RATE = 16000
+
+# Profil Whisper CPU écrit par calibrate-whisper, chargé par create_stt_engine
+WHISPER_PROFILE_PATH = "whisper_profile.json"
+WHISPER_PROFILE_KEYS = ("cpu_threads", "num_workers", "compute_type", "beam_size")
+
+
+def inference_cpus(reserved: int):
+    """
+    CPUs laissés à l'inférence quand les `reserved` premiers CPUs du processus
+    sont gardés pour les threads audio. None si rien à réserver ou si l'OS ne
+    permet pas de fixer l'affinité (os.sched_setaffinity: Linux uniquement).
+    """
+    if not reserved:
+        return None
+    if not hasattr(os, "sched_setaffinity"):
+        print("[STT] Affinité CPU non supportée sur cette plateforme, --stt-reserve-cpus ignoré")
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) <= reserved:
+        print(f"[STT] {len(cpus)} CPU(s) disponibles, impossible d'en réserver {reserved} à l'audio")
+        return None
+    return set(cpus[reserved:])
+
+
+def load_whisper_profile(model_name: str, path: str = None) -> dict:
+    """Réglages calibrés pour model_name sur cette machine ({} si absents ou calibrés ailleurs)."""
+    path = path or os.getenv("WHISPER_PROFILE", WHISPER_PROFILE_PATH)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    profile = data.get("profiles", {}).get(model_name)
+    if not profile:
+        return {}
+    if data.get("cpu_count") != os.cpu_count():
+        print(f"[WHISPER] Profil {path} calibré sur {data.get('cpu_count')} CPUs (ici {os.cpu_count()}), ignoré")
+        return {}
+    return {k: profile[k] for k in WHISPER_PROFILE_KEYS + ("reserve_cpus",) if k in profile}
+
+
 class STTEngine:
     """Interface de base pour les moteurs STT."""
 
@@ -9,30 +56,73 @@ class STTEngine:
         raise NotImplementedError
 
 
+def load_grammar(path: str):
+    """
+    Phrases autorisées pour le décodage contraint de Vosk: liste JSON, ou
+    fichier texte à une phrase par ligne (lignes vides et # ignorées).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            phrases = json.load(f)
+        else:
+            phrases = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    phrases = [p.lower() for p in phrases if p and p != "[unk]"]
+    if not phrases:
+        raise ValueError(f"Grammaire vide: {path}")
+    return phrases
+
+
 class VoskSTTEngine(STTEngine):
     """
     Moteur STT léger utilisant Vosk.
     Gère le resampling 48kHz -> 16kHz automatiquement.
+
+    Avec une grammaire (liste de phrases), le décodage peut être contraint à
+    ce vocabulaire: bien plus rapide et plus fiable pour des annonces de jeu
+    ou des phrases toutes faites. En mode "hybrid", le décodeur contraint
+    passe d'abord; si le résultat contient [unk] ou que la confiance moyenne
+    des mots est sous min_confidence, l'utterance est redécodée en
+    vocabulaire ouvert. Les modèles Vosk à graphe statique (les "gros"
+    modèles serveur) ignorent la grammaire: utiliser un modèle small.
     """
 
-    def __init__(self, model_path: str, input_sample_rate: int = 48000):
+    MODES = ("open", "grammar", "hybrid")
+
+    def __init__(self, model_path: str, input_sample_rate: int = 48000, grammar=None, mode: str = "open",
+                 min_confidence: float = 0.6):
         """
         Args:
             model_path: Chemin vers le dossier du modèle Vosk
             input_sample_rate: Sample rate de l'audio entrant (48000 par défaut)
+            grammar: Phrases autorisées (requis pour les modes "grammar" et "hybrid")
+            mode: "open" (vocabulaire complet), "grammar" ou "hybrid"
+            min_confidence: Confiance moyenne sous laquelle le mode hybride redécode en ouvert
         """
         from vosk import Model, KaldiRecognizer
 
+        if mode not in self.MODES:
+            raise ValueError(f"Mode Vosk inconnu: {mode} ({', '.join(self.MODES)})")
+        if mode != "open" and not grammar:
+            raise ValueError(f"Le mode Vosk '{mode}' exige une grammaire")
         self.model = Model(model_path)
         self.input_sample_rate = input_sample_rate
         self.target_sample_rate = 16000  # Vosk exige 16kHz
         self._recognizer_class = KaldiRecognizer
+        self.mode = mode
+        self.min_confidence = min_confidence
+        # [unk] absorbe les mots hors grammaire au lieu de les forcer sur une phrase voisine
+        self._grammar_json = json.dumps(list(grammar) + ["[unk]"], ensure_ascii=False) if grammar else None
+        # Compteurs du mode hybride
+        self.grammar_hits = 0   # Résultats contraints retenus
+        self.fallbacks = 0      # Utterances redécodées en vocabulaire ouvert
 
     def _resample(self, audio_bytes: bytes) -> bytes:
         """
         Resample de input_sample_rate vers 16kHz par décimation simple.
         Pour 48kHz -> 16kHz, on prend 1 échantillon sur 3.
         """
+        if self.input_sample_rate == self.target_sample_rate:
+            return audio_bytes  # Capture déjà à 16kHz: aucune copie
         audio_np = np.frombuffer(audio_bytes, dtype=np.int16)
         ratio = self.input_sample_rate // self.target_sample_rate
         resampled = audio_np[::ratio]
@@ -51,8 +141,25 @@ class VoskSTTEngine(STTEngine):
         # Resample vers 16kHz
         audio_16k = self._resample(audio_bytes)
 
+        if self.mode == "open":
+            return self._decode(audio_16k)[0]
+        text, confidence = self._decode(audio_16k, constrained=True)
+        if self.mode == "grammar":
+            return text
+        if text and confidence >= self.min_confidence:
+            self.grammar_hits += 1
+            return text
+        self.fallbacks += 1
+        return self._decode(audio_16k)[0]
+
+    def _decode(self, audio_16k: bytes, constrained: bool = False):
+        """Un passage de décodage. Retourne (texte sans [unk], confiance moyenne des mots)."""
         # Nouveau recognizer pour chaque transcription
-        recognizer = self._recognizer_class(self.model, self.target_sample_rate)
+        if constrained:
+            recognizer = self._recognizer_class(self.model, self.target_sample_rate, self._grammar_json)
+            recognizer.SetWords(True)  # Confiance par mot
+        else:
+            recognizer = self._recognizer_class(self.model, self.target_sample_rate)
 
         # Envoyer l'audio par chunks (Vosk préfère ~4000 bytes)
         chunk_size = 4000
@@ -62,7 +169,22 @@ class VoskSTTEngine(STTEngine):
 
         # Récupérer le résultat final
         result = json.loads(recognizer.FinalResult())
-        return result.get("text", "").strip()
+        text = result.get("text", "").strip()
+        if not constrained:
+            return text, 1.0
+        words = result.get("result", [])
+        if any(w.get("word") == "[unk]" for w in words) or "[unk]" in text:
+            # Mot hors grammaire: le reste de la phrase n'est pas fiable non plus
+            return " ".join(w for w in text.split() if w != "[unk]"), 0.0
+        confidence = sum(w.get("conf", 0.0) for w in words) / len(words) if words else 0.0
+        return text, confidence
+
+    def report(self):
+        total = self.grammar_hits + self.fallbacks
+        if self.mode != "hybrid" or not total:
+            return
+        print(f"[VOSK] Grammaire: {self.grammar_hits}/{total} utterances décodées en contraint, "
+              f"{self.fallbacks} redécodées en vocabulaire ouvert ({self.fallbacks / total:.0%})")
 
 
 class WhisperSTTEngine(STTEngine):
@@ -71,12 +193,19 @@ class WhisperSTTEngine(STTEngine):
     Plus précis que Vosk, mais nécessite plus de ressources (GPU recommandé).
     """
 
-    def __init__(self, model_name: str = "base", language: str = "fr", input_sample_rate: int = 48000):
+    def __init__(self, model_name: str = "base", language: str = "fr", input_sample_rate: int = 48000,
+                 cpu_threads: int = 0, num_workers: int = 1, compute_type: str = None, beam_size: int = 5,
+                 cpu_affinity=None):
         """
         Args:
             model_name: Nom du modèle ("tiny", "base", "small", "medium", "large")
             language: Code langue ("fr", "en", etc.)
             input_sample_rate: Sample rate de l'audio entrant
+            cpu_threads: Threads d'inférence CPU (0 = choix de CTranslate2)
+            num_workers: Transcriptions simultanées possibles (appels depuis plusieurs threads)
+            compute_type: Type de calcul CTranslate2 (None = float16 sur GPU, int8 sur CPU)
+            beam_size: Largeur du beam search (1 = greedy, plus rapide)
+            cpu_affinity: CPUs auxquels limiter les threads d'inférence (None = tous)
         """
         try:
             from faster_whisper import WhisperModel
@@ -89,16 +218,39 @@ class WhisperSTTEngine(STTEngine):
         self.input_sample_rate = input_sample_rate
         self.target_sample_rate = 16000  # Whisper utilise 16kHz
         self.language = language
+        self.beam_size = beam_size
 
         # Déterminer le device (CUDA si disponible, sinon CPU)
         import torch
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        compute_type = "float16" if device == "cuda" else "int8"
-
-        print(f"[WHISPER] Chargement du modèle '{model_name}' sur {device}...")
-        self.model = WhisperModel(model_name, device=device, compute_type=compute_type)
+        if compute_type is None:
+            compute_type = "float16" if device == "cuda" else "int8"
+        # Les threads CTranslate2 héritent de l'affinité du thread qui les crée:
+        # chargement et transcriptions se font depuis des threads limités à ces CPUs
+        self.cpu_affinity = cpu_affinity if device == "cpu" else None
+        self._pinned_threads = set()
+
+        print(f"[WHISPER] Chargement du modèle '{model_name}' sur {device} ({compute_type}, "
+              f"{cpu_threads or 'auto'} threads, {num_workers} worker(s), beam {beam_size}"
+              + (f", CPUs {sorted(self.cpu_affinity)}" if self.cpu_affinity else "") + ")...")
+        previous = os.sched_getaffinity(0) if self.cpu_affinity else None
+        try:
+            if self.cpu_affinity:
+                os.sched_setaffinity(0, self.cpu_affinity)
+            self.model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                                      cpu_threads=cpu_threads, num_workers=num_workers)
+        finally:
+            if previous:
+                os.sched_setaffinity(0, previous)  # Le thread appelant n'est pas un thread d'inférence
         print(f"[WHISPER] Modèle chargé.")
 
+    def _pin_current_thread(self):
+        """Limite le thread appelant aux CPUs d'inférence (une fois par thread)."""
+        ident = threading.get_ident()
+        if self.cpu_affinity and ident not in self._pinned_threads:
+            os.sched_setaffinity(0, self.cpu_affinity)
+            self._pinned_threads.add(ident)
+
     def _resample(self, audio_bytes: bytes) -> np.ndarray:
         """
         Resample et convertit en float32 pour Whisper.
@@ -124,12 +276,13 @@ class WhisperSTTEngine(STTEngine):
         Returns:
             Texte transcrit
         """
+        self._pin_current_thread()
         audio_float = self._resample(audio_bytes)
 
         segments, info = self.model.transcribe(
             audio_float,
             language=self.language,
-            beam_size=5,
+            beam_size=self.beam_size,
             vad_filter=True,  # Filtre VAD intégré
             vad_parameters=dict(min_silence_duration_ms=500)
         )
@@ -193,6 +346,8 @@ class WindowsSpeechEngine(STTEngine):
 
     def _resample(self, audio_bytes: bytes) -> bytes:
         """Resample de input_sample_rate vers 16kHz."""
+        if self.input_sample_rate == self.target_sample_rate:
+            return audio_bytes
         audio_np = np.frombuffer(audio_bytes, dtype=np.int16)
         ratio = self.input_sample_rate // self.target_sample_rate
         resampled = audio_np[::ratio]
@@ -224,30 +379,216 @@ class WindowsSpeechEngine(STTEngine):
             return ""
 
 
+class CascadeSTTEngine(STTEngine):
+    """
+    Deux moteurs chargés en permanence: un précis (Whisper base/small) et un
+    rapide (Vosk ou Whisper tiny), avec une deadline par utterance.
+
+    - parallel: les deux démarrent ensemble. Le résultat précis est retenu
+      s'il arrive avant la deadline, sinon le premier résultat acceptable
+      (non vide) disponible.
+    - fallback: seul le précis démarre; le rapide n'est lancé que si la
+      deadline passe sans résultat, et le premier des deux qui répond gagne.
+
+    Chaque moteur a un seul worker: si le précis traite encore une utterance
+    en retard, la suivante part directement au rapide au lieu de s'empiler.
+    Un précis en retard va au bout (son temps sert au calcul de la latence
+    économisée), mais son texte est ignoré.
+    """
+
+    def __init__(self, accurate: STTEngine, fast: STTEngine, deadline_s: float = 0.8, mode: str = "parallel",
+                 names=("précis", "rapide")):
+        if mode not in ("parallel", "fallback"):
+            raise ValueError(f"Mode cascade inconnu: {mode}. Utilisez 'parallel' ou 'fallback'.")
+        self.accurate = accurate
+        self.fast = fast
+        self.deadline_s = deadline_s
+        self.mode = mode
+        self.names = {"accurate": names[0], "fast": names[1]}
+        self._pools = {
+            "accurate": ThreadPoolExecutor(max_workers=1, thread_name_prefix="STT-accurate"),
+            "fast": ThreadPoolExecutor(max_workers=1, thread_name_prefix="STT-fast"),
+        }
+        self._busy = {"accurate": None, "fast": None}
+        self._lock = threading.Lock()
+        self.last_winner = None
+        self.wins = {"accurate": 0, "fast": 0}
+        self.deadline_misses = 0
+        self.empty = 0               # Utterances sans texte d'aucun des deux moteurs (pas une victoire)
+        self.accurate_busy = 0       # Utterances envoyées au rapide seul (précis encore occupé)
+        self.saved_s = 0.0           # Somme (latence précis - latence retenue) quand le rapide gagne
+        self.decision_latencies = []
+
+    def _submit(self, which: str, audio_bytes: bytes):
+        engine = self.accurate if which == "accurate" else self.fast
+        start = time.perf_counter()
+
+        def run():
+            text = engine.transcribe(audio_bytes)
+            return text, time.perf_counter() - start
+
+        future = self._pools[which].submit(run)
+        self._busy[which] = future
+        return future
+
+    def _is_busy(self, which: str) -> bool:
+        future = self._busy[which]
+        return future is not None and not future.done()
+
+    @staticmethod
+    def _acceptable(future) -> bool:
+        return future.done() and future.exception() is None and bool(future.result()[0].strip())
+
+    def transcribe(self, audio_bytes: bytes) -> str:
+        start = time.perf_counter()
+        deadline = start + self.deadline_s
+        accurate = None
+        if self._is_busy("accurate"):
+            self.accurate_busy += 1
+        else:
+            accurate = self._submit("accurate", audio_bytes)
+        fast = self._submit("fast", audio_bytes) if self.mode == "parallel" or accurate is None else None
+
+        if accurate is not None:
+            # Précis dans les temps: il gagne toujours
+            try:
+                accurate.result(timeout=max(0.0, deadline - time.perf_counter()))
+            except Exception:
+                pass
+            if self._acceptable(accurate):
+                self._decide("accurate", start)
+                return accurate.result()[0]
+            if not accurate.done():
+                self.deadline_misses += 1
+            if fast is None and not self._is_busy("fast"):
+                fast = self._submit("fast", audio_bytes)
+
+        # Après la deadline: premier résultat acceptable des deux
+        candidates = {f: name for name, f in (("accurate", accurate), ("fast", fast)) if f is not None}
+        pending = set(candidates)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if not self._acceptable(future):
+                    continue
+                name = candidates[future]
+                decided = self._decide(name, start)
+                if name == "fast" and accurate is not None:
+                    accurate.add_done_callback(lambda f, d=decided: self._record_saved(f, d))
+                return future.result()[0]
+        # Aucun moteur n'a produit de texte: compté à part pour ne pas fausser les victoires
+        with self._lock:
+            self.last_winner = None
+            self.empty += 1
+            self.decision_latencies.append(time.perf_counter() - start)
+        return ""
+
+    def _decide(self, name: str, start: float) -> float:
+        """Comptabilise le gagnant, retourne la latence de décision."""
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.last_winner = self.names[name]
+            self.wins[name] += 1
+            self.decision_latencies.append(latency)
+        return latency
+
+    def _record_saved(self, future, decided_s: float):
+        """Appelé quand un précis en retard finit: latence qu'il aurait coûtée en plus."""
+        if future.exception() is not None:
+            return
+        _, accurate_latency = future.result()
+        with self._lock:
+            self.saved_s += max(0.0, accurate_latency - decided_s)
+
+    def report(self):
+        total = sum(self.wins.values())
+        if not total and not self.empty:
+            return
+        lat = np.array(self.decision_latencies)
+        shares = (f"{self.names['accurate']} {self.wins['accurate'] / total:.0%}, "
+                  f"{self.names['fast']} {self.wins['fast'] / total:.0%}, ") if total else ""
+        print(f"[CASCADE] {total + self.empty} utterances ({self.mode}, deadline {self.deadline_s:.2f}s): "
+              f"{shares}{self.empty} sans texte")
+        print(f"[CASCADE] Deadline dépassée {self.deadline_misses} fois, précis occupé {self.accurate_busy} fois, "
+              f"latence économisée {self.saved_s:.1f}s au total "
+              f"({self.saved_s / self.wins['fast'] if self.wins['fast'] else 0:.2f}s par victoire du rapide)")
+        print(f"[CASCADE] Latence de décision: p50 {np.percentile(lat, 50):.2f}s, p95 {np.percentile(lat, 95):.2f}s")
+
+    def close(self):
+        """Libère les workers: les transcriptions en attente sont annulées, une en cours va au bout."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
 def create_stt_engine(engine_type: str = "vosk", **kwargs) -> STTEngine:
     """
     Factory pour créer le bon moteur STT.
 
     Args:
         engine_type: "vosk", "whisper" ou "windows"
-        **kwargs: Arguments spécifiques au moteur
+        **kwargs: Arguments spécifiques au moteur. Avec fast_engine ("vosk" ou
+            "whisper-tiny"), retourne une CascadeSTTEngine (deadline_s, cascade_mode)
 
     Returns:
         Instance de STTEngine
     """
+    fast_engine = kwargs.pop("fast_engine", None)
+    if fast_engine:
+        # Threads CPU du précis: explicites > profil calibré > tous sauf un, gardé pour le rapide
+        accurate_kwargs = dict(kwargs)
+        if kwargs.get("cpu_threads") is None and not (
+                engine_type == "whisper"
+                and "cpu_threads" in load_whisper_profile(kwargs.get("model_name", "base"), kwargs.get("profile_path"))):
+            accurate_kwargs["cpu_threads"] = max(1, (os.cpu_count() or 2) - 1)
+        accurate = create_stt_engine(engine_type, **accurate_kwargs)
+        if fast_engine == "whisper-tiny":
+            fast = create_stt_engine("whisper", **{**kwargs, "model_name": "tiny", "cpu_threads": 1})
+        else:
+            fast = create_stt_engine(fast_engine, **kwargs)
+        accurate_name = f"{engine_type}-{kwargs.get('model_name', 'base')}" if engine_type == "whisper" else engine_type
+        return CascadeSTTEngine(
+            accurate, fast,
+            deadline_s=kwargs.get("deadline_s", 0.8),
+            mode=kwargs.get("cascade_mode", "parallel"),
+            names=(accurate_name, fast_engine)
+        )
+
     if engine_type == "vosk":
         model_path = kwargs.get("model_path", "models/vosk-model-small-fr-0.22")
         input_sample_rate = kwargs.get("input_sample_rate", 48000)
-        return VoskSTTEngine(model_path=model_path, input_sample_rate=input_sample_rate)
+        grammar_path = kwargs.get("grammar_path")
+        return VoskSTTEngine(
+            model_path=model_path,
+            input_sample_rate=input_sample_rate,
+            grammar=load_grammar(grammar_path) if grammar_path else None,
+            mode=kwargs.get("grammar_mode", "hybrid") if grammar_path else "open",
+            min_confidence=kwargs.get("grammar_min_confidence", 0.6)
+        )
 
     elif engine_type == "whisper":
         model_name = kwargs.get("model_name", "base")
         language = kwargs.get("language", "fr")
         input_sample_rate = kwargs.get("input_sample_rate", 48000)
+        # Réglages CPU: arguments explicites > profil calibré (calibrate-whisper) > défauts
+        settings = {"cpu_threads": 0, "num_workers": 1, "compute_type": None, "beam_size": 5}
+        profile = load_whisper_profile(model_name, kwargs.get("profile_path"))
+        if profile:
+            print(f"[WHISPER] Profil calibré chargé pour '{model_name}': "
+                  + ", ".join(f"{k}={v}" for k, v in profile.items()))
+        reserve_cpus = profile.pop("reserve_cpus", 0)
+        if kwargs.get("reserve_cpus") is not None:
+            reserve_cpus = kwargs["reserve_cpus"]
+        settings.update(profile)
+        settings.update({k: kwargs[k] for k in WHISPER_PROFILE_KEYS if kwargs.get(k) is not None})
+        cpu_affinity = inference_cpus(reserve_cpus)
+        if cpu_affinity and settings["cpu_threads"] > len(cpu_affinity):
+            settings["cpu_threads"] = len(cpu_affinity)
         return WhisperSTTEngine(
             model_name=model_name,
             language=language,
-            input_sample_rate=input_sample_rate
+            input_sample_rate=input_sample_rate,
+            cpu_affinity=cpu_affinity,
+            **settings
         )
 
     elif engine_type == "windows":
@@ -2,6 +2,8 @@ import webrtcvad
 import collections
 import sys
 
+import numpy as np
+
 class VoiceActivityDetector:
     def __init__(self, aggressiveness=2, sample_rate=48000):
         """
@@ -19,69 +21,176 @@ class VoiceActivityDetector:
         except Exception:
             return False
 
+    def classify(self, pcm, frame_ms=20):
+        """
+        Classe en une passe toutes les frames complètes d'un bloc PCM 16-bit mono.
+
+        Les frames sont des tranches de memoryview (aucune copie, pcm peut être
+        un mmap). Retourne une liste de booléens, une par frame.
+        """
+        frame_bytes = int(self.sample_rate * frame_ms / 1000) * 2
+        view = memoryview(pcm)
+        vad_is_speech = self.vad.is_speech
+        rate = self.sample_rate
+        return [vad_is_speech(view[i:i + frame_bytes], rate)
+                for i in range(0, len(view) - frame_bytes + 1, frame_bytes)]
+
+class UtteranceSegment(bytes):
+    """
+    Audio PCM d'un énoncé (se comporte comme bytes) et sa place dans le tour de parole.
+
+    turn: numéro du tour de parole, index: rang du segment dans ce tour,
+    final: True pour le dernier segment (fin de phrase ou relâchement PTT).
+    Un tour non découpé donne un seul segment (index 0, final).
+    """
+
+    @classmethod
+    def create(cls, audio: bytes, turn: int, index: int, final: bool):
+        segment = cls(audio)
+        segment.turn = turn
+        segment.index = index
+        segment.final = final
+        return segment
+
+
 class UtteranceBuffer:
-    def __init__(self, min_speech_ms=100, min_silence_ms=400, padding_ms=200, chunk_ms=20):
+    def __init__(self, min_speech_ms=0, min_silence_ms=400, padding_ms=200, chunk_ms=20, verbose=True,
+                 max_utterance_ms=None, split_search_ms=1500):
         """
         Gère l'accumulation de frames et la détection de phrases complètes.
+
+        Un tour contenant moins de min_speech_ms de frames parole (clic, bruit
+        bref) est abandonné au lieu d'être émis. 0 (défaut) n'abandonne rien:
+        un "oui" ou un "non" très court reste un énoncé.
+
+        verbose=False supprime la trace par frame (+ . -) sur stdout, coûteuse
+        en traitement hors-ligne.
+
+        max_utterance_ms borne la durée d'un segment (None = illimité): au-delà,
+        le tour est coupé au point le moins énergétique des split_search_ms
+        précédant la limite, le début part en aval et la suite continue de
+        s'accumuler. Mémoire et latence pire-cas ne dépendent alors plus de la
+        durée de parole.
         """
         self.chunk_ms = chunk_ms
+        self.verbose = verbose
         self.min_speech_frames = int(min_speech_ms / chunk_ms)
         self.min_silence_frames = int(min_silence_ms / chunk_ms)
         self.padding_frames_count = int(padding_ms / chunk_ms)
+        self.max_frames = int(max_utterance_ms / chunk_ms) if max_utterance_ms else None
+        if self.max_frames:
+            self.search_frames = max(1, min(int(split_search_ms / chunk_ms), self.max_frames - 1))
         
         self.ring_buffer = collections.deque(maxlen=self.padding_frames_count)
         self.active_frames = []
+        self.frame_energy = []  # Énergie par frame de active_frames (seulement si max_frames)
         self.triggered = False
         self.silence_counter = 0
+        self.speech_frames = 0  # Frames parole du tour en cours (filtre min_speech_ms)
+        self.discarded = 0
+        self.turn = 0
+        self.segment_index = 0
+        self.splits = 0
 
     def process_frame(self, frame_bytes, is_speech: bool):
         """
-        Retourne des bytes (WAV content complet) si une phrase vient de se terminer, sinon None.
+        Retourne un UtteranceSegment si une phrase vient de se terminer (ou si
+        le tour en cours atteint max_utterance_ms), sinon None.
         """
         if not self.triggered:
             self.ring_buffer.append(frame_bytes)
             if is_speech:
                 # Démarrage de parole
-                sys.stdout.write('+')
-                sys.stdout.flush()
+                self._trace('+')
                 self.triggered = True
                 self.active_frames = list(self.ring_buffer) # Copie le pré-roll
+                if self.max_frames:
+                    self.frame_energy = [self._energy(f) for f in self.active_frames]
                 self.silence_counter = 0
+                self.speech_frames = 1
         else:
             self.active_frames.append(frame_bytes)
+            if self.max_frames:
+                self.frame_energy.append(self._energy(frame_bytes))
             if is_speech:
-                sys.stdout.write('.')
-                sys.stdout.flush()
+                self._trace('.')
                 self.silence_counter = 0
+                self.speech_frames += 1
             else:
-                sys.stdout.write('-')
-                sys.stdout.flush()
+                self._trace('-')
                 self.silence_counter += 1
                 
             # Fin de phrase détectée ?
             if self.silence_counter > self.min_silence_frames:
-                print(" [END]")
+                if self.speech_frames < self.min_speech_frames and self.segment_index == 0:
+                    # Moins de min_speech_ms de parole: clic ou bruit bref, pas un énoncé
+                    self._trace(" [SKIP]\n")
+                    self.discarded += 1
+                    self.reset()
+                    return None
+                self._trace(" [END]\n")
                 # On enlève le silence de fin (optionnel, mais propre)
                 # Mais on peut aussi tout garder
-                full_audio = b''.join(self.active_frames)
-                self.reset()
-                return full_audio
+                return self._finish_turn()
+
+            # Tour trop long: on émet le début, la suite reste dans le buffer
+            if self.max_frames and len(self.active_frames) >= self.max_frames:
+                return self._split()
         return None
 
+    @staticmethod
+    def _energy(frame_bytes) -> float:
+        samples = np.frombuffer(frame_bytes, dtype=np.int16).astype(np.float32)
+        return float(np.dot(samples, samples))
+
+    def _split(self):
+        """Coupe au creux d'énergie (lissé sur 3 frames) de la fenêtre de recherche."""
+        end = len(self.active_frames)
+        start = end - self.search_frames
+        energy = self.frame_energy[start:end]
+        if len(energy) >= 3:
+            # window[j] = énergie des frames j, j+1, j+2 (mode "valid": pas de biais aux bords)
+            window = np.convolve(energy, np.ones(3), mode="valid")
+            cut = start + int(np.argmin(window)) + 2  # Coupe juste après la frame centrale, la plus calme
+        else:
+            cut = start + int(np.argmin(energy)) + 1
+
+        audio = b''.join(self.active_frames[:cut])
+        del self.active_frames[:cut]
+        del self.frame_energy[:cut]
+        segment = UtteranceSegment.create(audio, self.turn, self.segment_index, final=False)
+        self.segment_index += 1
+        self.splits += 1
+        self._trace(f" [SPLIT {cut * self.chunk_ms}ms]\n")
+        return segment
+
+    def _finish_turn(self):
+        segment = UtteranceSegment.create(b''.join(self.active_frames), self.turn,
+                                          self.segment_index, final=True)
+        self.turn += 1
+        self.reset()
+        return segment
+
     def force_finalize(self):
         """
         Force le retour immédiat de l'audio accumulé sans attendre le silence.
         Utilisé par le push-to-talk au relâchement de la touche.
         """
         if self.triggered and self.active_frames:
-            print(" [PTT END]")
-            full_audio = b''.join(self.active_frames)
-            self.reset()
-            return full_audio
+            self._trace(" [PTT END]\n")
+            return self._finish_turn()
         return None
 
+    def _trace(self, text):
+        if self.verbose:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
     def reset(self):
         self.triggered = False
         self.active_frames = []
+        self.frame_energy = []
         self.silence_counter = 0
+        self.speech_frames = 0
+        self.segment_index = 0
         self.ring_buffer.clear()
@@ -0,0 +1,156 @@
+"""
+Synthèse Inworld en masse (répliques de script, alertes pré-rendues).
+
+- entrée CSV (colonnes text, voice_id) ou JSONL ({"text": ..., "voice_id": ...})
+- les requêtes identiques (même texte, voix, modèle, sample rate) ne sont
+  synthétisées qu'une fois; le nom du WAV est dérivé de leur hash, donc une
+  relance ne refait que les fichiers absents (reprise)
+- requêtes concurrentes sur une Session partagée (keep-alive), débit borné par
+  un token bucket, retries/circuit breaker du client
+- manifest.jsonl: une ligne par ligne d'entrée -> fichier WAV
+"""
+import csv
+import json
+import os
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from client.inworld import InworldAuth, InworldTTSClient, request_key
+from client.resilience import InworldAPIError, RetryPolicy, TokenBucket
+
+
+def load_requests(path: str, default_voice: str = None):
+    """Lit les requêtes (text, voice_id) d'un CSV ou d'un JSONL."""
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for record in records:
+            text = (record.get("text") or "").strip()
+            voice_id = (record.get("voice_id") or "").strip() or default_voice
+            if not text:
+                continue
+            if not voice_id:
+                raise ValueError(f"Pas de voice_id pour '{text[:40]}' (colonne voice_id ou --voice)")
+            rows.append({"text": text, "voice_id": voice_id})
+    return rows
+
+
+def _write_wav(path: str, pcm: bytes, sample_rate: int):
+    # Écriture atomique: un fichier présent est toujours complet (reprise fiable)
+    tmp = path + ".tmp"
+    with wave.open(tmp, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    os.replace(tmp, path)
+
+
+def synthesize_batch(rows, output_dir: str, auth: InworldAuth, concurrency: int = 4,
+                     rate_per_s: float = 5.0, burst: int = 2, max_attempts: int = 5,
+                     base_url: str = None, audio_encoding: str = None, sample_rate: int = 48000):
+    """
+    Synthétise rows (liste de {"text", "voice_id"}) en WAV dans output_dir.
+
+    Returns:
+        Statistiques (requêtes uniques, doublons, en cache, erreurs, débit)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    limiter = TokenBucket(rate_per_s, burst)
+    client = InworldTTSClient(
+        auth, base_url=base_url, retry=RetryPolicy(max_attempts=max_attempts),
+        audio_encoding=audio_encoding, sample_rate=sample_rate,
+        session=session, rate_limiter=limiter
+    )
+
+    # Déduplication: une synthèse par clé, toutes les lignes d'entrée pointent dessus
+    unique = {}
+    keys = []
+    for row in rows:
+        key = request_key(row["text"], row["voice_id"], client.model_id, sample_rate)
+        keys.append(key)
+        unique.setdefault(key, row)
+    todo = {key: row for key, row in unique.items()
+            if not os.path.exists(os.path.join(output_dir, f"{key}.wav"))}
+    cached = len(unique) - len(todo)
+
+    print(f"{len(rows)} lignes, {len(unique)} requêtes uniques ({len(rows) - len(unique)} doublons), "
+          f"{cached} déjà en cache, {len(todo)} à synthétiser")
+    print(f"Concurrence: {concurrency}, débit max: {rate_per_s:g} req/s (rafale {burst}), "
+          f"encodage: {client.audio_encoding}")
+
+    def job(key, row):
+        start = time.perf_counter()
+        pcm = client.synthesize(row["text"], row["voice_id"], stream=False)
+        _write_wav(os.path.join(output_dir, f"{key}.wav"), pcm, sample_rate)
+        return len(pcm) / 2 / sample_rate, time.perf_counter() - start
+
+    results = {}
+    chars = 0
+    audio_s = 0.0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="BatchTTS") as pool:
+        futures = {pool.submit(job, key, row): key for key, row in todo.items()}
+        for i, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            row = todo[key]
+            try:
+                duration, elapsed = future.result()
+            except (InworldAPIError, OSError) as e:
+                results[key] = {"status": "error", "error": str(e)}
+                print(f"[{i}/{len(todo)}] ERREUR '{row['text'][:40]}': {e}")
+                continue
+            results[key] = {"status": "ok", "duration_s": round(duration, 3), "elapsed_s": round(elapsed, 3)}
+            chars += len(row["text"])
+            audio_s += duration
+            wall = time.perf_counter() - start
+            print(f"[{i}/{len(todo)}] {key}.wav ({duration:.1f}s, {elapsed:.2f}s) "
+                  f"| {chars / wall:.0f} car/s")
+    wall = time.perf_counter() - start
+    session.close()
+
+    # Manifest: une ligne par ligne d'entrée, dans l'ordre du fichier source
+    seen = set()
+    errors = 0
+    manifest_path = os.path.join(output_dir, "manifest.jsonl")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        for line, (row, key) in enumerate(zip(rows, keys), 1):
+            entry = {"line": line, "text": row["text"], "voice_id": row["voice_id"], "file": f"{key}.wav"}
+            result = results.get(key, {"status": "cached"})
+            if key in seen and result["status"] != "error":
+                entry["status"] = "duplicate"
+            else:
+                entry.update(result)
+            if entry["status"] == "error":
+                entry["file"] = None
+                errors += 1
+            seen.add(key)
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    synthesized = sum(1 for r in results.values() if r["status"] == "ok")
+    print()
+    print(f"Terminé: {synthesized} synthétisés, {cached} en cache, "
+          f"{len(rows) - len(unique)} doublons, {len(todo) - synthesized} en erreur")
+    if wall > 0 and synthesized:
+        print(f"Débit: {chars / wall:.0f} caractères/s, {synthesized / wall:.2f} requêtes/s, "
+              f"{audio_s:.1f}s d'audio en {wall:.1f}s")
+    print(f"Requêtes HTTP: {client.request_count} (retries: {client.retries}, "
+          f"attente rate limit: {limiter.waited_s:.1f}s)")
+    print(f"Manifest: {manifest_path}")
+    return {
+        "unique": len(unique), "duplicates": len(rows) - len(unique), "cached": cached,
+        "synthesized": synthesized, "errors": errors, "chars": chars, "wall_s": wall,
+        "requests": client.request_count, "retries": client.retries,
+    }
@@ -0,0 +1,140 @@
+"""
+Transcription hors-ligne d'un dossier de WAV sur un pool de processus.
+
+- chaque worker charge son propre moteur STT une seule fois (initializer)
+- les WAV sont mappés en mémoire dans le worker (seul le chemin transite)
+- les résultats sont écrits en JSONL au fil de l'eau, dans l'ordre d'arrivée
+- reprise: les fichiers déjà présents (sans erreur) dans le JSONL sont sautés
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# État du worker (un moteur par sample rate rencontré)
+_worker_engine_kwargs = None
+_worker_threads = 1
+_worker_engines = {}
+
+
+def find_wavs(root: str):
+    """Liste triée des .wav sous root (récursif)."""
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(".wav"):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def load_done(output_path: str) -> set:
+    """Chemins déjà transcrits avec succès dans un JSONL existant."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Ligne tronquée par un arrêt brutal
+            if "error" not in record:
+                done.add(record["path"])
+    return done
+
+
+def _init_worker(engine_kwargs: dict, threads_per_worker: int):
+    """Initializer du pool: borne les threads natifs avant tout import de moteur."""
+    global _worker_engine_kwargs, _worker_threads
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads_per_worker)
+    _worker_engine_kwargs = engine_kwargs
+    _worker_threads = threads_per_worker
+
+
+def _get_engine(sample_rate: int):
+    from processing.stt import create_stt_engine
+
+    if sample_rate not in _worker_engines:
+        # cpu_threads explicite: le profil Whisper calibré (un seul processus) ne doit pas
+        # multiplier ses threads par le nombre de workers
+        _worker_engines[sample_rate] = create_stt_engine(
+            input_sample_rate=sample_rate, cpu_threads=_worker_threads, **_worker_engine_kwargs
+        )
+    return _worker_engines[sample_rate]
+
+
+def _transcribe_file(path: str) -> dict:
+    """Exécuté dans un worker: mappe le WAV, transcrit, retourne le record JSONL."""
+    from core.wavfile import MappedWav
+
+    try:
+        with MappedWav(path) as wav:
+            engine = _get_engine(wav.sample_rate)
+            duration = wav.duration_s
+            start = time.perf_counter()
+            text = engine.transcribe(wav.mono_pcm())
+            elapsed = time.perf_counter() - start
+    except Exception as e:
+        return {"path": path, "error": str(e), "worker": os.getpid()}
+
+    return {
+        "path": path,
+        "text": text,
+        "duration_s": round(duration, 3),
+        "elapsed_s": round(elapsed, 3),
+        "rtf": round(elapsed / duration, 4) if duration else None,
+        "worker": os.getpid(),
+    }
+
+
+def transcribe_batch(root: str, output_path: str, engine_kwargs: dict, workers: int = None,
+                     threads_per_worker: int = 1):
+    """
+    Transcrit tous les WAV de root vers output_path (JSONL, reprise automatique).
+
+    Returns:
+        Statistiques globales (fichiers, durée audio, temps mur, RTF)
+    """
+    workers = workers or os.cpu_count() or 1
+    paths = find_wavs(root)
+    done = load_done(output_path)
+    todo = [p for p in paths if p not in done]
+
+    print(f"{len(paths)} fichiers WAV, {len(done)} déjà transcrits, {len(todo)} à traiter")
+    if not todo:
+        return {"files": 0, "audio_s": 0.0, "wall_s": 0.0}
+    print(f"Pool: {workers} workers x {threads_per_worker} thread(s), moteur {engine_kwargs.get('engine_type')}")
+
+    audio_s = 0.0
+    compute_s = 0.0
+    errors = 0
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(engine_kwargs, threads_per_worker)
+    ) as pool:
+        futures = [pool.submit(_transcribe_file, path) for path in todo]
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+            if "error" in record:
+                errors += 1
+                print(f"[{i}/{len(todo)}] ERREUR {record['path']}: {record['error']}")
+                continue
+            audio_s += record["duration_s"]
+            compute_s += record["elapsed_s"]
+            wall = time.perf_counter() - start
+            rtf = "-" if record["rtf"] is None else f"{record['rtf']:.3f}"  # WAV vide: pas de RTF
+            print(f"[{i}/{len(todo)}] {record['path']} ({record['duration_s']:.1f}s, RTF {rtf}) "
+                  f"-> '{record['text']}'  | débit x{audio_s / wall:.1f} temps réel")
+
+    wall = time.perf_counter() - start
+    print()
+    print(f"Terminé: {len(todo) - errors} fichiers, {errors} erreurs, {audio_s:.1f}s d'audio en {wall:.1f}s")
+    if audio_s:
+        print(f"RTF moyen par fichier: {compute_s / audio_s:.3f} | "
+              f"RTF global (mur): {wall / audio_s:.3f} | débit: x{audio_s / wall:.1f} temps réel")
+    print(f"Résultats: {output_path}")
+    return {"files": len(todo) - errors, "errors": errors, "audio_s": audio_s, "wall_s": wall}
@@ -0,0 +1,113 @@
+"""
+Comparaison des modes de décodage Vosk (ouvert, grammaire, hybride) sur des
+clips étiquetés.
+
+Chaque WAV est accompagné de sa transcription de référence (même nom,
+extension .txt): texte brut, ou étiquettes Audacity dont la troisième
+colonne contient le texte (format de sweep-endpointing).
+
+Par mode: temps de décodage (total, RTF, p50/p95 par clip), WER global et
+part des phrases exactes, séparément pour les clips dont la référence est
+une phrase de la grammaire et pour les autres (le mode contraint y est
+forcément mauvais: c'est ce que le mode hybride doit rattraper).
+"""
+import os
+import time
+
+import numpy as np
+
+from core.phrase_bank import normalize_text
+from core.wavfile import MappedWav
+from processing.stt import VoskSTTEngine, load_grammar
+from tools.batch_transcribe import find_wavs
+from tools.calibrate_whisper import word_error_rate
+
+
+def load_reference(path: str) -> str:
+    """Transcription de référence d'un .txt (texte brut ou étiquettes Audacity avec texte)."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    if lines and all("\t" in line for line in lines):
+        return " ".join(line.split("\t")[2] for line in lines if len(line.split("\t")) >= 3)
+    return " ".join(lines)
+
+
+def _load_clips(root: str):
+    """[(chemin, sample_rate, pcm, référence)] pour les WAV de root qui ont un .txt."""
+    clips = []
+    for wav_path in find_wavs(root):
+        label_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(label_path):
+            print(f"[GRAMMAR] Pas de référence, ignoré: {wav_path}")
+            continue
+        with MappedWav(wav_path) as wav:
+            if wav.sample_rate % 16000:
+                print(f"[GRAMMAR] Ignoré ({wav.sample_rate}Hz, 16/32/48kHz attendu): {wav_path}")
+                continue
+            clips.append((wav_path, wav.sample_rate, bytes(wav.mono_pcm()), load_reference(label_path)))
+    return clips
+
+
+def bench_grammar(root: str, grammar_path: str, model_path: str, min_confidence: float = 0.6,
+                  modes=VoskSTTEngine.MODES) -> dict:
+    """Décode tous les clips dans chaque mode et affiche la comparaison. Retourne {mode: stats}."""
+    clips = _load_clips(root)
+    if not clips:
+        print(f"Aucun clip étiqueté trouvé dans {root}")
+        return {}
+    grammar = load_grammar(grammar_path)
+    in_grammar = {normalize_text(p) for p in grammar}
+    engine = VoskSTTEngine(model_path, input_sample_rate=16000, grammar=grammar, mode="hybrid",
+                           min_confidence=min_confidence)
+    audio_s = sum(len(pcm) / 2 / rate for _, rate, pcm, _ in clips)
+    covered = sum(1 for *_, ref in clips if normalize_text(ref) in in_grammar)
+    print(f"{len(clips)} clips ({audio_s:.1f}s d'audio), {covered} dans la grammaire ({len(grammar)} phrases)")
+    print()
+
+    results = {}
+    for mode in modes:
+        engine.mode = mode
+        engine.grammar_hits = engine.fallbacks = 0
+        timings = []
+        groups = {True: [0, 0, 0, 0], False: [0, 0, 0, 0]}  # erreurs, mots, exactes, clips
+        for path, rate, pcm, reference in clips:
+            engine.input_sample_rate = rate
+            start = time.perf_counter()
+            text = engine.transcribe(pcm)
+            timings.append(time.perf_counter() - start)
+            ref_words = len(normalize_text(reference).split())
+            group = groups[normalize_text(reference) in in_grammar]
+            group[0] += word_error_rate(reference, text) * ref_words
+            group[1] += ref_words
+            group[2] += normalize_text(text) == normalize_text(reference)
+            group[3] += 1
+        lat = np.array(timings)
+        errors = sum(g[0] for g in groups.values())
+        words = sum(g[1] for g in groups.values())
+        results[mode] = {
+            "decode_s": float(lat.sum()),
+            "rtf": float(lat.sum()) / audio_s,
+            "p50_ms": float(np.percentile(lat, 50)) * 1000,
+            "p95_ms": float(np.percentile(lat, 95)) * 1000,
+            "wer": errors / words if words else 0.0,
+            "exact_in": groups[True][2] / groups[True][3] if groups[True][3] else None,
+            "exact_out": groups[False][2] / groups[False][3] if groups[False][3] else None,
+            "fallbacks": engine.fallbacks,
+        }
+
+    def pct(value):
+        return "-" if value is None else f"{value:.0%}"
+
+    print(f"{'Mode':<8} | {'Décodage':>9} | {'RTF':>5} | {'p50':>7} | {'p95':>7} | {'WER':>5} | "
+          f"{'Exactes (gram.)':>15} | {'Exactes (hors)':>14} | Repli")
+    print("-" * 100)
+    for mode, r in results.items():
+        fallback = f"{r['fallbacks']}/{len(clips)}" if mode == "hybrid" else "-"
+        print(f"{mode:<8} | {r['decode_s']:>8.2f}s | {r['rtf']:>5.3f} | {r['p50_ms']:>5.0f}ms | "
+              f"{r['p95_ms']:>5.0f}ms | {r['wer']:>5.1%} | {pct(r['exact_in']):>15} | "
+              f"{pct(r['exact_out']):>14} | {fallback}")
+    if "open" in results and "hybrid" in results and results["open"]["decode_s"]:
+        speedup = results["open"]["decode_s"] / results["hybrid"]["decode_s"] if results["hybrid"]["decode_s"] else 0
+        print(f"\nHybride: {speedup:.2f}x le débit du vocabulaire ouvert, WER "
+              f"{results['hybrid']['wer']:.1%} contre {results['open']['wer']:.1%}")
+    return results
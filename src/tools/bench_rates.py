@@ -0,0 +1,82 @@
+"""
+Benchmark du coût CPU côté capture selon le sample rate.
+
+Rejoue sur un signal synthétique (parole alternée avec du silence) le travail
+fait par le pipeline pour chaque seconde captée: VAD par frame de 20ms,
+UtteranceBuffer, pré-filtre acoustique puis rééchantillonnage vers 16kHz
+avant STT (inférence exclue: identique quel que soit le rate de capture).
+
+Compare la capture historique à 48kHz à la capture négociée à 16kHz.
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from processing.prefilter import SpeechPreFilter
+from processing.stt import STT_SAMPLE_RATE, VoskSTTEngine
+from processing.vad import UtteranceBuffer, VoiceActivityDetector
+from tools.bench_transport import synth_speech_like
+
+
+def _session(seconds: float, sample_rate: int) -> bytes:
+    """Alternance 3s de parole / 2s de silence bruité."""
+    rng = np.random.default_rng(0)
+    speech = np.frombuffer(synth_speech_like(3.0, sample_rate), dtype=np.int16)
+    parts = []
+    for _ in range(int(seconds / 5)):
+        parts.append(speech)
+        parts.append((rng.standard_normal(2 * sample_rate) * 30).astype(np.int16))
+    return np.concatenate(parts).tobytes()
+
+
+def _run(pcm: bytes, sample_rate: int, frame_ms: int = 20) -> dict:
+    vad = VoiceActivityDetector(aggressiveness=3, sample_rate=sample_rate)
+    buffer = UtteranceBuffer(min_silence_ms=600, padding_ms=200, chunk_ms=frame_ms, verbose=False)
+    prefilter = SpeechPreFilter(sample_rate=sample_rate, frame_ms=frame_ms)
+    # Même rééchantillonnage que les moteurs STT, sans charger de modèle
+    engine = SimpleNamespace(input_sample_rate=sample_rate, target_sample_rate=STT_SAMPLE_RATE)
+
+    frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+    view = memoryview(pcm)
+    cpu = {"vad": 0.0, "buffer": 0.0, "prefilter": 0.0, "resample": 0.0}
+    utterances = 0
+    for i in range(0, len(view) - frame_bytes + 1, frame_bytes):
+        frame = bytes(view[i:i + frame_bytes])  # PyAudio livre un bytes par callback
+        t0 = time.process_time()
+        is_speech = vad.is_speech(frame)
+        t1 = time.process_time()
+        utterance = buffer.process_frame(frame, is_speech)
+        t2 = time.process_time()
+        cpu["vad"] += t1 - t0
+        cpu["buffer"] += t2 - t1
+        if utterance:
+            utterances += 1
+            t3 = time.process_time()
+            prefilter.is_speech(utterance)
+            t4 = time.process_time()
+            VoskSTTEngine._resample(engine, utterance)
+            cpu["prefilter"] += t4 - t3
+            cpu["resample"] += time.process_time() - t4
+
+    audio_s = len(pcm) / 2 / sample_rate
+    return {"audio_s": audio_s, "utterances": utterances,
+            **{k: v / audio_s for k, v in cpu.items()}, "total": sum(cpu.values()) / audio_s}
+
+
+def bench_rates(seconds: float = 120.0, rates=(48000, 16000)):
+    """Affiche le CPU par seconde d'audio captée pour chaque sample rate."""
+    print(f"{seconds:.0f}s de session simulée par rate (CPU en ms par seconde d'audio)")
+    print(f"{'Capture':>8} | {'VAD':>7} | {'Buffer':>7} | {'Préfiltre':>9} | {'Resample':>8} | {'Total':>7} | Énoncés")
+    print("-" * 72)
+    results = {}
+    for rate in rates:
+        r = _run(_session(seconds, rate), rate)
+        results[rate] = r
+        print(f"{rate:>6}Hz | {r['vad'] * 1000:>7.3f} | {r['buffer'] * 1000:>7.3f} | "
+              f"{r['prefilter'] * 1000:>9.3f} | {r['resample'] * 1000:>8.3f} | {r['total'] * 1000:>7.3f} | "
+              f"{r['utterances']}")
+    if len(rates) == 2:
+        before, after = results[rates[0]], results[rates[1]]
+        print(f"\nGain CPU {rates[0]} -> {rates[1]}Hz: x{before['total'] / after['total']:.2f}")
+    return results
@@ -0,0 +1,130 @@
+"""
+Benchmark du décodage de la réponse streaming Inworld.
+
+Compare, sur le même flux enregistré découpé en chunks réseau:
+- legacy: découpage en lignes (comme requests.iter_lines), json.loads puis
+  base64.b64decode par record (ancien _stream_generator)
+- parser: AudioContentParser (recherche du champ sans JSON, base64 dans un
+  buffer réutilisé, memoryview)
+
+Mesures: temps CPU et octets alloués transitoirement (tracemalloc) par
+seconde d'audio produite.
+
+Fixture: corps brut d'une réponse voice:stream (JSON ligne par ligne). Sans
+fixture, un flux est généré via le faux serveur (MockInworldServer).
+"""
+import base64
+import json
+import random
+import time
+import tracemalloc
+
+from client.mock_server import MockInworldServer
+from client.stream_parser import AudioContentParser
+
+
+def _legacy_iter_lines(chunks):
+    """Réplique de requests.iter_lines: recolle les lignes coupées entre chunks."""
+    pending = None
+    for chunk in chunks:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1]:
+            pending = lines.pop()
+        else:
+            pending = None
+        yield from lines
+    if pending is not None:
+        yield pending
+
+
+def legacy_decode(chunks):
+    for line in _legacy_iter_lines(chunks):
+        if line:
+            try:
+                data = json.loads(line)
+                if "audioContent" in data:
+                    yield base64.b64decode(data["audioContent"])
+            except json.JSONDecodeError:
+                pass
+
+
+def parser_decode(chunks):
+    parser = AudioContentParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    parser.finish()
+
+
+def make_fixture(seconds: float = 20.0, sample_rate: int = 48000, chunk_ms: int = 200) -> bytes:
+    """Corps de réponse streaming synthétique (~seconds d'audio)."""
+    server = MockInworldServer(stream_chunk_ms=chunk_ms)
+    text = "x" * int(seconds / 0.07)
+    payload = {"text": text, "audioConfig": {"audioEncoding": "LINEAR16", "sampleRateHertz": sample_rate}}
+    return b"".join(server._stream_records(payload))
+
+
+def split_chunks(body: bytes, mean_size: int, seed: int = 0):
+    """Découpe le corps en chunks de taille aléatoire autour de mean_size (frontières quelconques)."""
+    rng = random.Random(seed)
+    chunks, i = [], 0
+    while i < len(body):
+        n = rng.randint(max(1, mean_size // 2), mean_size * 3 // 2)
+        chunks.append(body[i:i + n])
+        i += n
+    return chunks
+
+
+def _measure(decode, chunks, sample_rate: int, repeats: int):
+    # CPU: meilleur de plusieurs passes, sans tracemalloc (il ralentit tout)
+    best_cpu = None
+    audio_bytes = 0
+    for _ in range(repeats):
+        start = time.process_time()
+        audio_bytes = 0
+        for audio in decode(chunks):
+            audio_bytes += len(audio)
+        cpu = time.process_time() - start
+        best_cpu = cpu if best_cpu is None else min(best_cpu, cpu)
+
+    # Allocations: pic transitoire mesuré à chaque record, cumulé
+    tracemalloc.start()
+    allocated = 0
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    for audio in decode(chunks):
+        current, peak = tracemalloc.get_traced_memory()
+        allocated += peak - base
+        tracemalloc.reset_peak()
+        base = current
+    tracemalloc.stop()
+
+    audio_s = audio_bytes / 2 / sample_rate
+    return {"audio_s": audio_s, "cpu_s_per_audio_s": best_cpu / audio_s,
+            "alloc_bytes_per_audio_s": allocated / audio_s}
+
+
+def bench_stream_parser(fixture_path: str = None, chunk_size: int = 1400, repeats: int = 5,
+                        sample_rate: int = 48000):
+    """Affiche CPU et allocations par seconde d'audio pour les deux décodeurs."""
+    if fixture_path:
+        with open(fixture_path, "rb") as f:
+            body = f.read()
+    else:
+        body = make_fixture(sample_rate=sample_rate)
+    chunks = split_chunks(body, chunk_size)
+
+    legacy = _measure(legacy_decode, chunks, sample_rate, repeats)
+    parser = _measure(parser_decode, chunks, sample_rate, repeats)
+    if abs(legacy["audio_s"] - parser["audio_s"]) > 1e-6:
+        print(f"[WARN] Audio différent: legacy {legacy['audio_s']:.2f}s, parser {parser['audio_s']:.2f}s")
+
+    print(f"Flux: {len(body) / 1024:.0f} KB, {len(chunks)} chunks (~{chunk_size} B), {legacy['audio_s']:.1f}s d'audio")
+    print(f"{'Décodeur':<8} | {'CPU / s audio':>13} | {'Alloc / s audio':>15}")
+    print("-" * 43)
+    for name, r in (("legacy", legacy), ("parser", parser)):
+        print(f"{name:<8} | {r['cpu_s_per_audio_s'] * 1000:>10.3f} ms | "
+              f"{r['alloc_bytes_per_audio_s'] / 1024:>12.1f} KB")
+    print(f"\nGain CPU: x{legacy['cpu_s_per_audio_s'] / parser['cpu_s_per_audio_s']:.2f}")
+    return {"legacy": legacy, "parser": parser}
@@ -0,0 +1,246 @@
+"""
+Micro-benchmarks des composants du hot path, sans périphérique ni réseau.
+
+Chaque benchmark mesure un composant sur de l'audio synthétique (ou un WAV
+fixture): temps par unité (frame de 20ms ou seconde d'audio) et octets alloués
+par unité (tracemalloc, passe séparée: il ralentit tout). Le temps retenu est
+le meilleur de plusieurs passes, moins sensible au bruit de la machine.
+
+Les résultats sont écrits en JSON et comparés à une baseline: une mesure
+plus lente (ou plus allocatrice) que la baseline au-delà du seuil est une
+régression.
+
+    {"meta": {...}, "results": {"vad.is_speech": {"unit": "frame",
+     "time_us": 12.3, "alloc_bytes": 0.0, "count": 3000}, ...}}
+"""
+import json
+import os
+import platform
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+from client.inworld import InworldAuth, InworldTTSClient
+from processing.stt import STT_SAMPLE_RATE, VoskSTTEngine, WhisperSTTEngine
+from processing.vad import UtteranceBuffer, VoiceActivityDetector
+from tools.bench_stream_parser import make_fixture, split_chunks
+from tools.bench_transport import synth_speech_like
+
+FRAME_MS = 20
+ALLOC_FLOOR_BYTES = 64  # En dessous, une hausse d'allocations n'est pas une régression (bruit tracemalloc)
+
+
+def _session_pcm(seconds: float, sample_rate: int) -> bytes:
+    """Alternance 3s de parole / 2s de silence bruité (comme bench-rates)."""
+    rng = np.random.default_rng(0)
+    speech = np.frombuffer(synth_speech_like(3.0, sample_rate), dtype=np.int16)
+    parts = []
+    for _ in range(max(1, int(seconds / 5))):
+        parts.append(speech)
+        parts.append((rng.standard_normal(2 * sample_rate) * 30).astype(np.int16))
+    return np.concatenate(parts).tobytes()
+
+
+def _frames(pcm: bytes, sample_rate: int):
+    frame_bytes = int(sample_rate * FRAME_MS / 1000) * 2
+    return [pcm[i:i + frame_bytes] for i in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+
+
+def _measure(steps, units: float, repeats: int, setup=None) -> dict:
+    """
+    steps(state) est un générateur qui exécute le travail complet (units
+    unités) et cède la main après chaque appel mesuré. setup() prépare un
+    état neuf avant chaque passe, hors mesure.
+    """
+    best = None
+    for _ in range(repeats):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        for _ in steps(state):
+            pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Allocations: pic transitoire de chaque appel, cumulé (libérées ou non)
+    state = setup() if setup else None
+    tracemalloc.start()
+    allocated = 0
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in steps(state):
+        current, peak = tracemalloc.get_traced_memory()
+        allocated += peak - base
+        tracemalloc.reset_peak()
+        base = current
+    tracemalloc.stop()
+    return {"time_us": best / units * 1e6, "alloc_bytes": allocated / units}
+
+
+def bench_vad(pcm: bytes, sample_rate: int, repeats: int) -> dict:
+    frames = _frames(pcm, sample_rate)
+    vad = VoiceActivityDetector(aggressiveness=3, sample_rate=sample_rate)
+
+    def steps(_):
+        for frame in frames:
+            yield vad.is_speech(frame)
+    return {"unit": "frame", "count": len(frames), **_measure(steps, len(frames), repeats)}
+
+
+def bench_utterance_buffer(pcm: bytes, sample_rate: int, repeats: int) -> dict:
+    frames = _frames(pcm, sample_rate)
+    vad = VoiceActivityDetector(aggressiveness=3, sample_rate=sample_rate)
+    decisions = [vad.is_speech(f) for f in frames]
+
+    def setup():
+        return UtteranceBuffer(min_silence_ms=600, padding_ms=200, chunk_ms=FRAME_MS, verbose=False,
+                               max_utterance_ms=10000)
+
+    def steps(buffer):
+        for frame, is_speech in zip(frames, decisions):
+            yield buffer.process_frame(frame, is_speech)
+    return {"unit": "frame", "count": len(frames), **_measure(steps, len(frames), repeats, setup)}
+
+
+def bench_resample(pcm: bytes, sample_rate: int, repeats: int, engine_class) -> dict:
+    # Même rééchantillonnage que les moteurs STT, sans charger de modèle
+    engine = SimpleNamespace(input_sample_rate=sample_rate, target_sample_rate=STT_SAMPLE_RATE)
+    audio_s = len(pcm) / 2 / sample_rate
+
+    def steps(_):
+        for _ in range(10):
+            yield engine_class._resample(engine, pcm)
+    return {"unit": "audio_s", "count": round(audio_s * 10, 3), **_measure(steps, audio_s * 10, repeats)}
+
+
+class _RecordedResponse:
+    """Réponse HTTP rejouée chunk par chunk (remplace requests.Response pour _stream_generator)."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def iter_content(self, chunk_size=None):
+        return iter(self.chunks)
+
+    def close(self):
+        pass
+
+
+def bench_stream_generator(repeats: int, sample_rate: int = 48000) -> dict:
+    chunks = split_chunks(make_fixture(seconds=10.0, sample_rate=sample_rate), 1400)
+    client = InworldTTSClient(InworldAuth(key="bench", secret="bench"), sample_rate=sample_rate)
+    audio_bytes = sum(len(c) for c in client._stream_generator(_RecordedResponse(chunks), time.monotonic()))
+    audio_s = audio_bytes / 2 / sample_rate
+
+    def steps(_):
+        yield from client._stream_generator(_RecordedResponse(chunks), time.monotonic())
+    return {"unit": "audio_s", "count": round(audio_s, 3), **_measure(steps, audio_s, repeats)}
+
+
+def bench_vosk(pcm: bytes, sample_rate: int, repeats: int, model_path: str) -> dict:
+    engine = VoskSTTEngine(model_path, input_sample_rate=sample_rate)
+    audio_s = len(pcm) / 2 / sample_rate
+
+    def steps(_):
+        yield engine.transcribe(pcm)
+    return {"unit": "audio_s", "count": round(audio_s, 3), **_measure(steps, audio_s, repeats)}
+
+
+def _load_fixture(path: str, sample_rate: int) -> bytes:
+    from core.wavfile import MappedWav
+
+    with MappedWav(path) as wav:
+        if wav.sample_rate != sample_rate:
+            raise ValueError(f"Fixture à {wav.sample_rate}Hz, --sample-rate {sample_rate} attendu")
+        return bytes(wav.mono_pcm())
+
+
+def run_suite(sample_rate: int = 48000, seconds: float = 60.0, repeats: int = 5, fixture_path: str = None,
+              vosk_model: str = None, only=None) -> dict:
+    """Exécute les benchmarks et retourne {"meta", "results"}."""
+    pcm = _load_fixture(fixture_path, sample_rate) if fixture_path else _session_pcm(seconds, sample_rate)
+    benches = {
+        "vad.is_speech": lambda: bench_vad(pcm, sample_rate, repeats),
+        "utterance_buffer.process_frame": lambda: bench_utterance_buffer(pcm, sample_rate, repeats),
+        "vosk._resample": lambda: bench_resample(pcm, sample_rate, repeats, VoskSTTEngine),
+        "whisper._resample": lambda: bench_resample(pcm, sample_rate, repeats, WhisperSTTEngine),
+        "inworld._stream_generator": lambda: bench_stream_generator(repeats),
+    }
+    if vosk_model:
+        # Inférence: une seule passe de plus (lente), sur 10s d'audio au plus
+        clip = pcm[:10 * sample_rate * 2]
+        benches["vosk.transcribe"] = lambda: bench_vosk(clip, sample_rate, min(repeats, 2), vosk_model)
+
+    results = {}
+    for name, bench in benches.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = bench()
+        r = results[name]
+        print(f"  {name:<32} {r['time_us']:>12.2f} µs/{r['unit']:<7} {r['alloc_bytes']:>12.0f} o/{r['unit']}")
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "sample_rate": sample_rate,
+        "audio_s": round(len(pcm) / 2 / sample_rate, 3),
+        "fixture": fixture_path,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.15):
+    """
+    Compare deux résultats run_suite. Retourne la liste des régressions
+    (nom, mesure, baseline, actuel, écart relatif).
+    """
+    regressions = []
+    print(f"{'Benchmark':<32} | {'Baseline':>12} | {'Actuel':>12} | {'Écart':>7} | Alloc base -> actuel")
+    print("-" * 96)
+    for name, r in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<32} | {'-':>12} | {r['time_us']:>10.2f}µs | {'nouveau':>7} |")
+            continue
+        delta = r["time_us"] / base["time_us"] - 1 if base["time_us"] else 0.0
+        flag = ""
+        if delta > threshold:
+            regressions.append((name, "time_us", base["time_us"], r["time_us"], delta))
+            flag = " <- RÉGRESSION"
+        alloc_delta = (r["alloc_bytes"] - base["alloc_bytes"]) / base["alloc_bytes"] if base["alloc_bytes"] else 0.0
+        if r["alloc_bytes"] > ALLOC_FLOOR_BYTES and (alloc_delta > threshold or not base["alloc_bytes"]):
+            regressions.append((name, "alloc_bytes", base["alloc_bytes"], r["alloc_bytes"], alloc_delta))
+            flag = flag or " <- ALLOCATIONS"
+        print(f"{name:<32} | {base['time_us']:>10.2f}µs | {r['time_us']:>10.2f}µs | {delta:>+7.1%} | "
+              f"{base['alloc_bytes']:.0f} -> {r['alloc_bytes']:.0f} o/{r['unit']}{flag}")
+    if baseline["meta"].get("machine") != current["meta"].get("machine") or \
+            baseline["meta"].get("python") != current["meta"].get("python"):
+        print(f"[WARN] Baseline mesurée sur une autre machine ou version de Python "
+              f"({baseline['meta'].get('machine')}, Python {baseline['meta'].get('python')})")
+    return regressions
+
+
+def bench_suite(output_path: str = None, baseline_path: str = None, threshold: float = 0.15, **options) -> int:
+    """Exécute la suite, écrit le JSON et compare à la baseline. Retourne le nombre de régressions."""
+    print(f"Micro-benchmarks ({options.get('sample_rate', 48000)}Hz, meilleur de {options.get('repeats', 5)} passes)")
+    current = run_suite(**options)
+    if output_path:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Résultats: {output_path}")
+    if not baseline_path:
+        return 0
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print()
+    regressions = compare(current, baseline, threshold)
+    print()
+    if regressions:
+        print(f"{len(regressions)} régression(s) au-delà de {threshold:.0%}")
+    else:
+        print(f"Aucune régression au-delà de {threshold:.0%}")
+    return len(regressions)
@@ -0,0 +1,124 @@
+"""
+Benchmark du transport audio Inworld: LINEAR16 vs formats compressés.
+
+Un faux serveur local (MockInworldServer) sert des fixtures pré-encodées du
+même clip dans chaque encodage, avec un débit limité pour simuler un lien
+contraint. Pour chaque encodage on mesure les octets reçus (JSON + base64
+inclus), le temps jusqu'au premier PCM décodé et le temps jusqu'au dernier octet.
+
+Fixtures attendues dans --fixtures DIR: clip.pcm (s16le mono 48kHz), clip.ogg,
+clip.mp3. Si absentes, elles sont générées depuis un signal synthétique via
+ffmpeg (et enregistrées dans DIR si fourni).
+"""
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+
+from client.inworld import InworldAuth, InworldTTSClient
+from client.mock_server import MockInworldServer
+
+FIXTURE_FILES = {"LINEAR16": "clip.pcm", "OGG_OPUS": "clip.ogg", "MP3": "clip.mp3"}
+FFMPEG_ENCODE_ARGS = {
+    "OGG_OPUS": ["-c:a", "libopus", "-b:a", "32k", "-f", "ogg"],
+    "MP3": ["-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3"],
+}
+
+
+def synth_speech_like(seconds: float, sample_rate: int = 48000) -> bytes:
+    """Signal harmonique modulé (voyelles/syllabes) + souffle léger, PCM 16-bit."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140 + 25 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 20))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, 1) ** 0.5
+    signal = 0.15 * voice * syllables + 0.003 * np.random.default_rng(0).standard_normal(len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def _ffmpeg_encode(pcm: bytes, encoding: str, sample_rate: int) -> bytes:
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg est requis pour générer les fixtures compressées")
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error",
+         "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+         *FFMPEG_ENCODE_ARGS[encoding], "pipe:1"],
+        input=pcm, stdout=subprocess.PIPE, check=True
+    )
+    return result.stdout
+
+
+def load_fixtures(encodings, fixtures_dir: str = None, seconds: float = 6.0, sample_rate: int = 48000) -> dict:
+    """Charge (ou génère) un clip par encodage."""
+    fixtures = {}
+    if fixtures_dir and os.path.isdir(fixtures_dir):
+        for encoding in encodings:
+            path = os.path.join(fixtures_dir, FIXTURE_FILES[encoding])
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    fixtures[encoding] = f.read()
+
+    missing = [e for e in encodings if e not in fixtures]
+    if missing:
+        pcm = fixtures.get("LINEAR16") or synth_speech_like(seconds, sample_rate)
+        for encoding in missing:
+            fixtures[encoding] = pcm if encoding == "LINEAR16" else _ffmpeg_encode(pcm, encoding, sample_rate)
+            if fixtures_dir:
+                os.makedirs(fixtures_dir, exist_ok=True)
+                with open(os.path.join(fixtures_dir, FIXTURE_FILES[encoding]), "wb") as f:
+                    f.write(fixtures[encoding])
+    return fixtures
+
+
+def bench_transport(encodings, runs: int = 5, bandwidth_kbps: float = 0, fixtures_dir: str = None,
+                    sample_rate: int = 48000):
+    """Mesure octets transférés et temps au dernier octet pour chaque encodage."""
+    fixtures = load_fixtures(encodings, fixtures_dir, sample_rate=sample_rate)
+    server = MockInworldServer(
+        fixtures=fixtures, bandwidth_bytes_per_s=bandwidth_kbps * 1000 / 8
+    ).start()
+    auth = InworldAuth(key="bench", secret="bench")
+
+    print(f"Mock server: {server.base_url} (débit: {f'{bandwidth_kbps:.0f} kbit/s' if bandwidth_kbps else 'illimité'})")
+    print(f"{'Encodage':<10} | {'Fixture':>9} | {'Reçu':>9} | {'Premier PCM':>11} | {'Dernier octet':>13} | {'Audio':>6} | {'CPU':>7}")
+    print("-" * 82)
+
+    results = []
+    try:
+        for encoding in encodings:
+            client = InworldTTSClient(auth, base_url=server.base_url, audio_encoding=encoding,
+                                      sample_rate=sample_rate)
+            first_pcm, last_byte, cpu, pcm_bytes = [], [], [], 0
+            for _ in range(runs):
+                cpu_start = time.process_time()
+                start = time.perf_counter()
+                first = None
+                pcm_bytes = 0
+                for pcm in client.synthesize("benchmark", "bench", stream=True):
+                    if first is None:
+                        first = time.perf_counter() - start
+                    pcm_bytes += len(pcm)
+                last_byte.append(time.perf_counter() - start)
+                first_pcm.append(first or 0.0)
+                cpu.append(time.process_time() - cpu_start)
+
+            result = {
+                "encoding": encoding,
+                "fixture_bytes": len(fixtures[encoding]),
+                "bytes_received": client.bytes_received / runs,
+                "first_pcm_s": float(np.median(first_pcm)),
+                "last_byte_s": float(np.median(last_byte)),
+                "audio_s": pcm_bytes / 2 / sample_rate,
+                "cpu_s": float(np.median(cpu)),
+            }
+            results.append(result)
+            print(f"{encoding:<10} | {result['fixture_bytes'] / 1024:>7.1f}KB | "
+                  f"{result['bytes_received'] / 1024:>7.1f}KB | {result['first_pcm_s'] * 1000:>9.0f}ms | "
+                  f"{result['last_byte_s'] * 1000:>11.0f}ms | {result['audio_s']:>5.2f}s | "
+                  f"{result['cpu_s'] * 1000:>5.0f}ms")
+    finally:
+        server.stop()
+    return results
@@ -0,0 +1,169 @@
+"""
+Calibration de Whisper sur CPU: threads, workers, type de calcul et beam.
+
+Les défauts (int8, threads choisis par CTranslate2, beam 5) sont rarement
+les meilleurs sur une machine sans GPU: trop de threads se disputent les
+cœurs avec la capture audio, et un beam de 5 coûte cher pour un gain de
+précision souvent nul sur des phrases courtes. Chaque combinaison est
+mesurée sur un clip fixture:
+
+    latence: médiane de plusieurs transcriptions du clip (une à la fois)
+    débit: secondes d'audio transcrites par seconde avec num_workers appels
+    simultanés (ce que permet la cascade ou un pic d'utterances)
+    WER: écart de transcription à la référence (float32, plus grand beam)
+
+La combinaison retenue est la plus rapide dont le WER reste sous max_wer.
+Elle est écrite dans un profil JSON, par modèle, que create_stt_engine
+charge automatiquement:
+
+    {"cpu_count": 8, "machine": "x86_64", "profiles": {"base": {
+     "cpu_threads": 4, "num_workers": 1, "compute_type": "int8", "beam_size": 1,
+     "latency_s": 0.41, "rtf": 0.09, "wer": 0.0, ...}}}
+"""
+import json
+import os
+import platform
+import statistics
+import threading
+import time
+
+from core.phrase_bank import normalize_text
+from processing.stt import WHISPER_PROFILE_PATH, WhisperSTTEngine, inference_cpus
+
+COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER (distance d'édition en mots / mots de la référence), casse et ponctuation ignorées."""
+    ref = normalize_text(reference).split()
+    hyp = normalize_text(hypothesis).split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, 1):
+        current = [i]
+        for j, other in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def default_thread_counts(available: int):
+    """1, 2, 4... jusqu'au nombre de CPUs disponibles (inclus)."""
+    counts = []
+    n = 1
+    while n < available:
+        counts.append(n)
+        n *= 2
+    counts.append(available)
+    return counts
+
+
+def _load_clip(path: str):
+    from core.wavfile import MappedWav
+
+    with MappedWav(path) as wav:
+        if wav.sample_rate % 16000:
+            raise ValueError(f"Fixture à {wav.sample_rate}Hz: 16000, 32000 ou 48000 attendu")
+        return bytes(wav.mono_pcm()), wav.sample_rate
+
+
+def _latency(engine, pcm: bytes, runs: int):
+    """(médiane des latences, dernière transcription), après une passe de chauffe."""
+    text = engine.transcribe(pcm)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = engine.transcribe(pcm)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), text
+
+
+def _throughput(engine, pcm: bytes, audio_s: float, workers: int) -> float:
+    """Secondes d'audio transcrites par seconde avec workers transcriptions simultanées."""
+    threads = [threading.Thread(target=engine.transcribe, args=(pcm,)) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return audio_s * workers / (time.perf_counter() - start)
+
+
+def calibrate_whisper(fixture_path: str, model_name: str = "base", language: str = "fr", threads=None,
+                      workers=(1, 2), compute_types=COMPUTE_TYPES, beam_sizes=(1, 5), runs: int = 3,
+                      max_wer: float = 0.1, reserve_cpus: int = 0, output_path: str = WHISPER_PROFILE_PATH) -> dict:
+    """
+    Mesure chaque combinaison et écrit la meilleure dans output_path.
+
+    Returns:
+        Le profil retenu (None si aucune combinaison ne respecte max_wer)
+    """
+    pcm, sample_rate = _load_clip(fixture_path)
+    audio_s = len(pcm) / 2 / sample_rate
+    cpu_affinity = inference_cpus(reserve_cpus)
+    available = len(cpu_affinity) if cpu_affinity else (os.cpu_count() or 1)
+    threads = [t for t in (threads or default_thread_counts(available)) if t <= available]
+
+    def load(cpu_threads, num_workers, compute_type):
+        return WhisperSTTEngine(model_name, language, sample_rate, cpu_threads=cpu_threads,
+                                num_workers=num_workers, compute_type=compute_type, cpu_affinity=cpu_affinity)
+
+    print(f"Calibration Whisper '{model_name}' sur {fixture_path} ({audio_s:.1f}s, {available} CPUs d'inférence)")
+    reference_engine = load(available, 1, "float32")
+    reference_engine.beam_size = max(beam_sizes)
+    reference = reference_engine.transcribe(pcm)
+    del reference_engine
+    print(f"Référence (float32, beam {max(beam_sizes)}): '{reference}'")
+    print()
+    print(f"{'Type':<13} | {'Threads':>7} | {'Workers':>7} | {'Beam':>4} | {'Latence':>8} | {'RTF':>5} | "
+          f"{'Débit':>8} | {'WER':>5}")
+    print("-" * 80)
+
+    results = []
+    for compute_type in compute_types:
+        for cpu_threads in threads:
+            for num_workers in workers:
+                engine = load(cpu_threads, num_workers, compute_type)
+                for beam_size in beam_sizes:
+                    engine.beam_size = beam_size
+                    latency, text = _latency(engine, pcm, runs)
+                    throughput = _throughput(engine, pcm, audio_s, num_workers) if num_workers > 1 \
+                        else audio_s / latency
+                    result = {"cpu_threads": cpu_threads, "num_workers": num_workers, "compute_type": compute_type,
+                              "beam_size": beam_size, "latency_s": round(latency, 4),
+                              "rtf": round(latency / audio_s, 4), "throughput": round(throughput, 2),
+                              "wer": round(word_error_rate(reference, text), 4)}
+                    results.append(result)
+                    print(f"{compute_type:<13} | {cpu_threads:>7} | {num_workers:>7} | {beam_size:>4} | "
+                          f"{latency * 1000:>6.0f}ms | {result['rtf']:>5.2f} | {throughput:>6.1f}x | "
+                          f"{result['wer']:>5.1%}")
+                del engine
+
+    # La plus basse latence sous le seuil de WER; à latence égale (5%), le meilleur débit
+    eligible = [r for r in results if r["wer"] <= max_wer]
+    if not eligible:
+        print(f"\nAucune combinaison sous {max_wer:.0%} de WER, profil non écrit")
+        return None
+    fastest = min(r["latency_s"] for r in eligible)
+    best = max((r for r in eligible if r["latency_s"] <= fastest * 1.05), key=lambda r: r["throughput"])
+    best = {**best, "reserve_cpus": reserve_cpus, "fixture": fixture_path,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    data = {}
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if data.get("cpu_count") != os.cpu_count():
+        data = {}  # Profils d'une autre machine: inutilisables ici
+    data.update({"cpu_count": os.cpu_count(), "machine": platform.machine(),
+                 "processor": platform.processor() or platform.machine()})
+    data.setdefault("profiles", {})[model_name] = best
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+    print()
+    print(f"Retenu: {best['compute_type']}, {best['cpu_threads']} threads, {best['num_workers']} worker(s), "
+          f"beam {best['beam_size']} ({best['latency_s'] * 1000:.0f}ms, WER {best['wer']:.1%})")
+    print(f"Profil écrit dans {output_path} (chargé automatiquement par --stt whisper)")
+    return best
@@ -0,0 +1,85 @@
+"""
+Évaluation du pré-filtre acoustique (SpeechPreFilter) sur des clips étiquetés.
+
+Arborescence attendue:
+    DIR/speech/*.wav   clips contenant de la parole (doivent passer au STT)
+    DIR/noise/*.wav    toux, clics, clavier... (doivent être rejetés)
+
+Les features sont calculées une seule fois par clip, puis chaque seuil est
+évalué sur le score déjà calculé.
+"""
+import os
+import time
+import wave
+
+from processing.prefilter import SpeechPreFilter
+
+LABELS = ("speech", "noise")
+
+
+def _load_clips(root: str):
+    """Retourne [(chemin, label, sample_rate, pcm_bytes)] pour les WAV mono 16-bit."""
+    clips = []
+    for label in LABELS:
+        folder = os.path.join(root, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if not name.lower().endswith(".wav"):
+                continue
+            path = os.path.join(folder, name)
+            with wave.open(path, "rb") as wf:
+                if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                    print(f"[EVAL] Ignoré (pas du PCM 16-bit mono): {path}")
+                    continue
+                clips.append((path, label, wf.getframerate(), wf.readframes(wf.getnframes())))
+    return clips
+
+
+def evaluate_prefilter(root: str, thresholds):
+    """Affiche précision/rappel et inférences évitées pour chaque seuil."""
+    clips = _load_clips(root)
+    if not clips:
+        print(f"Aucun clip trouvé dans {root}/speech ou {root}/noise")
+        return []
+
+    filters = {}
+    scored = []
+    start = time.perf_counter()
+    for path, label, rate, pcm in clips:
+        if rate not in filters:
+            filters[rate] = SpeechPreFilter(sample_rate=rate)
+        scored.append((path, label, filters[rate].score(pcm)))
+    elapsed = time.perf_counter() - start
+
+    n_speech = sum(1 for _, label, _ in scored if label == "speech")
+    n_noise = len(scored) - n_speech
+    print(f"{len(scored)} clips ({n_speech} speech, {n_noise} noise), "
+          f"features en {elapsed * 1000 / len(scored):.2f} ms/clip")
+    print()
+    print(f"{'Seuil':>6} | {'Rappel parole':>13} | {'Bruit rejeté':>12} | {'Précision':>9} | {'STT évités':>10}")
+    print("-" * 63)
+
+    results = []
+    for threshold in thresholds:
+        kept_speech = sum(1 for _, label, s in scored if label == "speech" and s >= threshold)
+        kept_noise = sum(1 for _, label, s in scored if label == "noise" and s >= threshold)
+        skipped = len(scored) - kept_speech - kept_noise
+        recall = kept_speech / n_speech if n_speech else 0.0
+        rejection = (n_noise - kept_noise) / n_noise if n_noise else 0.0
+        precision = kept_speech / (kept_speech + kept_noise) if kept_speech + kept_noise else 0.0
+        results.append({
+            "threshold": threshold, "speech_recall": recall, "noise_rejection": rejection,
+            "precision": precision, "skipped": skipped,
+        })
+        print(f"{threshold:>6.2f} | {recall:>12.1%} | {rejection:>11.1%} | {precision:>8.1%} | {skipped:>10}")
+
+    # Les erreurs les plus utiles pour régler le seuil
+    print()
+    for path, label, s in sorted(scored, key=lambda x: x[2]):
+        if label == "speech" and s < max(thresholds):
+            print(f"  parole à score bas  {s:.2f}  {path}")
+    for path, label, s in sorted(scored, key=lambda x: -x[2]):
+        if label == "noise" and s >= min(thresholds):
+            print(f"  bruit à score haut  {s:.2f}  {path}")
+    return results
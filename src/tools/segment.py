@@ -0,0 +1,125 @@
+"""
+Segmentation hors-ligne de longs enregistrements WAV en énoncés.
+
+Rejoue VoiceActivityDetector + UtteranceBuffer (mêmes réglages que test-vad)
+sur des fichiers au lieu du micro, bien plus vite que le temps réel:
+- le WAV est mappé en mémoire, les frames sont des vues sans copie
+- le VAD classe les frames par blocs, sans trace stdout par frame
+- les segments sont écrits par un thread dédié (SegmentWriter)
+- les fichiers sont répartis sur un pool de processus
+
+Sortie: OUT/<chemin relatif sans .wav>/utterance_NNNN.wav et OUT/segments.jsonl
+(fichier source, début/fin en secondes).
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.wavfile import MappedWav, SegmentWriter
+from processing.vad import UtteranceBuffer, VoiceActivityDetector
+from tools.batch_transcribe import find_wavs
+
+FRAME_MS = 20
+BLOCK_FRAMES = 500  # 10s d'audio classées par appel
+
+
+def segment_file(path: str, root: str, output_dir: str, aggressiveness: int = 3,
+                 min_silence_ms: int = 500, padding_ms: int = 300, max_utterance_ms: int = None) -> dict:
+    """Segmente un fichier (exécuté dans un worker). Retourne stats et segments."""
+    start = time.perf_counter()
+    target_dir = os.path.join(output_dir, os.path.splitext(os.path.relpath(path, root))[0])
+    os.makedirs(target_dir, exist_ok=True)
+
+    segments = []
+    with MappedWav(path) as wav:
+        rate = wav.sample_rate
+        vad = VoiceActivityDetector(aggressiveness=aggressiveness, sample_rate=rate)
+        buffer = UtteranceBuffer(min_silence_ms=min_silence_ms, padding_ms=padding_ms,
+                                 chunk_ms=FRAME_MS, verbose=False, max_utterance_ms=max_utterance_ms)
+        writer = SegmentWriter(sample_rate=rate)
+        frame_bytes = int(rate * FRAME_MS / 1000) * 2
+        pcm = memoryview(wav.mono_pcm())
+        n_frames = len(pcm) // frame_bytes
+        speech_frames = 0
+
+        def emit(audio, end_frame):
+            n = len(audio) // frame_bytes
+            out = os.path.join(target_dir, f"utterance_{len(segments):04d}.wav")
+            writer.write(out, audio)
+            segments.append({
+                "source": path, "file": out,
+                "start_s": round((end_frame - n) * FRAME_MS / 1000, 3),
+                "end_s": round(end_frame * FRAME_MS / 1000, 3),
+                "turn": audio.turn, "index": audio.index, "final": audio.final,
+            })
+
+        try:
+            for block in range(0, n_frames, BLOCK_FRAMES):
+                block_end = min(block + BLOCK_FRAMES, n_frames)
+                decisions = vad.classify(pcm[block * frame_bytes:block_end * frame_bytes], FRAME_MS)
+                speech_frames += sum(decisions)
+                for k, is_speech in enumerate(decisions, block):
+                    offset = k * frame_bytes
+                    audio = buffer.process_frame(pcm[offset:offset + frame_bytes], is_speech)
+                    if audio:
+                        # Segment découpé: la suite du tour est encore dans le buffer
+                        emit(audio, k + 1 - (0 if audio.final else len(buffer.active_frames)))
+            # Fin de fichier en pleine parole: on garde le dernier énoncé
+            audio = buffer.force_finalize()
+            if audio:
+                emit(audio, n_frames)
+        finally:
+            buffer.reset()  # Lâche les vues sur le mapping avant sa fermeture
+            pcm.release()
+            writer.close()
+
+        duration = wav.duration_s
+
+    return {
+        "path": path,
+        "duration_s": duration,
+        "speech_ratio": speech_frames / n_frames if n_frames else 0.0,
+        "segments": segments,
+        "write_errors": writer.errors,
+        "elapsed_s": time.perf_counter() - start,
+    }
+
+
+def segment_files(input_path: str, output_dir: str, workers: int = None, **params):
+    """Segmente un fichier ou tous les WAV d'un dossier sur un pool de processus."""
+    if os.path.isdir(input_path):
+        root, paths = input_path, find_wavs(input_path)
+    else:
+        root, paths = os.path.dirname(input_path), [input_path]
+    workers = min(workers or os.cpu_count() or 1, max(1, len(paths)))
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"{len(paths)} fichier(s) WAV, {workers} worker(s)")
+
+    audio_s = 0.0
+    n_segments = 0
+    start = time.perf_counter()
+    index_path = os.path.join(output_dir, "segments.jsonl")
+    with open(index_path, "w", encoding="utf-8") as index, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(segment_file, path, root, output_dir, **params): path for path in paths}
+        for i, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[{i}/{len(paths)}] ERREUR {path}: {e}")
+                continue
+            for segment in result["segments"]:
+                index.write(json.dumps(segment, ensure_ascii=False) + "\n")
+            audio_s += result["duration_s"]
+            n_segments += len(result["segments"])
+            speed = result["duration_s"] / result["elapsed_s"] if result["elapsed_s"] else 0.0
+            print(f"[{i}/{len(paths)}] {path}: {result['duration_s']:.0f}s, {len(result['segments'])} segments, "
+                  f"parole {result['speech_ratio']:.0%}, x{speed:.0f} temps réel")
+
+    wall = time.perf_counter() - start
+    print()
+    print(f"Terminé: {n_segments} segments, {audio_s / 60:.1f} min d'audio en {wall:.1f}s "
+          f"(x{audio_s / wall if wall else 0:.0f} temps réel)")
+    print(f"Index: {index_path}")
+    return {"files": len(paths), "segments": n_segments, "audio_s": audio_s, "wall_s": wall}
@@ -0,0 +1,183 @@
+"""
+Balayage hors-ligne des paramètres d'endpointing (VAD + UtteranceBuffer).
+
+Chaque enregistrement WAV est accompagné de ses étiquettes de parole au format
+Audacity (même nom, extension .txt, une ligne "début<TAB>fin[<TAB>texte]" en
+secondes par tour de parole). Les frames sont rejouées sur une horloge
+virtuelle (index de frame x 20ms): le résultat ne dépend pas de la vitesse de
+la machine, et une heure d'enregistrement se rejoue en quelques secondes.
+
+Pour chaque point de la grille:
+- délai d'endpoint: temps entre la fin réelle d'un tour et l'émission du
+  segment qui le contient (médiane et p95)
+- troncature: part des tours dont la parole n'est pas entièrement contenue
+  dans un seul segment (début coupé, fin de phrase prématurée, tour manqué)
+- faux déclenchements: part des segments émis qui ne recouvrent aucun tour
+
+Les points sont évalués en parallèle (un processus par point), les décisions
+VAD sont mises en cache par fichier et agressivité dans chaque worker.
+"""
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from core.wavfile import MappedWav
+from processing.vad import UtteranceBuffer, VoiceActivityDetector
+from tools.batch_transcribe import find_wavs
+
+FRAME_MS = 20
+TOLERANCE_S = 0.05  # Marge sur les bornes des étiquettes
+PARAMS = ("aggressiveness", "min_speech_ms", "min_silence_ms", "padding_ms")
+
+_decisions_cache = {}  # (path, aggressiveness) -> décisions VAD (cache par worker)
+
+
+def load_labels(path: str):
+    """Intervalles de parole [(début, fin)] d'un fichier d'étiquettes Audacity."""
+    turns = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.strip().split("\t")
+            if len(fields) >= 2 and not line.startswith("\\"):
+                turns.append((float(fields[0]), float(fields[1])))
+    return sorted(turns)
+
+
+def find_labelled(root: str):
+    """[(wav, étiquettes)] pour les WAV de root qui ont un .txt associé."""
+    pairs = []
+    for wav_path in find_wavs(root):
+        label_path = os.path.splitext(wav_path)[0] + ".txt"
+        if os.path.exists(label_path):
+            pairs.append((wav_path, load_labels(label_path)))
+        else:
+            print(f"[SWEEP] Pas d'étiquettes, ignoré: {wav_path}")
+    return pairs
+
+
+def _vad_decisions(path: str, pcm, sample_rate: int, aggressiveness: int):
+    key = (path, aggressiveness)
+    if key not in _decisions_cache:
+        vad = VoiceActivityDetector(aggressiveness=aggressiveness, sample_rate=sample_rate)
+        _decisions_cache[key] = vad.classify(pcm, FRAME_MS)
+    return _decisions_cache[key]
+
+
+def _replay(path: str, params: dict):
+    """Segments (début, émission) produits par UtteranceBuffer, en secondes virtuelles."""
+    with MappedWav(path) as wav:
+        pcm = memoryview(wav.mono_pcm())
+        decisions = _vad_decisions(path, pcm, wav.sample_rate, params["aggressiveness"])
+        buffer = UtteranceBuffer(min_speech_ms=params["min_speech_ms"], min_silence_ms=params["min_silence_ms"],
+                                 padding_ms=params["padding_ms"], chunk_ms=FRAME_MS, verbose=False)
+        frame_bytes = int(wav.sample_rate * FRAME_MS / 1000) * 2
+        frame_s = FRAME_MS / 1000
+        segments = []
+        try:
+            for k, is_speech in enumerate(decisions):
+                audio = buffer.process_frame(pcm[k * frame_bytes:(k + 1) * frame_bytes], is_speech)
+                if audio:
+                    end = k + 1
+                    segments.append(((end - len(audio) // frame_bytes) * frame_s, end * frame_s))
+            audio = buffer.force_finalize()
+            if audio:
+                end = len(decisions)
+                segments.append(((end - len(audio) // frame_bytes) * frame_s, end * frame_s))
+        finally:
+            buffer.reset()
+            pcm.release()
+    return segments
+
+
+def score(turns, segments):
+    """Délais d'endpoint, tours tronqués et faux déclenchements d'un fichier."""
+    delays = []
+    truncated = 0
+    for start, end in turns:
+        containing = [s for s in segments if s[0] <= start + TOLERANCE_S and s[1] >= end - TOLERANCE_S]
+        if not containing:
+            truncated += 1
+            continue
+        delays.append(containing[0][1] - end)
+    false_triggers = sum(1 for s_start, s_end in segments
+                         if not any(s_start < end and s_end > start for start, end in turns))
+    return delays, truncated, false_triggers
+
+
+def evaluate_point(recordings, params: dict) -> dict:
+    """Évalue un point de la grille sur tous les enregistrements (exécuté dans un worker)."""
+    delays, truncated, false_triggers, n_turns, n_segments = [], 0, 0, 0, 0
+    for path, turns in recordings:
+        segments = _replay(path, params)
+        d, t, f = score(turns, segments)
+        delays += d
+        truncated += t
+        false_triggers += f
+        n_turns += len(turns)
+        n_segments += len(segments)
+    return {
+        **params,
+        "delay_p50_s": float(np.median(delays)) if delays else float("inf"),
+        "delay_p95_s": float(np.percentile(delays, 95)) if delays else float("inf"),
+        "truncation_rate": truncated / n_turns if n_turns else 0.0,
+        "false_trigger_rate": false_triggers / n_segments if n_segments else 0.0,
+        "segments": n_segments,
+    }
+
+
+def pareto_front(results):
+    """Points non dominés sur (délai p50, troncature, faux déclenchements), tous à minimiser."""
+    keys = ("delay_p50_s", "truncation_rate", "false_trigger_rate")
+    front = []
+    for r in results:
+        dominated = any(
+            all(o[k] <= r[k] for k in keys) and any(o[k] < r[k] for k in keys)
+            for o in results
+        )
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: r["delay_p50_s"])
+
+
+def sweep_endpointing(root: str, grid: dict, workers: int = None, output_path: str = None):
+    """Évalue toutes les combinaisons de grid et affiche le front de Pareto."""
+    recordings = find_labelled(root)
+    if not recordings:
+        print(f"Aucun WAV étiqueté (fichier .txt Audacity à côté du .wav) dans {root}")
+        return []
+    n_turns = sum(len(turns) for _, turns in recordings)
+    points = [dict(zip(PARAMS, values)) for values in itertools.product(*(grid[p] for p in PARAMS))]
+    workers = min(workers or os.cpu_count() or 1, len(points))
+    print(f"{len(recordings)} enregistrements, {n_turns} tours étiquetés, "
+          f"{len(points)} combinaisons sur {workers} worker(s)")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate_point, recordings, params) for params in points]
+        for i, future in enumerate(as_completed(futures), 1):
+            results.append(future.result())
+            if i % max(1, len(points) // 10) == 0 or i == len(points):
+                print(f"  {i}/{len(points)} points ({time.perf_counter() - start:.1f}s)")
+
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+        print(f"Résultats complets: {output_path}")
+
+    front = pareto_front(results)
+    print()
+    print(f"Front de Pareto ({len(front)} points sur {len(results)}):")
+    print(f"{'Aggr':>4} | {'Parole':>6} | {'Silence':>7} | {'Padding':>7} | {'Délai p50':>9} | "
+          f"{'Délai p95':>9} | {'Tronqués':>8} | {'Faux décl.':>10}")
+    print("-" * 84)
+    for r in front:
+        print(f"{r['aggressiveness']:>4} | {r['min_speech_ms']:>4}ms | {r['min_silence_ms']:>5}ms | "
+              f"{r['padding_ms']:>5}ms | {r['delay_p50_s'] * 1000:>7.0f}ms | {r['delay_p95_s'] * 1000:>7.0f}ms | "
+              f"{r['truncation_rate']:>8.1%} | {r['false_trigger_rate']:>10.1%}")
+    return front
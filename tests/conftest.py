@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# Les modules du projet s'importent depuis src/ (comme avec python src/main.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from client.mock_server import FaultConfig, MockInworldServer, MockTokenServer  # noqa: E402
+
+
+@pytest.fixture
+def token_server():
+    server = MockTokenServer(ttl_s=300.0).start()
+    yield server
+    server.stop()
+
+
+
+@pytest.fixture
+def inworld_server():
+    """Faux serveur Inworld; les fautes se règlent via server.faults avant la requête."""
+    server = MockInworldServer(faults=FaultConfig(seed=0)).start()
+    yield server
+    server.stop()
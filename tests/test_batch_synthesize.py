@@ -0,0 +1,73 @@
+import json
+import os
+import time
+import wave
+
+from client.inworld import InworldAuth, request_key
+from client.mock_server import synth_pcm
+from tools.batch_synthesize import synthesize_batch
+
+MODEL_ID = os.getenv("INWORLD_MODEL_ID", "inworld-tts-1.5-mini")
+
+ROWS = [
+    {"text": "Bonjour à tous", "voice_id": "alice"},
+    {"text": "Attention, départ imminent", "voice_id": "alice"},
+    {"text": "Bonjour à tous", "voice_id": "alice"},  # Doublon
+    {"text": "Bonjour à tous", "voice_id": "bob"},  # Même texte, autre voix: requête distincte
+    {"text": "Fin de la diffusion", "voice_id": "bob"},
+    {"text": "Attention, départ imminent", "voice_id": "alice"},  # Doublon
+]
+
+
+def read_manifest(output_dir):
+    with open(os.path.join(output_dir, "manifest.jsonl"), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def run_batch(server, output_dir, **kwargs):
+    return synthesize_batch(ROWS, str(output_dir), InworldAuth(key="key", secret="secret"),
+                            base_url=server.base_url, sample_rate=16000, **kwargs)
+
+
+def test_batch_dedup_retries_and_outputs(inworld_server, tmp_path):
+    inworld_server.faults.fail_first = 2
+    stats = run_batch(inworld_server, tmp_path, concurrency=2, rate_per_s=50.0, burst=4)
+
+    assert stats["unique"] == 4
+    assert stats["duplicates"] == 2
+    assert stats["synthesized"] == 4
+    assert stats["errors"] == 0
+    # Une requête par texte unique, plus une par 503 injecté
+    assert stats["retries"] == 2
+    assert stats["requests"] == inworld_server.requests_received == 6
+
+    manifest = read_manifest(tmp_path)
+    assert [e["line"] for e in manifest] == [1, 2, 3, 4, 5, 6]
+    assert [e["status"] for e in manifest] == ["ok", "ok", "duplicate", "ok", "ok", "duplicate"]
+    assert manifest[0]["file"] == manifest[2]["file"] != manifest[3]["file"]
+    assert manifest[1]["file"] == manifest[5]["file"]
+
+    for entry, row in zip(manifest, ROWS):
+        key = request_key(row["text"], row["voice_id"], MODEL_ID, 16000)
+        assert entry["file"] == f"{key}.wav"
+        with wave.open(os.path.join(tmp_path, entry["file"]), "rb") as wf:
+            assert (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (1, 2, 16000)
+            assert wf.readframes(wf.getnframes()) == synth_pcm(row["text"], 16000)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    # Relance: tout est en cache, aucune requête envoyée
+    stats = run_batch(inworld_server, tmp_path)
+    assert (stats["cached"], stats["synthesized"], stats["requests"]) == (4, 0, 0)
+    assert inworld_server.requests_received == 6
+    assert [e["status"] for e in read_manifest(tmp_path)] == ["cached"] * 2 + ["duplicate", "cached", "cached",
+                                                                                "duplicate"]
+
+
+def test_batch_respects_rate_limit(inworld_server, tmp_path):
+    # 4 requêtes, rafale de 1 à 8 req/s: au moins 3 intervalles de 125ms malgré 4 workers
+    started = time.monotonic()
+    stats = run_batch(inworld_server, tmp_path, concurrency=4, rate_per_s=8.0, burst=1)
+    elapsed = time.monotonic() - started
+    assert stats["synthesized"] == 4
+    assert elapsed >= 3 / 8.0 * 0.9
+    assert stats["requests"] == 4
@@ -0,0 +1,57 @@
+import pytest
+
+import client.inworld as inworld
+from client.codecs import PCMDecoder, StreamDecoder, create_decoder
+from client.inworld import InworldAuth, InworldTTSClient
+from client.resilience import RetryPolicy
+
+
+class FailingDecoder(StreamDecoder):
+    """Décodeur qui échoue au premier morceau et note s'il a été fermé."""
+
+    instances = []
+
+    def __init__(self):
+        self.closed = False
+        FailingDecoder.instances.append(self)
+
+    def feed(self, chunk):
+        raise RuntimeError("flux corrompu")
+
+    def flush(self):
+        return b""
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_decoder_is_abstract():
+    with pytest.raises(TypeError):
+        StreamDecoder()
+
+    class Incomplete(StreamDecoder):
+        def feed(self, chunk):
+            return chunk
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_pcm_decoder_passthrough():
+    decoder = create_decoder("LINEAR16")
+    assert isinstance(decoder, PCMDecoder)
+    assert decoder.feed(b"\x01\x02") + decoder.flush() == b"\x01\x02"
+    with pytest.raises(ValueError):
+        create_decoder("FLAC")
+
+
+def test_fetch_closes_decoder_on_failure(inworld_server, monkeypatch):
+    FailingDecoder.instances.clear()
+    monkeypatch.setattr(inworld, "create_decoder", lambda encoding, sample_rate: FailingDecoder())
+    client = InworldTTSClient(InworldAuth(key="key", secret="secret"), base_url=inworld_server.base_url,
+                              retry=RetryPolicy(max_attempts=2, base_delay_s=0.01, max_delay_s=0.01),
+                              audio_encoding="OGG_OPUS")
+    with pytest.raises(RuntimeError):
+        client.synthesize("bonjour", "voice", stream=False)
+    assert FailingDecoder.instances
+    assert all(decoder.closed for decoder in FailingDecoder.instances)
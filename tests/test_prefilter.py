@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from processing.prefilter import SpeechPreFilter
+
+RATE = 48000
+
+
+def to_pcm(signal) -> bytes:
+    return (np.clip(signal, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+def syllables(seconds: float = 1.0, rate: int = RATE):
+    """Enveloppe à 4 syllabes/s et base de temps."""
+    t = np.arange(int(seconds * rate)) / rate
+    return np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5, t
+
+
+def voiced_speech(rate: int = RATE, seed: int = 0):
+    """Voix synthétique: fondamentale ~140Hz et harmoniques, modulée en syllabes."""
+    envelope, t = syllables(rate=rate)
+    f0 = 140 * (1 + 0.05 * np.sin(2 * np.pi * 1.5 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12)) * 0.2
+    return voice * envelope + np.random.default_rng(seed).normal(0, 0.001, len(t))
+
+
+@pytest.mark.parametrize("rate", [16000, 32000, 44100, 48000])
+def test_speech_passes(rate):
+    prefilter = SpeechPreFilter(sample_rate=rate, threshold=0.5)
+    assert prefilter.score(to_pcm(voiced_speech(rate))) > 0.8
+    assert prefilter.is_speech(to_pcm(voiced_speech(rate)))
+    assert (prefilter.accepted, prefilter.rejected) == (1, 0)
+
+
+def test_white_noise_is_rejected():
+    noise = np.random.default_rng(1).normal(0, 0.3, RATE)
+    prefilter = SpeechPreFilter(threshold=0.5)
+    assert prefilter.score(to_pcm(noise)) < 0.3
+    assert not prefilter.is_speech(to_pcm(noise))
+    assert prefilter.rejected == 1
+
+
+def test_click_is_rejected():
+    rng = np.random.default_rng(2)
+    click = rng.normal(0, 0.001, RATE // 2)
+    click[1000:1100] += rng.normal(0, 0.8, 100)
+    features = SpeechPreFilter().features(to_pcm(click))
+    assert features["peak_energy_share"] > 0.9
+    assert SpeechPreFilter.score_features(features) < 0.1
+
+
+def test_high_frequency_tone_does_not_alias_into_speech_band():
+    # 15.5kHz modulé comme de la parole: décimé sans passe-bas, il se replierait à 500Hz
+    # et passerait pour une voix (énergie, ZCR faible, spectre harmonique)
+    envelope, t = syllables()
+    tone = np.sin(2 * np.pi * 15500 * t) * 0.3 * envelope + np.random.default_rng(3).normal(0, 0.001, len(t))
+    features = SpeechPreFilter().features(to_pcm(tone))
+    assert features["voiced_ms"] == 0.0
+    assert SpeechPreFilter.score_features(features) < 0.3
+
+
+def test_disabled_by_default():
+    prefilter = SpeechPreFilter()
+    assert prefilter.threshold == 0.0
+    assert prefilter.is_speech(bytes(RATE))
+
+
+def test_short_input():
+    features = SpeechPreFilter().features(bytes(100))
+    assert features["voiced_ms"] == 0.0
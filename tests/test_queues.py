@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from controller.queues import OverloadPolicy, PolicyQueue, merge_audio_chunks, merge_utterances
+from processing.vad import UtteranceSegment
+
+
+def drain(q):
+    items = []
+    while True:
+        try:
+            items.append(q.get(timeout=0))
+        except queue.Empty:
+            return items
+
+
+def test_drop_newest():
+    q = PolicyQueue("q", maxsize=2, policy=OverloadPolicy.DROP_NEWEST)
+    assert q.put(1) and q.put(2)
+    assert not q.put(3)
+    assert drain(q) == [1, 2]
+    assert (q.dropped_newest, q.dropped_oldest) == (1, 0)
+
+
+def test_drop_oldest():
+    q = PolicyQueue("q", maxsize=2, policy=OverloadPolicy.DROP_OLDEST)
+    for item in (1, 2, 3, 4):
+        assert q.put(item)
+    assert drain(q) == [3, 4]
+    assert q.dropped_oldest == 2
+    assert q.stats()["max_depth"] == 2
+
+
+def test_merge():
+    q = PolicyQueue("q", maxsize=2, policy=OverloadPolicy.MERGE, merge_fn=lambda a, b: a + b)
+    for item in ("a", "b", "c", "d"):
+        assert q.put(item)
+    assert drain(q) == ["a", "bcd"]
+    assert q.merged == 2
+
+
+def test_merge_falls_back_to_drop_oldest():
+    q = PolicyQueue("q", maxsize=2, policy=OverloadPolicy.MERGE, merge_fn=lambda a, b: None)
+    for item in ("a", "b", "c"):
+        assert q.put(item)
+    assert drain(q) == ["b", "c"]
+    assert (q.merged, q.dropped_oldest) == (0, 1)
+
+
+def test_shed_stale():
+    q = PolicyQueue("q", maxsize=4, policy=OverloadPolicy.SHED_STALE, max_age_s=0.05)
+    q.put("old")
+    time.sleep(0.1)
+    q.put("fresh")
+    item, enqueued_at = q.get_entry(timeout=0)
+    assert item == "fresh"
+    assert not q.is_stale(enqueued_at)
+    assert q.shed == 1
+    q.record_shed()
+    assert q.stats()["shed"] == 2
+
+
+def test_block_waits_for_room_and_close_releases():
+    q = PolicyQueue("q", maxsize=1, policy=OverloadPolicy.BLOCK)
+    q.put(1)
+    results = []
+    producer = threading.Thread(target=lambda: results.append(q.put(2)))
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive()  # Queue pleine: le producteur attend
+    assert q.get(timeout=1) == 1
+    producer.join(timeout=1)
+    assert results == [True] and q.get(timeout=0) == 2
+
+    q.put(3)
+    producer = threading.Thread(target=lambda: results.append(q.put(4)))
+    producer.start()
+    time.sleep(0.05)
+    q.close()
+    producer.join(timeout=1)
+    assert results == [True, False]
+    assert q.dropped_newest == 1
+
+
+def test_policy_arguments_are_validated():
+    with pytest.raises(ValueError):
+        PolicyQueue("q", maxsize=0)
+    with pytest.raises(ValueError):
+        PolicyQueue("q", maxsize=1, policy=OverloadPolicy.MERGE)
+    with pytest.raises(ValueError):
+        PolicyQueue("q", maxsize=1, policy=OverloadPolicy.SHED_STALE)
+
+
+def test_markers_do_not_count_and_qsize_matches_maxsize():
+    q = PolicyQueue("tts", maxsize=2, policy=OverloadPolicy.DROP_NEWEST, units=True)
+    assert q.put(b"a") and q.put(None) and q.put(b"b") and q.put(None)
+    assert q.qsize() == 2 == q.stats()["depth"]
+    assert not q.put(b"c")
+    assert q.put(None)  # Un marqueur n'est jamais refusé
+    assert drain(q) == [b"a", None, b"b", None, None]
+    assert q.qsize() == 0 and q.empty()
+
+
+def test_units_evict_whole_oldest_unit():
+    q = PolicyQueue("tts", maxsize=3, policy=OverloadPolicy.DROP_OLDEST, units=True)
+    for item in (b"a1", b"a2", None, b"b1", None):
+        q.put(item)
+    assert q.put(b"c1")  # Jette toute l'unité a (2 chunks et son marqueur)
+    assert drain(q) == [b"b1", None, b"c1"]
+    assert q.dropped_oldest == 2
+
+
+def test_units_never_evict_the_unit_being_played():
+    q = PolicyQueue("tts", maxsize=3, policy=OverloadPolicy.DROP_OLDEST, units=True)
+    for item in (b"a1", b"a2", None, b"b1", None):
+        q.put(item)
+    assert q.get(timeout=0) == b"a1"  # Lecture de l'unité a commencée
+    assert q.put(b"c1")
+    assert q.put(b"c2")  # Queue pleine: l'unité b est jetée, pas la fin de a
+    assert drain(q) == [b"a2", None, b"c1", b"c2"]
+
+
+def test_units_refuse_when_only_the_unit_in_production_remains():
+    q = PolicyQueue("tts", maxsize=2, policy=OverloadPolicy.DROP_OLDEST, units=True)
+    q.put(b"a1")
+    q.put(b"a2")
+    assert not q.put(b"a3")
+    assert q.dropped_newest == 1
+    q.put(None)
+    assert drain(q) == [b"a1", b"a2", None]
+
+
+def test_units_merge_never_touches_markers():
+    q = PolicyQueue("tts", maxsize=2, policy=OverloadPolicy.MERGE, merge_fn=merge_audio_chunks, units=True)
+    for item in (b"a", None, b"b", b"c"):
+        q.put(item)
+    assert drain(q) == [b"a", None, b"bc"]
+
+
+def test_merge_utterances_keeps_segment_attributes():
+    older = UtteranceSegment.create(b"\x01\x00", turn=3, index=0, final=False)
+    newer = UtteranceSegment.create(b"\x02\x00", turn=3, index=1, final=True)
+    merged = merge_utterances(older, newer)
+    assert isinstance(merged, UtteranceSegment)
+    assert merged == b"\x01\x00\x02\x00"
+    assert (merged.turn, merged.index, merged.final) == (3, 1, True)
+    assert merge_utterances(b"ab", b"cd") == b"abcd"
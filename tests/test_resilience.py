@@ -0,0 +1,168 @@
+import random
+import time
+
+import pytest
+
+import client.inworld as inworld
+from client.inworld import InworldAuth, InworldTTSClient
+from client.mock_server import FaultConfig, MockInworldServer
+from client.resilience import (CircuitBreaker, CircuitOpenError, Deadlines, InworldAPIError, InworldTimeoutError,
+                               RetryPolicy)
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault("retry", RetryPolicy(max_attempts=1))
+    return InworldTTSClient(InworldAuth(key="key", secret="secret"), base_url=server.base_url, **kwargs)
+
+
+def test_first_byte_deadline(inworld_server):
+    inworld_server.faults.header_delay_s = 1.0
+    client = make_client(inworld_server, deadlines=Deadlines(first_byte_s=0.3, total_s=5.0))
+    started = time.monotonic()
+    with pytest.raises(InworldTimeoutError) as error:
+        client.synthesize("bonjour", "voice")
+    assert error.value.phase == "first_byte"
+    assert time.monotonic() - started < 0.9
+    assert client.http_errors == {"timeout": 1}
+
+
+def test_total_deadline(inworld_server):
+    # Corps envoyé par morceaux de 4 Ko espacés de 0.2s: chaque chunk arrive avant
+    # la deadline de premier octet, mais la réponse complète dépasse la deadline totale
+    inworld_server.faults.slow_body_rate = 1.0
+    inworld_server.faults.slow_body_chunk_delay_s = 0.2
+    client = make_client(inworld_server, deadlines=Deadlines(first_byte_s=2.0, total_s=0.5))
+    started = time.monotonic()
+    with pytest.raises(InworldTimeoutError) as error:
+        client.synthesize("une phrase assez longue pour plusieurs morceaux", "voice")
+    assert error.value.phase == "total"
+    assert time.monotonic() - started < 1.5
+
+
+def test_retries_until_success(inworld_server):
+    inworld_server.faults.fail_first = 2
+    client = make_client(inworld_server, retry=RetryPolicy(max_attempts=3, base_delay_s=0.01, max_delay_s=0.05))
+    assert len(client.synthesize("bonjour", "voice")) > 0
+    assert client.retries == 2
+    assert inworld_server.requests_received == 3
+    assert client.http_errors == {"503": 2}
+
+
+def test_retries_exhausted(inworld_server):
+    inworld_server.faults.fail_first = 10
+    client = make_client(inworld_server, retry=RetryPolicy(max_attempts=3, base_delay_s=0.01, max_delay_s=0.05))
+    with pytest.raises(InworldAPIError) as error:
+        client.synthesize("bonjour", "voice")
+    assert error.value.status_code == 503
+    assert inworld_server.requests_received == 3
+    assert client.retries == 2
+
+
+def test_non_retryable_error_is_not_retried(inworld_server):
+    inworld_server.faults.fail_first = 10
+    inworld_server.faults.error_status = 400
+    client = make_client(inworld_server, retry=RetryPolicy(max_attempts=3, base_delay_s=0.01))
+    with pytest.raises(InworldAPIError) as error:
+        client.synthesize("bonjour", "voice")
+    assert error.value.status_code == 400
+    assert inworld_server.requests_received == 1
+
+
+def test_retry_jitter_bounds():
+    policy = RetryPolicy(base_delay_s=0.2, max_delay_s=1.0)
+    random.seed(0)
+    for attempt in range(6):
+        cap = min(1.0, 0.2 * 2 ** attempt)
+        delays = [policy.delay(attempt) for _ in range(500)]
+        assert all(0.0 <= d <= cap for d in delays)
+        # Full jitter: les délais couvrent tout l'intervalle, pas seulement sa borne haute
+        assert min(delays) < cap * 0.1 and max(delays) > cap * 0.9
+
+
+def test_retry_sleeps_follow_policy(inworld_server, monkeypatch):
+    slept = []
+
+    class RecordingTime:
+        monotonic = staticmethod(time.monotonic)
+
+        @staticmethod
+        def sleep(seconds):
+            slept.append(seconds)
+
+    monkeypatch.setattr(inworld, "time", RecordingTime)
+    inworld_server.faults.fail_first = 3
+    client = make_client(inworld_server, retry=RetryPolicy(max_attempts=4, base_delay_s=0.1, max_delay_s=0.15))
+    client.synthesize("bonjour", "voice")
+    assert len(slept) == 3
+    assert 0.0 <= slept[0] <= 0.1
+    assert all(0.0 <= s <= 0.15 for s in slept[1:])
+
+
+def test_circuit_breaker_open_and_half_open(inworld_server):
+    inworld_server.faults.fail_first = 1000
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=0.3)
+    client = make_client(inworld_server, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(InworldAPIError):
+            client.synthesize("bonjour", "voice")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Circuit ouvert: échec immédiat, aucune requête envoyée
+    with pytest.raises(CircuitOpenError):
+        client.synthesize("bonjour", "voice")
+    assert inworld_server.requests_received == 2
+    assert breaker.rejected == 1
+
+    # Après reset_timeout_s: une requête d'essai; son échec rouvre le circuit
+    time.sleep(0.35)
+    with pytest.raises(InworldAPIError):
+        client.synthesize("bonjour", "voice")
+    assert inworld_server.requests_received == 3
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Essai réussi: circuit refermé
+    inworld_server.faults.fail_first = 0
+    time.sleep(0.35)
+    assert len(client.synthesize("bonjour", "voice")) > 0
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # Essai déjà en cours
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def _seed_hanging_first_request_only(hang_rate: float) -> int:
+    """Seed dont le premier tirage déclenche hang_rate et le second non."""
+    for seed in range(1000):
+        draws = random.Random(seed)
+        if draws.random() < hang_rate <= draws.random():
+            return seed
+    raise AssertionError("aucune seed ne convient")
+
+
+def test_hedged_request_returns_faster_response():
+    faults = FaultConfig(hang_rate=0.5, hang_s=2.0, seed=_seed_hanging_first_request_only(0.5))
+    server = MockInworldServer(faults=faults).start()
+    try:
+        client = make_client(server, hedge=True, deadlines=Deadlines(first_byte_s=5.0, total_s=5.0))
+        client.first_byte_latency.default_s = 0.2  # Hedge après 200ms sans premier octet
+        started = time.monotonic()
+        audio = client.synthesize("bonjour", "voice")
+        elapsed = time.monotonic() - started
+        assert len(audio) > 0
+        assert client.hedged == 1
+        assert client.hedge_wins == 1
+        assert elapsed < 1.5  # La requête principale pend 2s
+        assert server.requests_received == 2
+    finally:
+        server.stop()
@@ -0,0 +1,88 @@
+import base64
+import binascii
+import json
+import os
+import random
+
+import pytest
+
+from client.stream_parser import AudioContentParser, Base64Decoder
+from tools.bench_stream_parser import make_fixture, split_chunks
+
+
+def test_decoder_matches_base64():
+    decoder = Base64Decoder(initial_size=16)
+    for n in range(64):
+        raw = os.urandom(n)
+        size = decoder.decode(base64.b64encode(raw))
+        assert bytes(decoder.output[:size]) == raw
+
+
+@pytest.mark.parametrize("encoded", [b"AA-AAAAAAAAA", b"AAAA AAAAAAA", b"AAA\x00AAAAAAAA", b"AAAAAA=AAAAA"])
+def test_decoder_rejects_invalid_characters(encoded):
+    with pytest.raises(binascii.Error):
+        Base64Decoder().decode(encoded)
+
+
+def test_parser_skips_invalid_record():
+    good = base64.b64encode(b"\x01\x02\x03\x04\x05\x06").decode()
+    stream = f'{{"audioContent": "AAAA*AAAAAAA"}}\n{{"result": {{"audioContent": "{good}"}}}}\n'.encode()
+    parser = AudioContentParser()
+    chunks = [bytes(view) for view in parser.feed(stream)]
+    assert chunks == [b"\x01\x02\x03\x04\x05\x06"]
+    assert (parser.records, parser.skipped) == (1, 1)
+
+
+def stream_fixture():
+    """Records JSON ligne par ligne: imbrication, champs voisins, échappements, tous les paddings."""
+    rng = random.Random(0)
+    audio = [bytes(rng.randrange(256) for _ in range(n)) for n in (0, 1, 2, 3, 47, 48, 49, 300)]
+    lines = []
+    for i, raw in enumerate(audio):
+        value = base64.b64encode(raw).decode()
+        if i % 3 == 1:
+            value = value.replace("/", "\\/")  # Échappement JSON autorisé
+        if i % 2:
+            lines.append(json.dumps({"result": {"timestamp": i, "audioContent": "PLACEHOLDER"}}))
+        else:
+            lines.append(json.dumps({"audioContent": "PLACEHOLDER", "seq": i}))
+        lines[-1] = lines[-1].replace("PLACEHOLDER", value)
+    return ("\n".join(lines) + "\n").encode(), audio
+
+
+def parse_chunks(chunks):
+    parser = AudioContentParser()
+    out = []
+    for chunk in chunks:
+        out.extend(bytes(view) for view in parser.feed(chunk))  # Copie: vue valide jusqu'au suivant
+    parser.finish()
+    return out, parser
+
+
+def test_parser_split_at_every_offset():
+    body, audio = stream_fixture()
+    for cut in range(len(body) + 1):
+        out, parser = parse_chunks([body[:cut], body[cut:]])
+        assert out == audio, f"coupure à l'octet {cut}"
+        assert parser.skipped == 0
+
+
+def test_parser_byte_by_byte():
+    body, audio = stream_fixture()
+    out, _ = parse_chunks([body[i:i + 1] for i in range(len(body))])
+    assert out == audio
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_parser_random_chunks_on_mock_stream(seed):
+    body = make_fixture(seconds=1.0, sample_rate=16000, chunk_ms=40)
+    expected = b"".join(base64.b64decode(json.loads(line)["audioContent"]) for line in body.splitlines())
+    out, parser = parse_chunks(split_chunks(body, mean_size=random.Random(seed).choice([7, 64, 1400]), seed=seed))
+    assert b"".join(out) == expected
+    assert parser.records == len(body.splitlines()) and parser.skipped == 0
+
+
+def test_parser_counts_truncated_record():
+    body, _ = stream_fixture()
+    _, parser = parse_chunks([body[:-5]])
+    assert parser.skipped == 1
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from client.inworld import InworldAuth, InworldTTSClient
+from client.mock_server import MockInworldServer
+from client.resilience import InworldAPIError, RetryPolicy
+from client.token_auth import InworldTokenAuth, TokenError
+
+
+def make_auth(token_server, **kwargs):
+    return InworldTokenAuth(token_server.token_url, key="key", secret="secret", **kwargs)
+
+
+def test_token_refreshed_before_expiry(token_server):
+    token_server.ttl_s = 2.0
+    auth = make_auth(token_server, refresh_margin_s=1.0).start()
+    try:
+        deadline = time.monotonic() + 2.6
+        while time.monotonic() < deadline:
+            assert token_server.verify(auth.get_auth_header()["Authorization"])
+            time.sleep(0.1)
+        # Un token de 2s renouvelé 1s avant expiration: jamais d'attente côté requêtes
+        assert auth.refreshes >= 3
+        assert auth.failures == 0
+        assert auth.waits == 0
+        assert auth.seconds_left() > 0
+    finally:
+        auth.stop()
+
+
+def test_backoff_after_endpoint_failures(token_server):
+    # start() puis le thread de refresh échouent aussitôt, puis backoff de 1s et 2s
+    token_server.fail_next = 3
+    auth = make_auth(token_server)
+    started = time.monotonic()
+    auth.start()
+    try:
+        header = auth.get_auth_header(timeout_s=10.0)
+        elapsed = time.monotonic() - started
+        assert token_server.verify(header["Authorization"])
+        assert auth.failures == 3
+        assert auth.refreshes == 1
+        assert 2.5 <= elapsed < 5.0
+        assert token_server.requests_received == 4
+        assert auth.last_error is None
+    finally:
+        auth.stop()
+
+
+def test_wait_counters(token_server):
+    auth = make_auth(token_server)
+    try:
+        # Premier appel avant start(): une attente comptée, puis plus aucune
+        auth.get_auth_header()
+        assert auth.waits == 1
+        first_wait_s = auth.wait_s
+        assert first_wait_s > 0
+        for _ in range(10):
+            auth.get_auth_header()
+        assert auth.waits == 1
+        assert auth.wait_s == first_wait_s
+    finally:
+        auth.stop()
+
+
+def test_wait_timeout_raises_token_error(token_server):
+    token_server.fail_next = 1000
+    auth = make_auth(token_server)
+    try:
+        started = time.monotonic()
+        with pytest.raises(TokenError):
+            auth.get_auth_header(timeout_s=0.5)
+        assert auth.waits == 1
+        assert auth.wait_s >= 0.45
+        assert time.monotonic() - started < 2.0
+    finally:
+        auth.stop()
+
+
+def test_mock_inworld_rejects_requests_without_valid_token(token_server):
+    server = MockInworldServer(token_server=token_server).start()
+    try:
+        basic = InworldTTSClient(InworldAuth(key="key", secret="secret"), base_url=server.base_url,
+                                 retry=RetryPolicy(max_attempts=1))
+        with pytest.raises(InworldAPIError) as error:
+            basic.synthesize("bonjour", "voice")
+        assert error.value.status_code == 401
+        assert server.unauthorized == 1
+
+        auth = make_auth(token_server).start()
+        try:
+            client = InworldTTSClient(auth, base_url=server.base_url, retry=RetryPolicy(max_attempts=1))
+            assert len(client.synthesize("bonjour", "voice")) > 0
+            assert server.unauthorized == 1
+        finally:
+            auth.stop()
+    finally:
+        server.stop()